@@ -0,0 +1,225 @@
+import logging
+import os
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Optional, Tuple
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Дневной бюджет AI (0 - без ограничения). Сутки считаются по UTC
+AI_DAILY_TOKEN_BUDGET = int(os.getenv("AI_DAILY_TOKEN_BUDGET", 0))
+AI_DAILY_COST_BUDGET = float(os.getenv("AI_DAILY_COST_BUDGET", 0))
+# Доля израсходованного бюджета, с которой включается каждая ступень деградации
+AI_BUDGET_ECONOMY_AT = float(os.getenv("AI_BUDGET_ECONOMY_AT", 0.7))
+AI_BUDGET_PREFILTER_AT = float(os.getenv("AI_BUDGET_PREFILTER_AT", 0.85))
+AI_BUDGET_SAMPLING_AT = float(os.getenv("AI_BUDGET_SAMPLING_AT", 0.95))
+# Доля постов низкоприоритетных источников (priority < 0), которые проверяются LLM на ступени sampling
+AI_BUDGET_SAMPLE_RATE = float(os.getenv("AI_BUDGET_SAMPLE_RATE", 0.25))
+# Цены моделей в USD за 1M токенов: "model=input/output,model=input/output"
+AI_PRICES = os.getenv("AI_PRICES", "")
+
+
+class DegradationLevel(IntEnum):
+    """Ступени деградации по мере расходования бюджета (каждая включает предыдущие)"""
+    NORMAL = 0
+    ECONOMY = 1      # Дешевая модель (AI_ECONOMY_MODEL)
+    PREFILTER = 2    # Строгий префильтр по ключевым словам, без аудитов классификатора
+    SAMPLING = 3     # Низкоприоритетные источники проверяются выборочно
+    LOCAL_ONLY = 4   # Только локальный классификатор
+
+
+# Ступень деградации для текущего поста (фиксируется в начале проверки поста)
+budget_level: ContextVar[DegradationLevel] = ContextVar("budget_level", default=DegradationLevel.NORMAL)
+# Пост низкоприоритетного источника не попал в выборку
+sampled_out: ContextVar[bool] = ContextVar("sampled_out", default=False)
+
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Разбор AI_PRICES: {model: (цена входа, цена выхода)} за 1M токенов"""
+    prices = {}
+    for entry in spec.split(","):
+        model, _, price = entry.strip().partition("=")
+        if not model or not price:
+            continue
+        input_price, _, output_price = price.partition("/")
+        try:
+            prices[model.strip()] = (float(input_price), float(output_price or input_price))
+        except ValueError:
+            logger.warning(f"Invalid AI price entry ignored: {entry!r}")
+    return prices
+
+
+class Spend:
+    """Расход AI за сутки"""
+
+    def __init__(self, tokens: float = 0.0, prompt_tokens: float = 0.0, completion_tokens: float = 0.0,
+                 cost: float = 0.0, requests: float = 0.0):
+        self.tokens = tokens
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cost = cost
+        self.requests = requests
+
+    def add(self, prompt_tokens: float, completion_tokens: float, tokens: float, cost: float, requests: float):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.tokens += tokens
+        self.cost += cost
+        self.requests += requests
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "tokens": self.tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+            "requests": self.requests
+        }
+
+
+class BudgetGovernor:
+    """
+    Учет дневного расхода AI (всего и по фильтрам) по полям usage ответов и ступень деградации.
+
+    Ступень определяется долей израсходованного бюджета (токены или стоимость, что больше):
+    economy -> prefilter -> sampling -> local_only при 100%. У фильтра может быть свой
+    дневной лимит токенов: после его исчерпания фильтр работает только локально.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, cost_budget: Optional[float] = None,
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None,
+                 thresholds: Optional[Tuple[float, float, float]] = None,
+                 sample_rate: Optional[float] = None):
+        self.token_budget = AI_DAILY_TOKEN_BUDGET if token_budget is None else token_budget
+        self.cost_budget = AI_DAILY_COST_BUDGET if cost_budget is None else cost_budget
+        self.prices = parse_prices(AI_PRICES) if prices is None else prices
+        self.thresholds = thresholds or (AI_BUDGET_ECONOMY_AT, AI_BUDGET_PREFILTER_AT, AI_BUDGET_SAMPLING_AT)
+        self.sample_rate = AI_BUDGET_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.day = self.today()
+        self.total = Spend()
+        self._filters: Dict[str, Spend] = {}
+        self._dirty: set = set()
+        self._level = DegradationLevel.NORMAL
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_budget > 0 or self.cost_budget > 0
+
+    def _rollover(self):
+        """Новые сутки - расход обнуляется"""
+        today = self.today()
+        if today != self.day:
+            logger.info(f"AI spend for {self.day}: {self.total.to_dict()}")
+            self.day = today
+            self.total = Spend()
+            self._filters.clear()
+            self._dirty.clear()
+
+    def spend(self, filter_id: str) -> Spend:
+        self._rollover()
+        return self._filters.setdefault(filter_id, Spend())
+
+    def price(self, model: str) -> Tuple[float, float]:
+        if model in self.prices:
+            return self.prices[model]
+        # Модель может быть указана без префикса провайдера ("openai/gpt-4o-mini" -> "gpt-4o-mini")
+        return self.prices.get(model.rsplit("/", 1)[-1], (0.0, 0.0))
+
+    def record(self, filter_id: str, model: str, usage: Dict[str, float], requests: float = 1.0):
+        """Учитывает расход одного вердикта (usage - доля фильтра в usage запроса)"""
+        prompt_tokens = float(usage.get("prompt_tokens") or 0)
+        completion_tokens = float(usage.get("completion_tokens") or 0)
+        tokens = float(usage.get("total_tokens") or prompt_tokens + completion_tokens)
+        input_price, output_price = self.price(model)
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+        self.spend(filter_id).add(prompt_tokens, completion_tokens, tokens, cost, requests)
+        self.total.add(prompt_tokens, completion_tokens, tokens, cost, requests)
+        self._dirty.add(filter_id)
+
+    def spent_tokens(self, prefix: str) -> float:
+        """Токены за сутки по ключам расхода с префиксом (например, все теневые версии)"""
+        self._rollover()
+        return sum(spend.tokens for key, spend in self._filters.items() if key.startswith(prefix))
+
+    @property
+    def used(self) -> float:
+        """Израсходованная доля дневного бюджета"""
+        self._rollover()
+        fractions = [0.0]
+        if self.token_budget > 0:
+            fractions.append(self.total.tokens / self.token_budget)
+        if self.cost_budget > 0:
+            fractions.append(self.total.cost / self.cost_budget)
+        return max(fractions)
+
+    @property
+    def level(self) -> DegradationLevel:
+        used = self.used
+        level = DegradationLevel.NORMAL
+        for candidate, threshold in zip(
+            (DegradationLevel.ECONOMY, DegradationLevel.PREFILTER, DegradationLevel.SAMPLING), self.thresholds
+        ):
+            if used >= threshold:
+                level = candidate
+        if self.enabled and used >= 1.0:
+            level = DegradationLevel.LOCAL_ONLY
+
+        if level != self._level:
+            log = logger.warning if level > self._level else logger.info
+            log(f"AI budget {used:.0%} used ({self.total.tokens:.0f} tokens, ${self.total.cost:.4f}), "
+                f"degradation level: {self._level.name.lower()} -> {level.name.lower()}")
+            self._level = level
+        return level
+
+    def sample(self, source_priority: int) -> bool:
+        """Проверять ли пост LLM на ступени sampling (обычные источники проверяются всегда)"""
+        return source_priority >= 0 or random.random() < self.sample_rate
+
+    def level_for(self, filter_id: str, daily_token_budget: Optional[int]) -> DegradationLevel:
+        """Ступень для фильтра: ступень поста или local_only, если исчерпан лимит фильтра"""
+        level = budget_level.get()
+        if daily_token_budget and self.spend(filter_id).tokens >= daily_token_budget:
+            return DegradationLevel.LOCAL_ONLY
+        return level
+
+    def report(self) -> Dict[str, Any]:
+        self._rollover()
+        return {
+            "day": self.day,
+            "used": round(self.used, 3),
+            "level": self._level.name.lower(),
+            "total": self.total.to_dict(),
+            "filters": {filter_id: spend.to_dict() for filter_id, spend in self._filters.items()}
+        }
+
+    def restore(self, day: str, spend: Dict[str, dict]):
+        """Загружает сохраненный расход за сутки (расход прошлых суток не учитывается)"""
+        if day != self.today():
+            return
+        self.day = day
+        for filter_id, values in spend.items():
+            restored = Spend(**values)
+            self._filters[filter_id] = restored
+            self.total.add(restored.prompt_tokens, restored.completion_tokens, restored.tokens,
+                           restored.cost, restored.requests)
+
+    def pop_dirty(self) -> Tuple[str, Dict[str, dict]]:
+        """Возвращает (сутки, расход фильтров, изменившийся с прошлого сохранения)"""
+        self._rollover()
+        dirty = {filter_id: self._filters[filter_id].to_dict() for filter_id in self._dirty}
+        self._dirty.clear()
+        return self.day, dirty
+
+    def mark_dirty(self, day: str, filter_ids: Iterable[str]):
+        """Возвращает фильтры в очередь на сохранение (например, после ошибки записи)"""
+        if day == self.day:
+            self._dirty.update(filter_ids)
@@ -1,48 +1,517 @@
 import asyncio
 import json
+import os
 import random
-from typing import Dict, Optional, Any
+import re
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+import httpx
+from dotenv import load_dotenv
 from .prompts import PromptTemplate
+from .errors import AIRateLimitError, AIServerError, AITimeoutError, AIResponseError, AIRequestError
+from .rate_limiter import get_rate_limiter, parse_duration
+from .resilience import FallbackAIClient
+from .router import AIRouter, load_router_config
+from .streaming import StreamedCompletion
+from .tokens import count_tokens
 import logging
 
 logger = logging.getLogger(__name__)
+load_dotenv()
+
+# OpenAI-совместимые провайдеры (chat/completions)
+PROVIDER_BASE_URLS = {
+    "groq": "https://api.groq.com/openai/v1",
+    "openai": "https://api.openai.com/v1",
+    "together": "https://api.together.xyz/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+    # Локальная заглушка: python -m src.ai.standin_server
+    "local": "http://127.0.0.1:8001/v1",
+}
+
+AI_TEMPERATURE = float(os.getenv("AI_TEMPERATURE", 0.3))
+AI_MAX_TOKENS = int(os.getenv("AI_MAX_TOKENS", 300))
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", 30))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", 20))
+AI_HTTP2 = os.getenv("AI_HTTP2", "true").lower() == "true"
+# Потоковые ответы: решение принимается по первым полям, не дожидаясь reason
+AI_STREAMING = os.getenv("AI_STREAMING", "false").lower() == "true"
+# Поля ответа, достаточные для решения по посту
+DECISIVE_FIELDS = ("is_relevant", "confidence", "category")
+# Сколько раз запрос ждет в очереди ограничителя после ответа 429, прежде чем вернуть ошибку
+AI_RATE_LIMIT_RETRIES = int(os.getenv("AI_RATE_LIMIT_RETRIES", 3))
+# Бюджет токенов одного пакетного запроса (промпт + ответ); больший пакет делится пополам
+AI_BATCH_MAX_TOKENS = int(os.getenv("AI_BATCH_MAX_TOKENS", 6000))
+# Токенов ответа на один пост пакета
+AI_BATCH_ITEM_TOKENS = int(os.getenv("AI_BATCH_ITEM_TOKENS", 120))
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
 
 class AIClient:
     """
-    Клиент для взаимодействия с AI API.
-    Текущая реализация: ЗАГЛУШКА (MOCK)
+    Клиент для OpenAI-совместимых chat/completions API (Groq, OpenAI, локальные серверы).
+
+    Использует один пул HTTP-соединений (keep-alive, HTTP/2) на весь процесс,
+    поэтому повторные запросы не тратят время на TCP/TLS рукопожатие.
     """
-    
-    def __init__(self, provider: str = "groq", api_key: Optional[str] = None):
+
+    def __init__(self, provider: str = "groq", api_key: Optional[str] = None, model: Optional[str] = None,
+                 base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 max_connections: Optional[int] = None):
         self.provider = provider
         self.api_key = api_key
-        
+        self.model = model or os.getenv("AI_MODEL", "llama-3.1-8b-instant")
+        self.base_url = (base_url or os.getenv("AI_BASE_URL") or PROVIDER_BASE_URLS.get(provider, "")).rstrip("/")
+        self.timeout = timeout or AI_TIMEOUT
+        self.max_connections = max_connections or AI_MAX_CONNECTIONS
+        self.temperature = AI_TEMPERATURE
+        self.max_tokens = AI_MAX_TOKENS
+        self.limiter = get_rate_limiter(provider, self.model)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Пул соединений создается лениво, внутри работающего event loop"""
+        if self._http is None or self._http.is_closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                http2=AI_HTTP2,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60
+                )
+            )
+        return self._http
+
+    async def close(self):
+        """Закрытие пула соединений"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def analyze_post(self, text: str, filters_config: dict) -> Dict[str, Any]:
         """
         Анализирует пост на основе переданных фильтров.
-        
+
         Args:
             text: Текст поста
             filters_config: Конфигурация фильтра (промпт, категории и т.д.)
-            
+
+        Returns:
+            Dict с результатом анализа и полем usage (токены запроса)
+        """
+        prompt = PromptTemplate.format_analysis_prompt(
+            text, filters_config.get("categories", []), filters_config.get("prompt"),
+            filters_config.get("max_text_tokens")
+        )
+        return await self.complete_json(prompt)
+
+    async def analyze_post_stream(self, text: str, filters_config: dict) -> StreamedCompletion:
+        """
+        Потоковый вариант analyze_post.
+
+        Возвращается, как только модель выдала решающие поля (DECISIVE_FIELDS);
+        reason продолжает генерироваться в фоне. Полный ответ - stream.result(),
+        обрыв ненужной генерации - stream.cancel().
+        """
+        prompt = PromptTemplate.format_analysis_prompt(
+            text, filters_config.get("categories", []), filters_config.get("prompt"),
+            filters_config.get("max_text_tokens")
+        )
+        stream = self.complete_json_stream(prompt, DECISIVE_FIELDS)
+        try:
+            await stream.decision()
+        except BaseException:
+            await stream.cancel()
+            raise
+        return stream
+
+    async def analyze_post_multi(self, text: str, filters_configs: Dict[str, dict]) -> Dict[str, Any]:
+        """
+        Анализирует пост сразу по нескольким фильтрам одним запросом.
+
+        Args:
+            text: Текст поста
+            filters_configs: {filter_id: конфигурация фильтра}
+
+        Returns:
+            Dict {filter_id: результат анализа}. Валидация каждого вердикта
+            выполняется на стороне FilterEngine.
+        """
+        prompt = PromptTemplate.format_multi_filter_prompt(text, filters_configs)
+        return await self.complete_json(prompt, max_tokens=self.max_tokens * len(filters_configs))
+
+    async def analyze_batch(self, texts: List[str], filters_config: dict) -> List[Optional[Dict[str, Any]]]:
+        """
+        Анализирует несколько постов одним фильтром в одном запросе.
+
+        Пакет, не помещающийся в AI_BATCH_MAX_TOKENS (или отклоненный провайдером
+        как слишком длинный), делится пополам и отправляется частями.
+
         Returns:
-            Dict с результатом анализа
+            Список вердиктов в порядке texts. Вместо пропущенного или неразборчивого
+            вердикта - None (такой пост стоит проверить отдельным запросом).
+            Поле usage каждого вердикта - доля токенов запроса на один пост.
         """
+        if not texts:
+            return []
+        categories = filters_config.get("categories", [])
+        prompt = PromptTemplate.format_batch_prompt(
+            texts, categories, filters_config.get("prompt"), filters_config.get("max_text_tokens")
+        )
+        max_tokens = AI_BATCH_ITEM_TOKENS * len(texts)
+
+        if len(texts) > 1 and count_tokens(prompt) + max_tokens > AI_BATCH_MAX_TOKENS:
+            return await self._split_batch(texts, filters_config)
+
+        try:
+            response = await self.complete_json(prompt, max_tokens=max_tokens)
+        except AIRequestError as e:
+            if len(texts) == 1 or e.status_code not in (400, 413):
+                raise
+            logger.warning(f"Batch of {len(texts)} posts rejected by {self.provider} ({e.status_code}), splitting")
+            return await self._split_batch(texts, filters_config)
+
+        return self._parse_batch(response, len(texts))
+
+    async def _split_batch(self, texts: List[str], filters_config: dict) -> List[Optional[Dict[str, Any]]]:
+        middle = len(texts) // 2
+        head, tail = await asyncio.gather(
+            self.analyze_batch(texts[:middle], filters_config),
+            self.analyze_batch(texts[middle:], filters_config)
+        )
+        return head + tail
+
+    @staticmethod
+    def _parse_batch(response: Dict[str, Any], size: int) -> List[Optional[Dict[str, Any]]]:
+        """Раскладывает массив results по номерам постов (проверка самих вердиктов - в FilterEngine)"""
+        items = response.get("results")
+        if not isinstance(items, list):
+            raise AIResponseError(f"Batch response has no results array: {str(response)[:200]!r}")
+
+        verdicts: List[Optional[Dict[str, Any]]] = [None] * size
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index = item.pop("index", None)
+            if isinstance(index, bool) or not isinstance(index, int) or not 1 <= index <= size:
+                continue
+            verdicts[index - 1] = item
+
+        # Доля каждого поста в usage запроса (как у совмещенных запросов в FilterEngine._usage);
+        # если провайдер вернул только total - считаем его токенами промпта
+        usage = response.get("usage") or {}
+        prompt = float(usage.get("prompt_tokens") or 0)
+        completion = float(usage.get("completion_tokens") or 0)
+        total = float(usage.get("total_tokens") or prompt + completion)
+        if not prompt and not completion:
+            prompt = total
+        for verdict in verdicts:
+            if verdict is not None:
+                verdict["usage"] = {
+                    "prompt_tokens": prompt / size,
+                    "completion_tokens": completion / size,
+                    "total_tokens": total / size
+                }
+        return verdicts
+
+    async def complete_json(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Отправляет промпт в режиме JSON и возвращает разобранный объект.
+        Поле usage из ответа провайдера добавляется к результату (если провайдер
+        его не вернул - оценка токенов промпта и ответа).
+        """
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": PromptTemplate.SYSTEM_PROMPT.strip()},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+
+        # Резерв токенов: промпт + максимальный ответ
+        prompt_tokens = sum(count_tokens(m["content"]) for m in payload["messages"])
+        reserved = prompt_tokens + payload["max_tokens"]
+        data = await self._post("/chat/completions", payload, reserved)
+
+        try:
+            content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise AIResponseError(f"Unexpected completion structure: {e!r}")
+
+        result = self._parse_json(content)
+        usage = data.get("usage")
+        if not usage:
+            # Провайдер не вернул usage - оценка по тексту промпта и ответа
+            completion_tokens = count_tokens(content)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            self.limiter.settle(reserved, usage["total_tokens"])
+        result["usage"] = usage
+        logger.debug(f"AI request to {self.provider}:{self.model}: {prompt_tokens} prompt tokens (estimated), "
+                     f"usage {result['usage']}")
+        return result
+
+    def complete_json_stream(self, prompt: str, required: Tuple[str, ...],
+                             max_tokens: Optional[int] = None) -> StreamedCompletion:
+        """Запускает потоковую генерацию JSON ответа (SSE)"""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": PromptTemplate.SYSTEM_PROMPT.strip()},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            # JSON mode с потоком поддерживают не все провайдеры - текст до '{' пропускает парсер
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        prompt_tokens = sum(count_tokens(m["content"]) for m in payload["messages"])
+        return StreamedCompletion(self._stream("/chat/completions", payload, prompt_tokens), required, prompt_tokens)
+
+    async def _stream(self, path: str, payload: Dict[str, Any],
+                      prompt_tokens: int) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Потоковый POST через ограничитель: слот занят, пока идет генерация.
+        Выдает пары (фрагмент текста, usage или None). Закрытие генератора
+        закрывает соединение - провайдер прекращает генерацию.
+        """
+        reserved = prompt_tokens + payload["max_tokens"]
+        for attempt in range(AI_RATE_LIMIT_RETRIES + 1):
+            async with self.limiter.slot(reserved):
+                try:
+                    response = await self.http.send(self.http.build_request("POST", path, json=payload), stream=True)
+                except httpx.TimeoutException as e:
+                    raise AITimeoutError(f"{self.provider} request timed out: {e!r}")
+                except httpx.HTTPError as e:
+                    raise AIServerError(f"{self.provider} connection error: {e!r}", status_code=0)
+
+                used = None
+                received = []
+                try:
+                    self.limiter.update_from_headers(response.headers)
+
+                    if response.status_code == 429 and attempt < AI_RATE_LIMIT_RETRIES:
+                        used = 0
+                        self.limiter.penalize(parse_duration(response.headers.get("retry-after")))
+                        continue
+                    if response.status_code >= 400:
+                        await response.aread()
+                        self._raise_for_status(response)
+
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError as e:
+                            raise AIResponseError(f"{self.provider} sent invalid stream chunk: {e}")
+
+                        # OpenAI: usage в последнем чанке, Groq: в x_groq.usage
+                        usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                        if usage:
+                            used = usage.get("total_tokens")
+                        choices = chunk.get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content") or ""
+                        received.append(delta)
+                        yield delta, usage
+                    return
+                except httpx.TimeoutException as e:
+                    raise AITimeoutError(f"{self.provider} stream timed out: {e!r}")
+                except httpx.HTTPError as e:
+                    raise AIServerError(f"{self.provider} stream broken: {e!r}", status_code=0)
+                finally:
+                    await response.aclose()
+                    if used is None:
+                        used = prompt_tokens + count_tokens("".join(received))
+                    self.limiter.settle(reserved, used)
+
+    async def _post(self, path: str, payload: Dict[str, Any], tokens: int) -> Dict[str, Any]:
+        """
+        POST запрос через ограничитель провайдера.
+        При 429 запрос возвращается в очередь (ограничитель приостанавливает всех),
+        а не завершается ошибкой сразу.
+        """
+        for attempt in range(AI_RATE_LIMIT_RETRIES + 1):
+            async with self.limiter.slot(tokens):
+                try:
+                    response = await self.http.post(path, json=payload)
+                except httpx.TimeoutException as e:
+                    raise AITimeoutError(f"{self.provider} request timed out: {e!r}")
+                except httpx.HTTPError as e:
+                    raise AIServerError(f"{self.provider} connection error: {e!r}", status_code=0)
+
+            self.limiter.update_from_headers(response.headers)
+
+            if response.status_code == 429 and attempt < AI_RATE_LIMIT_RETRIES:
+                # Отклоненный запрос не расходует токены
+                self.limiter.settle(tokens, 0)
+                self.limiter.penalize(parse_duration(response.headers.get("retry-after")))
+                continue
+
+            if response.status_code >= 400:
+                # Отклоненный запрос не расходует токены - резерв возвращается до ошибки
+                self.limiter.settle(tokens, 0)
+                self._raise_for_status(response)
+
+            try:
+                data = response.json()
+            except ValueError as e:
+                raise AIResponseError(f"{self.provider} returned non-JSON body: {e}")
+
+            # Без usage расход оценивает вызывающий (complete_json) по тексту ответа
+            usage = data.get("usage") or {}
+            if usage.get("total_tokens") is not None:
+                self.limiter.settle(tokens, usage["total_tokens"])
+            return data
+
+    def _raise_for_status(self, response: httpx.Response):
+        if response.status_code < 400:
+            return
+
+        message = f"{self.provider} HTTP {response.status_code}: {response.text[:300]}"
+        if response.status_code == 429:
+            raise AIRateLimitError(message, retry_after=parse_duration(response.headers.get("retry-after")))
+        if response.status_code >= 500:
+            raise AIServerError(message, status_code=response.status_code)
+        raise AIRequestError(message, status_code=response.status_code)
+
+    @staticmethod
+    def _parse_json(content: str) -> Dict[str, Any]:
+        """Разбор JSON из ответа модели (с fallback на первый {...} блок в тексте)"""
+        try:
+            result = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            match = _JSON_OBJECT_RE.search(content or "")
+            if not match:
+                raise AIResponseError(f"Model returned no JSON object: {str(content)[:200]!r}")
+            try:
+                result = json.loads(match.group(0))
+            except json.JSONDecodeError as e:
+                raise AIResponseError(f"Model returned invalid JSON: {e}")
+
+        if not isinstance(result, dict):
+            raise AIResponseError(f"Expected JSON object, got {type(result).__name__}")
+        return result
+
+    async def health_check(self) -> bool:
+        """Проверка доступности сервиса"""
+        try:
+            response = await self.http.get("/models")
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+
+class MockAIClient(AIClient):
+    """
+    ЗАГЛУШКА (MOCK) для разработки без API ключа.
+    Реагирует на ключевые слова из категорий фильтра.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("model", "mock")
+        super().__init__(*args, **kwargs)
+
+    async def analyze_post(self, text: str, filters_config: dict) -> Dict[str, Any]:
+        prompt = PromptTemplate.format_analysis_prompt(
+            text, filters_config.get("categories", []), filters_config.get("prompt"),
+            filters_config.get("max_text_tokens")
+        )
+
         # Имитация задержки сети
         await asyncio.sleep(0.5)
-        
+
+        verdict = self._mock_verdict(text, filters_config)
+        verdict["usage"] = self._mock_usage(prompt)
+        return verdict
+
+    async def analyze_post_stream(self, text: str, filters_config: dict) -> StreamedCompletion:
+        prompt = PromptTemplate.format_analysis_prompt(
+            text, filters_config.get("categories", []), filters_config.get("prompt"),
+            filters_config.get("max_text_tokens")
+        )
+        content = json.dumps(self._mock_verdict(text, filters_config), ensure_ascii=False)
+
+        async def chunks():
+            # Имитация генерации: те же 0.5 секунды, но ответ приходит по частям
+            pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+            for piece in pieces:
+                await asyncio.sleep(0.5 / len(pieces))
+                yield piece, None
+            yield "", self._mock_usage(prompt)
+
+        stream = StreamedCompletion(chunks(), DECISIVE_FIELDS, count_tokens(prompt))
+        await stream.decision()
+        return stream
+
+    async def analyze_post_multi(self, text: str, filters_configs: Dict[str, dict]) -> Dict[str, Any]:
+        # Промпт формируется так же, как для реального API
+        prompt = PromptTemplate.format_multi_filter_prompt(text, filters_configs)
+
+        # Один запрос вместо N
+        await asyncio.sleep(0.5)
+
+        response = {
+            filter_id: self._mock_verdict(text, config)
+            for filter_id, config in filters_configs.items()
+        }
+        response["usage"] = self._mock_usage(prompt)
+        return response
+
+    async def analyze_batch(self, texts: List[str], filters_config: dict) -> List[Optional[Dict[str, Any]]]:
+        prompt = PromptTemplate.format_batch_prompt(
+            texts, filters_config.get("categories", []), filters_config.get("prompt"),
+            filters_config.get("max_text_tokens")
+        )
+
+        # Один запрос на весь пакет
+        await asyncio.sleep(0.5)
+
+        response = {"results": [
+            {"index": index, **self._mock_verdict(text, filters_config)}
+            for index, text in enumerate(texts, start=1)
+        ]}
+        response["usage"] = self._mock_usage(prompt)
+        return self._parse_batch(response, len(texts))
+
+    @staticmethod
+    def _mock_usage(prompt: str) -> Dict[str, int]:
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = 40
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    @staticmethod
+    def _mock_verdict(text: str, filters_config: dict) -> Dict[str, Any]:
         # --- MOCK LOGIC ---
         # Простая эвристика для имитации AI, чтобы тесты проходили логично
         text_lower = text.lower()
-        
+
         is_relevant = False
         category = "Other"
         confidence = 0.0
         reason = "Mock analysis"
-        
+
         # Если в тексте есть ключевые слова из категорий, считаем релевантным
         categories = filters_config.get("categories", [])
-        
+
         for cat in categories:
             if cat.lower() in text_lower:
                 is_relevant = True
@@ -50,21 +519,141 @@ class AIClient:
                 confidence = 0.8 + (random.random() * 0.15) # 0.80 - 0.95
                 reason = f"Found keyword: {cat}"
                 break
-        
+
         # Если не нашли по категориям, проверяем на 'python' или 'tech' как fallback для теста
         if not is_relevant and ("python" in text_lower or "технологии" in text_lower):
             is_relevant = True
             category = categories[0] if categories else "Tech"
             confidence = 0.75
             reason = "Found general tech keywords"
-            
+
         return {
             "is_relevant": is_relevant,
-            "category": category,
             "confidence": round(confidence, 2),
+            "category": category,
             "reason": reason
         }
 
     async def health_check(self) -> bool:
         """Проверка доступности сервиса"""
         return True
+
+
+def _provider_api_key(provider: str) -> Optional[str]:
+    key = os.getenv(f"{provider.upper()}_API_KEY") or os.getenv("AI_API_KEY")
+    if key and key.endswith("your_key_here"):
+        return None
+    return key
+
+
+def _tier_client(entry: str, role: str) -> Optional[AIClient]:
+    """Клиент для уровня "provider:model" (None, если для провайдера нет API ключа)"""
+    tier_provider, _, tier_model = entry.partition(":")
+    tier_provider = tier_provider.strip().lower()
+    tier_key = None if tier_provider == "local" else _provider_api_key(tier_provider)
+    if tier_provider != "local" and not tier_key:
+        logger.warning(f"API key for {role} AI provider '{tier_provider}' is not set, skipping {entry}")
+        return None
+    # Базовый URL уровня берется из таблицы провайдеров, а не из AI_BASE_URL
+    return AIClient(
+        provider=tier_provider,
+        api_key=tier_key,
+        model=tier_model.strip() or None,
+        base_url=os.getenv(f"{tier_provider.upper()}_BASE_URL") or PROVIDER_BASE_URLS.get(tier_provider)
+    )
+
+
+def create_router(config: Dict[str, Any]) -> Optional[AIRouter]:
+    """
+    Маршрутизатор по бэкендам из config/ai.yaml (секции backends и routing).
+    Бэкенды без API ключа пропускаются.
+    """
+    backends = []
+    for entry in config.get("backends") or []:
+        provider = str(entry.get("provider", "openai")).lower()
+        api_key = os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else None
+        if provider != "local" and not api_key:
+            logger.warning(f"API key for AI backend '{entry.get('name', provider)}' is not set, skipping")
+            continue
+        backends.append(AIClient(
+            provider=provider,
+            api_key=api_key,
+            model=entry.get("model"),
+            base_url=entry.get("base_url") or PROVIDER_BASE_URLS.get(provider),
+            timeout=entry.get("timeout"),
+            max_connections=entry.get("max_connections")
+        ))
+
+    if not backends:
+        return None
+
+    routing = config.get("routing") or {}
+    return AIRouter(
+        backends,
+        ewma_alpha=float(routing.get("ewma_alpha", 0.2)),
+        error_penalty=float(routing.get("error_penalty", 4.0)),
+        exploration=float(routing.get("exploration", 0.05)),
+        hedge=bool(routing.get("hedge", True)),
+        hedge_quantile=float(routing.get("hedge_quantile", 0.95)),
+        hedge_min_delay=float(routing.get("hedge_min_delay_ms", 200)) / 1000,
+        hedge_default_delay=float(routing.get("hedge_default_delay_ms", 1500)) / 1000,
+    )
+
+
+def create_ai_client() -> AIClient:
+    """
+    Создает AI клиент по настройкам окружения.
+    Без API ключа (кроме локального сервера) используется заглушка.
+
+    Реальный клиент оборачивается в FallbackAIClient (повторы и предохранитель);
+    AI_FALLBACK_CHAIN задает резервные уровни в формате "provider:model,provider:model".
+    Если есть config/ai.yaml с бэкендами, первым уровнем становится маршрутизатор по ним.
+    """
+    provider = os.getenv("AI_PROVIDER", "groq").split("#")[0].strip().lower()
+    api_key = os.getenv("AI_API_KEY") or os.getenv(f"{provider.upper()}_API_KEY")
+
+    if provider == "mock":
+        return MockAIClient(provider="mock")
+
+    router_config = load_router_config()
+    router = create_router(router_config) if router_config else None
+    if router is not None:
+        logger.info(f"Routing AI requests across {len(router.backends)} backends: "
+                    f"{', '.join(router.backend_name(b) for b in router.backends)}")
+        tiers = [router]
+    elif provider != "local" and (not api_key or api_key.endswith("your_key_here")):
+        logger.warning(f"API key for AI provider '{provider}' is not set, using mock AI client")
+        return MockAIClient(provider="mock")
+    else:
+        tiers = [AIClient(provider=provider, api_key=api_key)]
+
+    for entry in os.getenv("AI_FALLBACK_CHAIN", "").split(","):
+        entry = entry.strip()
+        tier = _tier_client(entry, "fallback") if entry else None
+        if tier is not None:
+            tiers.append(tier)
+
+    logger.info(f"Using AI chain: {' -> '.join(FallbackAIClient.tier_name(c) for c in tiers)}")
+    return FallbackAIClient(tiers)
+
+
+def create_model_client(entry: str, role: str = "shadow") -> Optional[FallbackAIClient]:
+    """Клиент для отдельной модели "provider:model" (с повторами, без резервных уровней)"""
+    tier = _tier_client(entry.strip(), role)
+    return FallbackAIClient([tier]) if tier is not None else None
+
+
+def create_economy_client(main_client: Any = None) -> Optional[FallbackAIClient]:
+    """
+    Дешевая модель для экономии дневного бюджета (AI_ECONOMY_MODEL в формате "provider:model").
+    Резервными уровнями становятся уровни основного клиента.
+    Без настройки возвращает None - при нехватке бюджета модель не меняется.
+    """
+    entry = os.getenv("AI_ECONOMY_MODEL", "").strip()
+    if not entry:
+        return None
+    tier = _tier_client(entry, "economy")
+    if tier is None:
+        return None
+    logger.info(f"Economy AI model for budget degradation: {FallbackAIClient.tier_name(tier)}")
+    return FallbackAIClient([tier] + list(getattr(main_client, "tiers", [])))
@@ -0,0 +1,37 @@
+from typing import Optional
+
+
+class AIError(Exception):
+    """Базовая ошибка обращения к AI API"""
+
+
+class AIRateLimitError(AIError):
+    """Провайдер вернул 429 (превышен лимит запросов или токенов)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AIServerError(AIError):
+    """Ошибка на стороне провайдера (5xx)"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AITimeoutError(AIError):
+    """Провайдер не ответил за отведенное время"""
+
+
+class AIResponseError(AIError):
+    """Ответ провайдера не удалось разобрать (невалидный JSON, неверная структура)"""
+
+
+class AIRequestError(AIError):
+    """Запрос отклонен провайдером (4xx, например превышение контекста)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
@@ -1,43 +1,140 @@
-from typing import List, Optional
-import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from .tokens import AI_TEXT_TOKEN_BUDGET, truncate_text
+
+# Части промптов, не зависящие от поста, собираются один раз; при каждом запросе
+# к ним только дописывается текст поста.
+# Решающие поля (is_relevant, confidence, category - DECISIVE_FIELDS в client.py) идут
+# первыми: при потоковом ответе решение принимается до того, как модель допишет reason
+_DEFAULT_PROMPT = "Проанализируй этот пост."
+
+_VERDICT_FIELDS = """\
+"is_relevant": true/false (подходит ли под критерии),
+"confidence": 0.0-1.0 (твоя уверенность),
+"category": "название категории из списка или 'Other'",
+"reason": "краткое объяснение решения\""""
+
+_ANALYSIS_SUFFIX = f"""
+
+Проанализируй текст и верни ответ в формате JSON:
+{{
+{_VERDICT_FIELDS}
+}}
+"""
+
+_MULTI_HEADER = "Проверь пост по каждому из фильтров ниже независимо друг от друга.\n"
+
+_MULTI_SUFFIX = """
+
+Верни ответ в формате JSON, где ключ - ID фильтра:
+{
+"<ID фильтра>": {
+"is_relevant": true/false (подходит ли под критерии фильтра),
+"confidence": 0.0-1.0 (твоя уверенность),
+"category": "название категории из списка фильтра или 'Other'",
+"reason": "краткое объяснение решения"
+}
+}
+"""
+
+_BATCH_SUFFIX = f"""
+
+Верни ответ в формате JSON с вердиктом для каждого поста:
+{{
+"results": [
+{{
+"index": номер поста,
+{_VERDICT_FIELDS}
+}}
+]
+}}
+"""
+
+
+@lru_cache(maxsize=256)
+def _filter_header(custom_prompt: Optional[str], categories: Tuple[str, ...]) -> str:
+    return f"{custom_prompt or _DEFAULT_PROMPT}\n\nДоступные категории: {', '.join(categories)}\n"
+
+
+@lru_cache(maxsize=256)
+def _multi_filter_block(filter_id: str, custom_prompt: Optional[str], categories: Tuple[str, ...]) -> str:
+    return (
+        f'\n### Фильтр "{filter_id}"\n{custom_prompt or _DEFAULT_PROMPT}\n'
+        f"Доступные категории: {', '.join(categories)}\n"
+    )
+
+
+def _quote(text: str) -> str:
+    return '"""' + text + '"""'
+
 
 class PromptTemplate:
     """Шаблоны промптов для AI"""
-    
+
     # Базовый системный промпт
-    SYSTEM_PROMPT = """
-    Ты эксперт по анализу и классификации контента из социальных сетей.
-    Твоя задача - определить, соответствует ли пост заданным критериям и к какой категории он относится.
-    Всегда отвечай в строгом формате JSON.
-    """
+    SYSTEM_PROMPT = (
+        "Ты эксперт по анализу и классификации контента из социальных сетей.\n"
+        "Твоя задача - определить, соответствует ли пост заданным критериям и к какой категории он относится.\n"
+        "Всегда отвечай в строгом формате JSON."
+    )
 
     @staticmethod
-    def format_analysis_prompt(text: str, categories: List[str], custom_prompt: Optional[str] = None) -> str:
-        """
-        Формирует промпт для анализа поста
+    def format_analysis_prompt(text: str, categories: List[str], custom_prompt: Optional[str] = None,
+                               max_text_tokens: Optional[int] = None) -> str:
         """
-        base_prompt = custom_prompt or "Проанализируй этот пост."
-        
-        categories_str = ", ".join(categories)
-        
-        return f"""
-        {base_prompt}
-        
-        Текст поста:
-        \"\"\"{text}\"\"\"
-        
-        Доступные категории: {categories_str}
-        
-        Проанализируй текст и верни ответ в формате JSON:
-        {{
-            "is_relevant": true/false (подходит ли под критерии),
-            "category": "название категории из списка или 'Other'",
-            "confidence": 0.0-1.0 (твоя уверенность),
-            "reason": "краткое объяснение решения"
-        }}
+        Формирует промпт для анализа поста.
+        Текст длиннее max_text_tokens токенов обрезается (см. truncate_text)
         """
+        return "".join((
+            _filter_header(custom_prompt, tuple(categories)),
+            "\nТекст поста:\n",
+            _quote(truncate_text(text, max_text_tokens)),
+            _ANALYSIS_SUFFIX,
+        ))
 
+    @staticmethod
+    def format_multi_filter_prompt(text: str, filters_configs: Dict[str, dict]) -> str:
+        """
+        Формирует единый промпт для проверки поста сразу по нескольким фильтрам.
+        Текст обрезается по наибольшему бюджету среди фильтров
+        """
+        criteria = "".join(
+            _multi_filter_block(filter_id, config.get("prompt"), tuple(config.get("categories", [])))
+            for filter_id, config in filters_configs.items()
+        )
+        return "".join((
+            _MULTI_HEADER,
+            criteria,
+            "\nТекст поста:\n",
+            _quote(truncate_text(text, PromptTemplate.text_budget(filters_configs.values()))),
+            _MULTI_SUFFIX,
+        ))
 
+    @staticmethod
+    def format_batch_prompt(texts: List[str], categories: List[str], custom_prompt: Optional[str] = None,
+                            max_text_tokens: Optional[int] = None) -> str:
+        """
+        Формирует промпт для проверки нескольких постов одним фильтром.
+        Инструкции передаются один раз, посты нумеруются с 1
+        """
+        posts = "".join(
+            f"\n### Пост {index}\n{_quote(truncate_text(text, max_text_tokens))}\n"
+            for index, text in enumerate(texts, start=1)
+        )
+        return "".join((
+            _filter_header(custom_prompt, tuple(categories)),
+            "\nПроверь каждый из постов ниже независимо друг от друга.\n",
+            posts,
+            _BATCH_SUFFIX,
+        ))
 
-
-
+    @staticmethod
+    def text_budget(configs) -> Optional[int]:
+        """Общий бюджет текста для нескольких фильтров: наибольший из бюджетов (0 - без обрезки)"""
+        budgets = [
+            AI_TEXT_TOKEN_BUDGET if config.get("max_text_tokens") is None else config["max_text_tokens"]
+            for config in configs
+        ]
+        if not budgets:
+            return None
+        return 0 if 0 in budgets else max(budgets)
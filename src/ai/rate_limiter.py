@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple, Mapping
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Лимиты по умолчанию (бесплатный Groq: 30 запросов и ~6000 токенов в минуту)
+AI_RATE_LIMIT_PER_MINUTE = int(os.getenv("AI_RATE_LIMIT_PER_MINUTE", 30))
+AI_TOKEN_LIMIT_PER_MINUTE = int(os.getenv("AI_TOKEN_LIMIT_PER_MINUTE", 6000))
+AI_MAX_CONCURRENT_REQUESTS = int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", 8))
+
+# Источник поста, от имени которого идет запрос к AI (для честной очереди)
+request_source: ContextVar[str] = ContextVar("request_source", default="default")
+# Фоновые запросы (теневая проверка фильтров) получают слот, только когда не ждет никто другой
+BACKGROUND_SOURCE = "background"
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Разбор длительности из заголовков ('1m2.5s', '450ms', '7.66s', '12') в секунды"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Классический token bucket: емкость capacity, пополнение rate единиц в секунду"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.available = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Сколько ждать, пока в ведре наберется amount единиц"""
+        self._refill(now)
+        # Запрос больше емкости ведра ждет полного ведра, иначе он не пройдет никогда
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self.available = min(self.capacity, self.available + amount)
+
+    def clamp(self, remaining: float, now: float):
+        """Сервер знает остаток точнее: не даем локальному ведру быть оптимистичнее"""
+        self._refill(now)
+        self.available = min(self.available, remaining)
+
+
+class RateLimiter:
+    """
+    Ограничитель запросов к одному провайдеру/модели.
+
+    Держит два ведра (запросы и токены в минуту) и лимит одновременных запросов.
+    Ожидающие вызовы стоят в отдельных очередях по источникам и обслуживаются
+    по кругу, поэтому шумный источник не вытесняет остальные.
+    Заголовки x-ratelimit-* и retry-after из ответов подстраивают ведра.
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.name = name
+        rpm = requests_per_minute or AI_RATE_LIMIT_PER_MINUTE
+        tpm = tokens_per_minute or AI_TOKEN_LIMIT_PER_MINUTE
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.max_concurrency = max_concurrency or AI_MAX_CONCURRENT_REQUESTS
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, int]]] = {}
+        self._order: Deque[str] = deque()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @asynccontextmanager
+    async def slot(self, tokens: int, key: Optional[str] = None):
+        """Захват права на запрос стоимостью tokens (ожидание в очереди источника key)"""
+        await self.acquire(tokens, key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, tokens: int, key: Optional[str] = None):
+        key = key or request_source.get()
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._order.append(key)
+        queue.append((future, tokens))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот мог быть выдан одновременно с отменой - возвращаем его
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wakeup.set()
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Возврат разницы между зарезервированными и реально потраченными токенами"""
+        if used is not None and used < reserved:
+            self.tokens.refund(reserved - used)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Подстройка по заголовкам x-ratelimit-* (формат Groq/OpenAI)"""
+        now = time.monotonic()
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            bucket.clamp(remaining, now)
+            if remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def penalize(self, retry_after: Optional[float]):
+        """Провайдер вернул 429: приостанавливаем все запросы, а не только текущий"""
+        delay = retry_after if retry_after and retry_after > 0 else 1.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.warning(f"AI rate limit hit for {self.name}, pausing requests for {delay:.1f}s")
+
+    def _delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+    async def _dispatch(self):
+        """Выдает слоты по кругу между источниками, пока есть ожидающие"""
+        while self._order:
+            key = self._order[0]
+            queue = self._queues[key]
+
+            while queue and queue[0][0].done():
+                queue.popleft()  # Отмененные ожидания
+            if not queue:
+                self._order.popleft()
+                del self._queues[key]
+                continue
+
+            if key == BACKGROUND_SOURCE and len(self._order) > 1:
+                self._order.rotate(-1)
+                continue
+
+            future, tokens = queue[0]
+            if self.in_flight >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._delay(tokens)
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.monotonic()
+            self.requests.consume(1, now)
+            self.tokens.consume(tokens, now)
+            self.in_flight += 1
+            queue.popleft()
+            future.set_result(None)
+
+            # Следующим обслуживается другой источник
+            self._order.rotate(-1)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """Общий ограничитель для пары провайдер/модель (лимиты провайдеров считаются на модель)"""
+    name = f"{provider}:{model}"
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = RateLimiter(name)
+    return limiter
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from .errors import AIError, AIRateLimitError, AIServerError, AITimeoutError, AIResponseError, AIRequestError
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+AI_RETRY_ATTEMPTS = int(os.getenv("AI_RETRY_ATTEMPTS", 3))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", 0.5))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", 8))
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", 5))
+AI_BREAKER_RESET = float(os.getenv("AI_BREAKER_RESET", 30))
+
+# Крайний срок (time.monotonic()) для всех запросов к AI в рамках решения по одному посту
+ai_deadline: ContextVar[Optional[float]] = ContextVar("ai_deadline", default=None)
+
+
+class AIUnavailableError(AIError):
+    """Ни один уровень цепочки не смог ответить (ошибки, открытые предохранители или дедлайн)"""
+
+
+class AIDeadlineExceeded(AITimeoutError):
+    """Истек крайний срок решения по посту"""
+
+
+def remaining_time() -> Optional[float]:
+    deadline = ai_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и полным джиттером, не выходящие за дедлайн"""
+
+    # Повторяемые ошибки: сбои провайдера, таймауты, лимиты, битый ответ модели
+    RETRYABLE = (AIServerError, AITimeoutError, AIRateLimitError, AIResponseError)
+
+    def __init__(self, attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None):
+        self.attempts = max(1, attempts or AI_RETRY_ATTEMPTS)
+        self.base_delay = AI_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = AI_RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if isinstance(error, AIRateLimitError) and error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        for attempt in range(self.attempts):
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise AIDeadlineExceeded("AI decision deadline exceeded")
+            try:
+                if remaining is None:
+                    return await fn()
+                return await asyncio.wait_for(fn(), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise AIDeadlineExceeded("AI decision deadline exceeded")
+            except self.RETRYABLE as e:
+                if attempt + 1 >= self.attempts:
+                    raise
+                delay = self.backoff(attempt, e)
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise
+                logger.warning(f"AI call failed ({e}), retry {attempt + 1}/{self.attempts - 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Предохранитель бэкенда (провайдер и модель): после failure_threshold ошибок подряд запросы
+    не отправляются reset_timeout секунд, затем пропускается один пробный запрос.
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or AI_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or AI_BREAKER_RESET
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release(self):
+        """Запрос завершился без оценки бэкенда (отмена, лимит) - можно пропустить новый пробный"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit breaker for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[Tuple[str, str, str], CircuitBreaker] = {}
+
+
+def get_circuit_breaker(client: Any) -> CircuitBreaker:
+    """
+    Предохранитель бэкенда: провайдер + модель (+ адрес сервера), чтобы отказ одной модели
+    не отключал другие модели того же провайдера.
+    """
+    key = (client.provider, client.model, getattr(client, "base_url", ""))
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(f"{client.provider}/{client.model}")
+    return breaker
+
+
+class FallbackAIClient:
+    """
+    Цепочка AI клиентов (например, быстрая малая модель -> большая модель -> другой провайдер).
+
+    Каждый уровень вызывается с повторами; уровни, чей бэкенд за предохранителем,
+    пропускаются. Ответ помечается полем tier ("provider:model") - кто вынес вердикт.
+    Если не ответил никто, бросается AIUnavailableError.
+    """
+
+    def __init__(self, tiers: List[Any], retry_policy: Optional[RetryPolicy] = None):
+        if not tiers:
+            raise ValueError("Fallback chain requires at least one AI client")
+        self.tiers = tiers
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    @property
+    def provider(self) -> str:
+        return self.tiers[0].provider
+
+    @property
+    def model(self) -> str:
+        return self.tiers[0].model
+
+    @staticmethod
+    def tier_name(client: Any) -> str:
+        return f"{client.provider}:{client.model}"
+
+    async def analyze_post(self, text: str, filters_config: dict) -> Dict[str, Any]:
+        return await self._call("analyze_post", text, filters_config)
+
+    async def analyze_post_multi(self, text: str, filters_configs: Dict[str, dict]) -> Dict[str, Any]:
+        return await self._call("analyze_post_multi", text, filters_configs)
+
+    async def analyze_post_stream(self, text: str, filters_config: dict):
+        return await self._call("analyze_post_stream", text, filters_config)
+
+    async def analyze_batch(self, texts: List[str], filters_config: dict) -> List[Optional[Dict[str, Any]]]:
+        return await self._call("analyze_batch", texts, filters_config)
+
+    async def _call(self, method: str, *args) -> Any:
+        errors: List[Tuple[str, Exception]] = []
+
+        for client in self.tiers:
+            name = self.tier_name(client)
+            # Уровень со своими предохранителями (маршрутизатор по бэкендам) учитывает ошибки сам
+            breaker = None if getattr(client, "owns_breakers", False) else get_circuit_breaker(client)
+            if breaker is not None and not breaker.allow():
+                errors.append((name, AIUnavailableError("circuit open")))
+                continue
+
+            try:
+                result = await self.retry_policy.call(lambda: getattr(client, method)(*args))
+            except AIDeadlineExceeded as e:
+                # Время решения вышло - следующие уровни тоже не успеют; о бэкенде это ничего не говорит
+                if breaker is not None:
+                    breaker.release()
+                errors.append((name, e))
+                break
+            except (AIRateLimitError, AIRequestError, AIUnavailableError) as e:
+                # Лимит или отказ в запросе (например, длинный контекст) - не неисправность
+                # провайдера: предохранитель не трогаем, следующий уровень может справиться
+                if breaker is not None:
+                    breaker.release()
+                errors.append((name, e))
+                continue
+            except (AIServerError, AITimeoutError, AIResponseError) as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                errors.append((name, e))
+                logger.warning(f"AI tier {name} failed: {e}")
+                continue
+            except BaseException:
+                # Отмена (ранняя остановка, хедж, обрыв потока) или неожиданная ошибка:
+                # пробный запрос не должен навсегда занять предохранитель
+                if breaker is not None:
+                    breaker.release()
+                raise
+
+            if breaker is not None:
+                breaker.record_success()
+            # Уровень мог уже пометить ответ точнее (например, бэкенд маршрутизатора)
+            if hasattr(result, "tier") and result.tier is None:
+                result.tier = name  # Потоковый ответ
+            for item in (result if isinstance(result, list) else [result]):
+                if isinstance(item, dict):
+                    item.setdefault("tier", name)
+            return result
+
+        raise AIUnavailableError("; ".join(f"{name}: {e}" for name, e in errors) or "no AI tiers")
+
+    async def health_check(self) -> bool:
+        for client in self.tiers:
+            if await client.health_check():
+                return True
+        return False
+
+    async def close(self):
+        for client in self.tiers:
+            await client.close()
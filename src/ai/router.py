@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+import yaml
+from dotenv import load_dotenv
+from .errors import AIError, AIRateLimitError, AIRequestError
+from .resilience import AIUnavailableError, get_circuit_breaker
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Файл с описанием бэкендов для маршрутизации (если его нет - один провайдер из AI_PROVIDER)
+AI_CONFIG_PATH = os.getenv("AI_CONFIG_PATH", "config/ai.yaml")
+
+
+class BackendStats:
+    """Живая статистика бэкенда: EWMA задержки и доли ошибок, окно задержек для квантилей"""
+
+    def __init__(self, alpha: float, window: int, prior_latency: float):
+        self.alpha = alpha
+        self.latency = prior_latency  # EWMA задержки успешных ответов, секунды
+        self.error_rate = 0.0  # EWMA доли ошибок
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.in_flight = 0
+
+    def record(self, latency: Optional[float], error: bool):
+        self.error_rate += self.alpha * ((1.0 if error else 0.0) - self.error_rate)
+        if latency is not None:
+            self.latency += self.alpha * (latency - self.latency)
+            self.samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.samples) < 20:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AIRouter:
+    """
+    Маршрутизатор запросов по нескольким OpenAI-совместимым бэкендам.
+
+    Запрос уходит бэкенду с наименьшей оценкой: EWMA задержки с поправкой на долю
+    ошибок и число запросов в работе; бэкенды за открытым предохранителем пропускаются
+    (и при отказе, и при хеджировании). Предохранители бэкендов ведет только маршрутизатор,
+    FallbackAIClient их для него не трогает.
+    Небольшая доля запросов уходит случайному бэкенду, чтобы оценки не устаревали.
+
+    Хеджирование: если ответ не пришел за p95 задержки выбранного бэкенда, тот же
+    запрос отправляется следующему по оценке; побеждает первый ответ, второй отменяется.
+    """
+
+    provider = "router"
+    owns_breakers = True
+
+    def __init__(self, backends: List[Any], ewma_alpha: float = 0.2, error_penalty: float = 4.0,
+                 exploration: float = 0.05, hedge: bool = True, hedge_quantile: float = 0.95,
+                 hedge_min_delay: float = 0.2, hedge_default_delay: float = 1.5, window: int = 200,
+                 prior_latency: float = 1.0):
+        if not backends:
+            raise ValueError("AI router requires at least one backend")
+        self.backends = backends
+        self.error_penalty = error_penalty
+        self.exploration = exploration
+        self.hedge = hedge and len(backends) > 1
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.stats = {id(b): BackendStats(ewma_alpha, window, prior_latency) for b in backends}
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @property
+    def model(self) -> str:
+        return self.backends[0].model
+
+    @staticmethod
+    def backend_name(backend: Any) -> str:
+        return f"{backend.provider}:{backend.model}"
+
+    def score(self, backend: Any) -> float:
+        stats = self.stats[id(backend)]
+        return stats.latency * (1 + self.error_penalty * stats.error_rate) * (1 + 0.1 * stats.in_flight)
+
+    def ranked(self) -> List[Any]:
+        """Бэкенды в порядке предпочтения (с открытым предохранителем - в конце)"""
+        ranked = sorted(self.backends, key=self.score)
+        if len(ranked) > 1 and random.random() < self.exploration:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        available = [b for b in ranked if get_circuit_breaker(b).state != "open"]
+        return available + [b for b in ranked if b not in available]
+
+    def hedge_delay(self, backend: Any) -> float:
+        p = self.stats[id(backend)].quantile(self.hedge_quantile)
+        return max(self.hedge_min_delay, p if p is not None else self.hedge_default_delay)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            self.backend_name(b): {
+                "ewma_latency": round(self.stats[id(b)].latency, 3),
+                "error_rate": round(self.stats[id(b)].error_rate, 3),
+                "p95": self.stats[id(b)].quantile(0.95),
+                "in_flight": self.stats[id(b)].in_flight,
+            }
+            for b in self.backends
+        }
+
+    async def analyze_post(self, text: str, filters_config: dict) -> Dict[str, Any]:
+        return await self._call("analyze_post", text, filters_config)
+
+    async def analyze_post_stream(self, text: str, filters_config: dict):
+        return await self._call("analyze_post_stream", text, filters_config)
+
+    async def analyze_post_multi(self, text: str, filters_configs: Dict[str, dict]) -> Dict[str, Any]:
+        return await self._call("analyze_post_multi", text, filters_configs)
+
+    async def analyze_batch(self, texts: List[str], filters_config: dict) -> List[Optional[Dict[str, Any]]]:
+        return await self._call("analyze_batch", texts, filters_config)
+
+    async def _attempt(self, backend: Any, method: str, args) -> Any:
+        stats = self.stats[id(backend)]
+        breaker = get_circuit_breaker(backend)
+        stats.in_flight += 1
+        started = time.monotonic()
+        try:
+            result = await getattr(backend, method)(*args)
+        except asyncio.CancelledError:
+            # Проигравший хедж - не ошибка бэкенда; прошедшее время - нижняя оценка его задержки
+            stats.record(time.monotonic() - started, False)
+            breaker.release()
+            raise
+        except AIRequestError:
+            # Ошибка самого запроса, а не бэкенда - не портим оценку
+            breaker.release()
+            raise
+        except AIRateLimitError:
+            # Исчерпанный лимит понижает оценку, но предохранитель не трогает
+            stats.record(None, True)
+            breaker.release()
+            raise
+        except Exception:
+            stats.record(None, True)
+            breaker.record_failure()
+            raise
+        finally:
+            stats.in_flight -= 1
+        stats.record(time.monotonic() - started, False)
+        breaker.record_success()
+
+        name = self.backend_name(backend)
+        if hasattr(result, "tier"):
+            result.tier = name
+        for item in (result if isinstance(result, list) else [result]):
+            if isinstance(item, dict):
+                item["tier"] = name
+        return result
+
+    async def _call(self, method: str, *args) -> Any:
+        candidates = self.ranked()
+        tasks: Dict[asyncio.Task, Any] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> Optional[asyncio.Task]:
+            # Первый кандидат, чей предохранитель пропускает запрос (бэкенды за открытым - пропускаются)
+            while candidates:
+                backend = candidates.pop(0)
+                if get_circuit_breaker(backend).allow():
+                    task = asyncio.create_task(self._attempt(backend, method, args))
+                    tasks[task] = backend
+                    return task
+            return None
+
+        if launch() is None:
+            raise AIUnavailableError("all AI backends are behind open circuit breakers")
+        hedges = set()
+        try:
+            while tasks:
+                hedge_possible = self.hedge and candidates and len(tasks) == 1
+                timeout = self.hedge_delay(next(iter(tasks.values()))) if hedge_possible else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Бэкенд отвечает дольше своего p95 - дублируем запрос на следующий
+                    hedge = launch()
+                    if hedge is not None:
+                        self.hedged += 1
+                        hedges.add(hedge)
+                    continue
+
+                for task in done:
+                    backend = tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if task in hedges:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = error
+                    logger.warning(f"AI backend {self.backend_name(backend)} failed: {error}")
+
+                if not tasks and candidates and isinstance(last_error, AIError):
+                    # Отказ - сразу пробуем следующий бэкенд
+                    launch()
+        finally:
+            await self._cancel(tasks)
+
+        raise last_error or AIUnavailableError("all AI backends are behind open circuit breakers")
+
+    @staticmethod
+    async def _cancel(tasks: Dict[asyncio.Task, Any]):
+        """Отмена проигравших запросов (потоковый ответ, успевший начаться, закрывается)"""
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if hasattr(result, "cancel") and not isinstance(result, BaseException):
+                await result.cancel()
+
+    async def health_check(self) -> bool:
+        results = await asyncio.gather(*(b.health_check() for b in self.backends), return_exceptions=True)
+        return any(r is True for r in results)
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+
+def load_router_config(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Конфигурация маршрутизатора из YAML (None, если файла нет)"""
+    path = path or AI_CONFIG_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
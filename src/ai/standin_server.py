@@ -0,0 +1,220 @@
+"""
+Локальная замена OpenAI-совместимого API для тестов без сети.
+
+Имитирует задержку ответа и генерации (в том числе потоковой, SSE), лимит контекста, лимиты запросов/токенов в минуту (429
+с заголовками x-ratelimit-*) и случайные ошибки 5xx. Вердикт строится той же
+эвристикой по ключевым словам, что и MockAIClient.
+
+Запуск:
+    python -m src.ai.standin_server --port 8001 --latency-ms 300 --token-ms 20 --error-rate 0.05
+    AI_PROVIDER=local python src/main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from .client import MockAIClient
+
+_TEXT_RE = re.compile(r'"""(.*?)"""', re.DOTALL)
+_CATEGORIES_RE = re.compile(r"Доступные категории:\s*(.*)")
+_FILTER_RE = re.compile(r'### Фильтр "(.+?)"')
+_POST_RE = re.compile(r"### Пост (\d+)")
+
+
+class StandinSettings:
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, rpm: int = 30, tpm: int = 6000, max_context_tokens: int = 8192,
+                 token_ms: float = 0.0):
+        self.latency_ms = latency_ms  # Задержка до первого токена
+        self.token_ms = token_ms  # Время генерации одного токена ответа
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate  # Доля случайных 5xx
+        self.rate_limit_rate = rate_limit_rate  # Доля случайных 429 (сверх настоящих лимитов)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_context_tokens = max_context_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def simulate_completion(prompt: str) -> Dict[str, Any]:
+    """Строит JSON-ответ модели по промпту (одиночный, мульти-фильтр или пакет постов)"""
+    posts = _POST_RE.findall(prompt)
+    if posts:
+        cats = _CATEGORIES_RE.search(prompt)
+        config = {"categories": [c.strip() for c in cats.group(1).split(",") if c.strip()] if cats else []}
+        return {"results": [
+            {"index": int(index), **MockAIClient._mock_verdict(text, config)}
+            for index, text in zip(posts, _TEXT_RE.findall(prompt))
+        ]}
+
+    match = _TEXT_RE.search(prompt)
+    text = match.group(1) if match else prompt
+
+    filter_ids = _FILTER_RE.findall(prompt)
+    categories = [
+        [c.strip() for c in line.split(",") if c.strip()]
+        for line in _CATEGORIES_RE.findall(prompt)
+    ]
+
+    if filter_ids:
+        return {
+            filter_id: MockAIClient._mock_verdict(text, {"categories": cats})
+            for filter_id, cats in zip(filter_ids, categories)
+        }
+    return MockAIClient._mock_verdict(text, {"categories": categories[0] if categories else []})
+
+
+def create_app(settings: StandinSettings) -> FastAPI:
+    app = FastAPI(title="AI stand-in server")
+    # Окна последней минуты: (время, токены)
+    window: Deque[Tuple[float, int]] = deque()
+
+    def budget_headers(now: float) -> Dict[str, str]:
+        while window and now - window[0][0] > 60:
+            window.popleft()
+        used_tokens = sum(tokens for _, tokens in window)
+        reset = 60 - (now - window[0][0]) if window else 0.0
+        return {
+            "x-ratelimit-limit-requests": str(settings.rpm),
+            "x-ratelimit-remaining-requests": str(max(0, settings.rpm - len(window))),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+            "x-ratelimit-limit-tokens": str(settings.tpm),
+            "x-ratelimit-remaining-tokens": str(max(0, settings.tpm - used_tokens)),
+            "x-ratelimit-reset-tokens": f"{reset:.2f}s",
+        }
+
+    def error(status: int, message: str, headers: Dict[str, str]) -> JSONResponse:
+        return JSONResponse({"error": {"message": message, "type": "standin_error"}}, status_code=status,
+                            headers=headers)
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "standin", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages: List[Dict[str, str]] = body.get("messages", [])
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        prompt_tokens = estimate_tokens(prompt)
+        max_tokens = int(body.get("max_tokens") or 300)
+
+        now = time.monotonic()
+        headers = budget_headers(now)
+
+        if prompt_tokens + max_tokens > settings.max_context_tokens:
+            return error(400, f"Context length exceeded: {prompt_tokens + max_tokens} > "
+                              f"{settings.max_context_tokens}", headers)
+
+        used_tokens = settings.tpm - int(headers["x-ratelimit-remaining-tokens"])
+        over_limit = len(window) >= settings.rpm or used_tokens + prompt_tokens > settings.tpm
+        if over_limit or random.random() < settings.rate_limit_rate:
+            retry_after = float(headers["x-ratelimit-reset-requests"].rstrip("s")) or 1.0
+            return error(429, "Rate limit reached", {**headers, "retry-after": f"{retry_after:.0f}"})
+
+        window.append((now, prompt_tokens + max_tokens))
+
+        delay = max(0.0, settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if random.random() < settings.error_rate:
+            return error(random.choice([500, 502, 503]), "Simulated upstream failure", headers)
+
+        content = json.dumps(simulate_completion(prompt), ensure_ascii=False)
+        completion_tokens = min(estimate_tokens(content), max_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "standin")
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                stream_completion(completion_id, model, content, usage if include_usage else None),
+                media_type="text/event-stream",
+                headers=budget_headers(time.monotonic())
+            )
+
+        await asyncio.sleep(completion_tokens * settings.token_ms / 1000)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }, headers=budget_headers(time.monotonic()))
+
+    async def stream_completion(completion_id: str, model: str, content: str, usage: Dict[str, int] = None):
+        """SSE поток в формате OpenAI: один чанк на ~4 символа (токен) ответа"""
+        def event(delta: Dict[str, Any], finish_reason: str = None, **extra) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra
+            }
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+        yield event({"role": "assistant", "content": ""})
+        for i in range(0, len(content), 4):
+            await asyncio.sleep(settings.token_ms / 1000)
+            yield event({"content": content[i:i + 4]})
+        yield event({}, "stop")
+        if usage:
+            yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--token-ms", type=float, default=0, help="Время генерации одного токена ответа")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Доля случайных ответов 429")
+    parser.add_argument("--rpm", type=int, default=30, help="Лимит запросов в минуту")
+    parser.add_argument("--tpm", type=int, default=6000, help="Лимит токенов в минуту")
+    parser.add_argument("--max-context", type=int, default=8192, help="Размер контекста в токенах")
+    args = parser.parse_args()
+
+    settings = StandinSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_context_tokens=args.max_context,
+        token_ms=args.token_ms,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
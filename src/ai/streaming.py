@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from .errors import AIResponseError
+from .tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """
+    Разбор плоского JSON объекта по мере поступления текста.
+
+    После каждого feed() в fields лежат все поля верхнего уровня, значения которых
+    уже получены целиком. Текст до первой '{' (например, ```json) пропускается.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Добавляет фрагмент ответа, возвращает поля, завершенные этим фрагментом"""
+        self.buffer += chunk
+        new_fields = {}
+
+        if not self._started:
+            start = self.buffer.find("{", self._pos)
+            if start < 0:
+                self._pos = len(self.buffer)
+                return new_fields
+            self._pos = start + 1
+            self._started = True
+
+        while not self.complete:
+            parsed = self._next_field()
+            if parsed is None:
+                break
+            key, value = parsed
+            self.fields[key] = value
+            new_fields[key] = value
+
+        return new_fields
+
+    def _skip_whitespace(self, pos: int) -> int:
+        while pos < len(self.buffer) and self.buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _next_field(self) -> Optional[Tuple[str, Any]]:
+        """Очередная пара ключ-значение, если она уже пришла полностью"""
+        pos = self._skip_whitespace(self._pos)
+        if pos < len(self.buffer) and self.buffer[pos] == "}":
+            self.complete = True
+            self._pos = pos + 1
+            return None
+
+        try:
+            key, pos = self._decoder.raw_decode(self.buffer, pos)
+            pos = self._skip_whitespace(pos)
+            if pos >= len(self.buffer):
+                return None
+            if self.buffer[pos] != ":":
+                raise AIResponseError(f"Malformed JSON stream near {self.buffer[pos:pos + 20]!r}")
+            pos = self._skip_whitespace(pos + 1)
+            value, end = self._decoder.raw_decode(self.buffer, pos)
+        except json.JSONDecodeError:
+            return None  # Значение еще не дошло
+
+        # Число или литерал считаются полными только после разделителя ("0." -> "0.85")
+        after = self._skip_whitespace(end)
+        scalar = not isinstance(value, (str, dict, list))
+        if after >= len(self.buffer):
+            if scalar:
+                return None
+        elif self.buffer[after] == ",":
+            after += 1
+        elif self.buffer[after] != "}":
+            if scalar:
+                return None
+            raise AIResponseError(f"Malformed JSON stream near {self.buffer[after:after + 20]!r}")
+
+        self._pos = after
+        if not isinstance(key, str):
+            raise AIResponseError(f"Non-string JSON key: {key!r}")
+        return key, value
+
+
+class StreamedCompletion:
+    """
+    Ответ модели, получаемый потоком.
+
+    decision() возвращается, как только пришли все поля required (остальной ответ,
+    например reason, продолжает приходить в фоне); result() - полный ответ;
+    cancel() обрывает генерацию, когда остаток ответа не нужен.
+    """
+
+    def __init__(self, chunks: AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]],
+                 required: Tuple[str, ...], prompt_tokens: int = 0):
+        self.required = required
+        self.prompt_tokens = prompt_tokens
+        self.parser = IncrementalJSONParser()
+        self.provider_usage: Optional[Dict[str, Any]] = None
+        self.tier: Optional[str] = None
+        self._decided = asyncio.Event()
+        self._task = asyncio.create_task(self._consume(chunks))
+
+    @property
+    def decisive(self) -> bool:
+        return all(field in self.parser.fields for field in self.required)
+
+    @property
+    def usage(self) -> Dict[str, Any]:
+        """Usage от провайдера, а для оборванного потока - оценка по полученному тексту"""
+        if self.provider_usage:
+            return self.provider_usage
+        completion_tokens = count_tokens(self.parser.buffer)
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": self.prompt_tokens + completion_tokens
+        }
+
+    async def _consume(self, chunks) -> Dict[str, Any]:
+        try:
+            async for delta, usage in chunks:
+                if usage:
+                    self.provider_usage = usage
+                if delta:
+                    self.parser.feed(delta)
+                    if not self._decided.is_set() and self.decisive:
+                        self._decided.set()
+        finally:
+            self._decided.set()
+        return self._final()
+
+    def _final(self) -> Dict[str, Any]:
+        if not self.parser.fields:
+            raise AIResponseError(f"Model returned no JSON object: {self.parser.buffer[:200]!r}")
+        result = dict(self.parser.fields)
+        result["usage"] = self.usage
+        return result
+
+    async def decision(self) -> Dict[str, Any]:
+        """Решающие поля ответа (ошибка потока до их получения пробрасывается)"""
+        await self._decided.wait()
+        if not self.decisive:
+            # Поток закончился (или упал) раньше - ответ берется целиком
+            return await self._task
+        return dict(self.parser.fields)
+
+    async def result(self) -> Dict[str, Any]:
+        return await self._task
+
+    async def cancel(self):
+        """Обрыв генерации (соединение закрывается, провайдер перестает генерировать)"""
+        if not self._task.done():
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
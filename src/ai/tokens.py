@@ -0,0 +1,132 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Бюджет токенов на текст поста по умолчанию (фильтр может задать свой, 0 - без обрезки)
+AI_TEXT_TOKEN_BUDGET = int(os.getenv("AI_TEXT_TOKEN_BUDGET", 1500))
+
+try:
+    import tiktoken
+except ImportError:  # Необязательная зависимость: без нее используется оценка по символам
+    tiktoken = None
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_MARKDOWN_HEADLINE_RE = re.compile(r"^\s*(#{1,6}\s+|\*\*.+\*\*\s*$|__.+__\s*$)")
+ELLIPSIS = "\n[...]\n"
+
+# Доли бюджета при обрезке: начало, конец, заголовки и ссылки из середины
+HEAD_SHARE = 0.6
+TAIL_SHARE = 0.25
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, using character estimate: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Количество токенов в тексте: точно через tiktoken (если установлен),
+    иначе оценка ~4 символа на токен для латиницы и ~2.5 для остальных алфавитов
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 2.5) + 1
+
+
+def _cut_head(text: str, budget: int) -> str:
+    """Наибольшее начало текста не длиннее budget токенов (с границей по слову)"""
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    head = text[:low]
+    space = head.rfind(" ")
+    return head[:space] if space > low // 2 else head
+
+
+def _cut_tail(text: str, budget: int) -> str:
+    """Наибольший конец текста не длиннее budget токенов (с границей по слову)"""
+    return _cut_head(text[::-1], budget)[::-1]
+
+
+def _is_headline(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 120:
+        return False
+    if _MARKDOWN_HEADLINE_RE.match(line):
+        return True
+    letters = [ch for ch in line if ch.isalpha()]
+    # Строка капсом или короткая строка без точки в конце
+    return bool(letters) and (line.isupper() or (len(line) <= 80 and line[-1] not in ".,;:!?…)"))
+
+
+def extract_highlights(text: str) -> List[str]:
+    """Заголовки и ссылки из текста (в порядке появления, без повторов)"""
+    highlights = []
+    seen = set()
+    for line in text.splitlines():
+        # Ссылки внутри строки-заголовка уже попадают в нее
+        candidates = [line.strip()] if _is_headline(line) else _URL_RE.findall(line)
+        for candidate in candidates:
+            if candidate not in seen:
+                seen.add(candidate)
+                highlights.append(candidate)
+    return highlights
+
+
+def truncate_text(text: str, budget: Optional[int] = None) -> str:
+    """
+    Укладывает текст поста в budget токенов.
+
+    Сохраняются начало (HEAD_SHARE бюджета) и конец (TAIL_SHARE) текста, а в оставшуюся
+    часть - заголовки и ссылки из вырезанной середины. budget=None - бюджет по умолчанию,
+    budget=0 - без обрезки.
+    """
+    budget = AI_TEXT_TOKEN_BUDGET if budget is None else budget
+    if budget <= 0 or count_tokens(text) <= budget:
+        return text
+
+    separators = 2 * count_tokens(ELLIPSIS)
+    available = max(1, budget - separators)
+    head = _cut_head(text, int(available * HEAD_SHARE))
+    tail = _cut_tail(text[len(head):], int(available * TAIL_SHARE))
+    middle = text[len(head):len(text) - len(tail)]
+
+    highlights_budget = available - count_tokens(head) - count_tokens(tail)
+    kept = []
+    for highlight in extract_highlights(middle):
+        cost = count_tokens(highlight) + 1
+        if cost > highlights_budget:
+            break
+        kept.append(highlight)
+        highlights_budget -= cost
+
+    parts = [head.rstrip()]
+    if kept:
+        parts.append("\n".join(kept))
+    parts.append(tail.lstrip())
+    return ELLIPSIS.join(parts)
@@ -3,7 +3,7 @@ import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from ..storage.cache import cache
-from .routes import filters, sources
+from .routes import filters, shadows, sources
 from ..core.coordinator import Coordinator
 from ..config.loader import ConfigLoader
 
@@ -58,6 +58,7 @@ app = FastAPI(
 # Подключаем роуты
 app.include_router(filters.router, prefix="/api/v1")
 app.include_router(sources.router, prefix="/api/v1")
+app.include_router(shadows.router, prefix="/api/v1")
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from ...storage.database import get_db
+from ...storage.models import FilterShadow
+from ...storage.repositories.filters import FilterRepository
+from ...storage.repositories.filter_shadows import FilterShadowRepository
+from ...filters.shadow import compare
+from ..schemas import ShadowCreate, ShadowResponse, ShadowUpdate
+
+router = APIRouter(prefix="/filters/{filter_id}/shadows", tags=["shadows"])
+
+def _to_response(shadow: FilterShadow) -> ShadowResponse:
+    """Теневая версия со сравнением с живой версией фильтра"""
+    return ShadowResponse(
+        id=shadow.id,
+        filter_id=shadow.filter_id,
+        name=shadow.name,
+        prompt=shadow.prompt,
+        model=shadow.model,
+        sample_rate=shadow.sample_rate,
+        enabled=shadow.enabled,
+        created_at=shadow.created_at,
+        comparison=compare(shadow)
+    )
+
+async def _get_shadow(repo: FilterShadowRepository, filter_id: str, shadow_id: int) -> FilterShadow:
+    shadow = await repo.get(shadow_id)
+    if not shadow or shadow.filter_id != filter_id:
+        raise HTTPException(status_code=404, detail="Shadow version not found")
+    return shadow
+
+@router.post("/", response_model=ShadowResponse, status_code=status.HTTP_201_CREATED)
+async def create_shadow(filter_id: str, shadow_data: ShadowCreate, db: AsyncSession = Depends(get_db)):
+    if not await FilterRepository(db).get_by_id(filter_id):
+        raise HTTPException(status_code=404, detail="Filter not found")
+    if not shadow_data.prompt and not shadow_data.model:
+        raise HTTPException(status_code=400, detail="Shadow version must change the prompt or the model")
+    
+    shadow = await FilterShadowRepository(db).create({"filter_id": filter_id, **shadow_data.model_dump()})
+    return _to_response(shadow)
+
+@router.get("/", response_model=List[ShadowResponse])
+async def list_shadows(filter_id: str, db: AsyncSession = Depends(get_db)):
+    """Теневые версии фильтра со сравнением: согласие решений, задержка и токены относительно живой версии"""
+    return [_to_response(s) for s in await FilterShadowRepository(db).list_by_filter(filter_id)]
+
+@router.get("/{shadow_id}", response_model=ShadowResponse)
+async def get_shadow(filter_id: str, shadow_id: int, db: AsyncSession = Depends(get_db)):
+    return _to_response(await _get_shadow(FilterShadowRepository(db), filter_id, shadow_id))
+
+@router.put("/{shadow_id}", response_model=ShadowResponse)
+async def update_shadow(filter_id: str, shadow_id: int, shadow_data: ShadowUpdate, db: AsyncSession = Depends(get_db)):
+    repo = FilterShadowRepository(db)
+    await _get_shadow(repo, filter_id, shadow_id)
+    # Смена промпта или модели обнуляет накопленное сравнение
+    updated = await repo.update(shadow_id, shadow_data.model_dump(exclude_unset=True))
+    return _to_response(updated)
+
+@router.delete("/{shadow_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_shadow(filter_id: str, shadow_id: int, db: AsyncSession = Depends(get_db)):
+    repo = FilterShadowRepository(db)
+    await _get_shadow(repo, filter_id, shadow_id)
+    await repo.delete(shadow_id)
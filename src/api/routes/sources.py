@@ -25,18 +25,18 @@ async def list_sources(db: AsyncSession = Depends(get_db)):
 @router.put("/{source_id}", response_model=SourceResponse)
 async def update_source(source_id: int, source_data: SourceUpdate, db: AsyncSession = Depends(get_db)):
     repo = SourceRepository(db)
-    # Здесь упрощенная логика, в реальности нужно обрабатывать обновление фильтров отдельно или здесь же
-    # Пока реализуем только обновление фильтров если они переданы
-    if source_data.filter_ids is not None:
-        updated = await repo.update_filters(source_id, source_data.filter_ids)
+    update_data = source_data.model_dump(exclude_unset=True)
+    filter_ids = update_data.pop("filter_ids", None)
+    
+    updated = None
+    if update_data:
+        updated = await repo.update(source_id, update_data)
         if not updated:
             raise HTTPException(status_code=404, detail="Source not found")
-        return updated
-        
-    # TODO: Реализовать обновление остальных полей
-    raise HTTPException(status_code=501, detail="Update of other fields not implemented yet")
-
-
-
-
-
+    if filter_ids is not None:
+        updated = await repo.update_filters(source_id, filter_ids)
+        if not updated:
+            raise HTTPException(status_code=404, detail="Source not found")
+    if updated is None:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    return updated
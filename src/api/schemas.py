@@ -9,6 +9,10 @@ class FilterBase(BaseModel):
     categories: List[str]
     threshold: float = 0.7
     enabled: bool = True
+    priority: Optional[int] = None
+    max_text_tokens: Optional[int] = Field(None, ge=0)
+    keywords: Optional[List[str]] = None
+    daily_token_budget: Optional[int] = Field(None, ge=0)
 
 class FilterCreate(FilterBase):
     pass
@@ -19,6 +23,10 @@ class FilterUpdate(BaseModel):
     categories: Optional[List[str]] = None
     threshold: Optional[float] = None
     enabled: Optional[bool] = None
+    priority: Optional[int] = None
+    max_text_tokens: Optional[int] = Field(None, ge=0)
+    keywords: Optional[List[str]] = None
+    daily_token_budget: Optional[int] = Field(None, ge=0)
 
 class FilterResponse(FilterBase):
     created_at: datetime
@@ -33,6 +41,7 @@ class SourceBase(BaseModel):
     name: Optional[str] = None
     enabled: bool = True
     check_interval: int = 60
+    priority: int = 0
 
 class SourceCreate(SourceBase):
     filter_ids: List[str] = []
@@ -41,6 +50,7 @@ class SourceUpdate(BaseModel):
     name: Optional[str] = None
     enabled: Optional[bool] = None
     check_interval: Optional[int] = None
+    priority: Optional[int] = None
     filter_ids: Optional[List[str]] = None
 
 class SourceResponse(SourceBase):
@@ -51,7 +61,38 @@ class SourceResponse(SourceBase):
     class Config:
         from_attributes = True
 
+class ShadowBase(BaseModel):
+    name: Optional[str] = None
+    prompt: Optional[str] = None
+    model: Optional[str] = Field(None, pattern="^[a-z0-9_-]+:.+$")
+    sample_rate: float = Field(0.1, ge=0.0, le=1.0)
+    enabled: bool = True
 
+class ShadowCreate(ShadowBase):
+    pass
 
+class ShadowUpdate(BaseModel):
+    name: Optional[str] = None
+    prompt: Optional[str] = None
+    model: Optional[str] = Field(None, pattern="^[a-z0-9_-]+:.+$")
+    sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0)
+    enabled: Optional[bool] = None
 
+class ShadowComparison(BaseModel):
+    evaluations: float
+    agreement: Optional[float] = None
+    live_accept_rate: Optional[float] = None
+    shadow_accept_rate: Optional[float] = None
+    live_latency: Optional[float] = None
+    shadow_latency: Optional[float] = None
+    live_tokens: Optional[float] = None
+    shadow_tokens: Optional[float] = None
+    token_ratio: Optional[float] = None
+    latency_ratio: Optional[float] = None
+    errors: float = 0.0
 
+class ShadowResponse(ShadowBase):
+    id: int
+    filter_id: str
+    created_at: datetime
+    comparison: ShadowComparison
@@ -21,6 +21,22 @@ class ConfigLoader:
         with open(path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
 
+    @staticmethod
+    def filter_fields(filter_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Поля модели Filter из описания фильтра в YAML"""
+        return {
+            "id": filter_data["id"],
+            "name": filter_data["name"],
+            "prompt": filter_data["prompt"],
+            "categories": filter_data["categories"],
+            "threshold": filter_data.get("threshold", 0.7),
+            "enabled": filter_data.get("enabled", True),
+            "priority": filter_data.get("priority"),
+            "max_text_tokens": filter_data.get("max_text_tokens"),
+            "keywords": filter_data.get("keywords"),
+            "daily_token_budget": filter_data.get("daily_token_budget")
+        }
+
     async def sync_filters(self):
         """Синхронизация фильтров из YAML в БД"""
         data = self.load_yaml("filters.yaml")
@@ -33,14 +49,7 @@ class ConfigLoader:
             for filter_data in data["filters"]:
                 existing = await repo.get_by_id(filter_data["id"])
                 
-                filter_obj = {
-                    "id": filter_data["id"],
-                    "name": filter_data["name"],
-                    "prompt": filter_data["prompt"],
-                    "categories": filter_data["categories"],
-                    "threshold": filter_data.get("threshold", 0.7),
-                    "enabled": filter_data.get("enabled", True)
-                }
+                filter_obj = self.filter_fields(filter_data)
                 
                 if existing:
                     await repo.update(filter_data["id"], filter_obj)
@@ -81,6 +90,7 @@ class ConfigLoader:
             "name": data.get("name"),
             "enabled": data.get("enabled", True),
             "check_interval": data.get("check_interval", 60),
+            "priority": data.get("priority", 0),
             "filter_ids": data.get("filters", [])
         }
         
@@ -89,6 +99,9 @@ class ConfigLoader:
             await repo.create(source_obj)
             logger.info(f"Created source: {source_id}")
         else:
+            if existing.priority != source_obj["priority"]:
+                await repo.update(existing.id, {"priority": source_obj["priority"]})
+                logger.info(f"Updated source priority: {source_id}")
             # Обновляем фильтры
             if "filters" in data:
                 await repo.update_filters(existing.id, data["filters"])
@@ -1,46 +1,255 @@
 import asyncio
 import logging
+import os
 from typing import List
 from ..providers.telegram.client import TelegramProvider
 from ..providers.vk.client import VKProvider
-from ..ai.client import AIClient
-from ..filters.engine import FilterEngine
+from ..ai.client import create_ai_client, create_economy_client
+from ..ai.router import AIRouter
+from ..filters.engine import FilterEngine, FiltersUnavailableError
 from ..storage.database import async_session_maker
 from .processor import PostProcessor
 from .forwarder import Forwarder
+from .post import Post
 from ..storage.repositories.sources import SourceRepository
+from ..storage.repositories.filter_stats import FilterStatsRepository
+from ..storage.repositories.ai_spend import AISpendRepository
+from ..storage.repositories.filter_shadows import FilterShadowRepository
+from ..storage.repositories.source_cursors import SourceCursorRepository
 
 logger = logging.getLogger(__name__)
 
+# Как часто сохранять статистику фильтров в БД (в секундах)
+FILTER_STATS_FLUSH_INTERVAL = int(os.getenv("FILTER_STATS_FLUSH_INTERVAL", 300))
+# Как часто выводить отчет о дрейфе локальных классификаторов (в секундах)
+LOCAL_CLASSIFIER_REPORT_INTERVAL = int(os.getenv("LOCAL_CLASSIFIER_REPORT_INTERVAL", 3600))
+# Повторная обработка постов, которые не удалось проверить из-за недоступности AI
+POST_RETRY_ATTEMPTS = int(os.getenv("POST_RETRY_ATTEMPTS", 5))
+POST_RETRY_DELAY = float(os.getenv("POST_RETRY_DELAY", 60))
+# Как часто подхватывать теневые версии фильтров и сохранять их сравнение (в секундах)
+SHADOW_SYNC_INTERVAL = int(os.getenv("SHADOW_SYNC_INTERVAL", 60))
+# Как часто подхватывать добавленные/удаленные Telegram-источники без перезапуска (в секундах)
+SOURCE_SYNC_INTERVAL = int(os.getenv("SOURCE_SYNC_INTERVAL", 60))
+
 class Coordinator:
     def __init__(self):
         # Инициализация компонентов
         self.telegram = TelegramProvider()
         self.vk = VKProvider()
         
-        # AI клиент (заглушка пока что)
-        self.ai_client = AIClient()
-        self.filter_engine = FilterEngine(self.ai_client)
+        # AI клиент (провайдер из AI_PROVIDER, без ключа - заглушка)
+        self.ai_client = create_ai_client()
+        # Дешевая модель для ступени economy дневного бюджета (AI_ECONOMY_MODEL)
+        self.economy_client = create_economy_client(self.ai_client)
+        self.filter_engine = FilterEngine(self.ai_client, economy_client=self.economy_client)
         
         self.forwarder = Forwarder(self.telegram, self.vk)
         
         self.is_running = False
+        self._stats_task = None
+        self._classifier_task = None
+        self._shadow_task = None
+        self._source_task = None
+        self._retry_tasks = set()
+
+    async def _load_filter_stats(self):
+        """Загрузка статистики фильтров (порядок проверки переживает перезапуск)"""
+        try:
+            async with async_session_maker() as session:
+                records = await FilterStatsRepository(session).list_all()
+            self.filter_engine.stats.restore({
+                r.filter_id: {
+                    "evaluations": r.evaluations,
+                    "matches": r.matches,
+                    "total_latency": r.total_latency,
+                    "total_tokens": r.total_tokens
+                }
+                for r in records
+            })
+            logger.info(f"Loaded statistics for {len(records)} filters")
+        except Exception as e:
+            logger.error(f"Failed to load filter statistics: {e}")
+
+    async def _load_ai_spend(self):
+        """Загрузка расхода AI за текущие сутки (бюджет переживает перезапуск)"""
+        budget = self.filter_engine.budget
+        try:
+            async with async_session_maker() as session:
+                spend = await AISpendRepository(session).get_day(budget.today())
+            budget.restore(budget.today(), spend)
+            if budget.enabled:
+                logger.info(f"AI budget: {budget.used:.0%} of daily budget used, "
+                            f"level {budget.level.name.lower()}")
+        except Exception as e:
+            logger.error(f"Failed to load AI spend: {e}")
+
+    async def _flush_ai_spend(self):
+        """Сохранение расхода AI за сутки в БД"""
+        day, dirty = self.filter_engine.budget.pop_dirty()
+        if not dirty:
+            return
+        try:
+            async with async_session_maker() as session:
+                await AISpendRepository(session).save_many(day, dirty)
+        except Exception as e:
+            logger.error(f"Failed to save AI spend: {e}")
+            self.filter_engine.budget.mark_dirty(day, dirty)
+
+    async def _load_cursors(self):
+        """Загрузка курсоров источников (догрузка постов, пропущенных во время простоя)"""
+        try:
+            async with async_session_maker() as session:
+                repo = SourceCursorRepository(session)
+                for source_type, provider in self._cursor_providers():
+                    cursors = await repo.get_all(source_type)
+                    provider.cursors.restore(cursors)
+                    logger.info(f"Loaded cursors for {len(cursors)} {source_type} sources")
+        except Exception as e:
+            logger.error(f"Failed to load source cursors: {e}")
+
+    async def _flush_cursors(self):
+        """Сохранение изменившихся курсоров источников в БД"""
+        for source_type, provider in self._cursor_providers():
+            dirty = provider.cursors.pop_dirty()
+            if not dirty:
+                continue
+            try:
+                async with async_session_maker() as session:
+                    await SourceCursorRepository(session).save_many(source_type, dirty)
+            except Exception as e:
+                logger.error(f"Failed to save {source_type} source cursors: {e}")
+                provider.cursors.mark_dirty(dirty)
+
+    def _cursor_providers(self):
+        return (("telegram", self.telegram), ("vk", self.vk))
+
+    async def _flush_filter_stats(self):
+        """Сохранение изменившейся статистики фильтров в БД"""
+        dirty = self.filter_engine.stats.pop_dirty()
+        if not dirty:
+            return
+        try:
+            async with async_session_maker() as session:
+                await FilterStatsRepository(session).save_many(dirty)
+        except Exception as e:
+            logger.error(f"Failed to save filter statistics: {e}")
+            self.filter_engine.stats.mark_dirty(dirty)
+
+    async def _stats_flush_loop(self):
+        while self.is_running:
+            await asyncio.sleep(FILTER_STATS_FLUSH_INTERVAL)
+            await self._flush_filter_stats()
+            await self._flush_ai_spend()
+            await self._flush_cursors()
+            budget = self.filter_engine.budget
+            if budget.enabled:
+                logger.info(f"AI spend today: {budget.total.tokens:.0f} tokens, ${budget.total.cost:.4f} "
+                            f"({budget.used:.0%} of budget, level {budget.level.name.lower()})")
+            for tier in getattr(self.ai_client, "tiers", []):
+                if isinstance(tier, AIRouter):
+                    logger.info(f"AI router: {tier.report()} (hedged {tier.hedged}, hedge wins {tier.hedge_wins})")
+
+    async def _sync_shadows(self):
+        """Сохранение сравнения теневых версий и подхват изменившихся версий из БД"""
+        shadows = self.filter_engine.shadows
+        stats = shadows.pop_stats()
+        try:
+            async with async_session_maker() as session:
+                repo = FilterShadowRepository(session)
+                await repo.add_stats(stats)
+                stats = {}
+                shadows.load(await repo.list_enabled())
+        except Exception as e:
+            logger.error(f"Failed to sync shadow filter versions: {e}")
+            shadows.restore_stats(stats)
 
-    async def _handle_new_post(self, post_data: dict):
+    async def _shadow_sync_loop(self):
+        while self.is_running:
+            await asyncio.sleep(SHADOW_SYNC_INTERVAL)
+            await self._sync_shadows()
+            if self.filter_engine.shadows.skipped:
+                logger.info(f"Shadow evaluations skipped (backlog full): {self.filter_engine.shadows.skipped}")
+
+    async def _source_sync_loop(self):
+        """Изменения источников в БД (API, конфигурация) применяются без перезапуска"""
+        while self.is_running:
+            await asyncio.sleep(SOURCE_SYNC_INTERVAL)
+            try:
+                async with async_session_maker() as session:
+                    sources = await SourceRepository(session).list_enabled()
+                tg_channels = [s.source_id for s in sources if s.type == 'telegram']
+                vk_intervals = {s.source_id: s.check_interval for s in sources if s.type == 'vk'}
+                if self.telegram.is_monitoring:
+                    await self.telegram.set_channels(tg_channels)
+                elif tg_channels:
+                    await self.telegram.monitor_channels(tg_channels, self._handle_new_post)
+                if self.vk.is_monitoring:
+                    await self.vk.set_channels(vk_intervals)
+                elif vk_intervals:
+                    await self.vk.monitor_channels(list(vk_intervals), self._handle_new_post, vk_intervals)
+            except Exception as e:
+                logger.error(f"Failed to sync sources: {e}")
+
+    async def _classifier_report_loop(self):
+        """Периодический отчет о работе локальных классификаторов и подхват переобученных моделей"""
+        classifiers = self.filter_engine.classifiers
+        while self.is_running:
+            await asyncio.sleep(LOCAL_CLASSIFIER_REPORT_INTERVAL)
+            report = classifiers.monitor.report()
+            for filter_id, row in report.items():
+                logger.info(f"Local classifier drift report [{filter_id}]: {row}")
+                agreement = row["audit_agreement"]
+                if agreement is not None and agreement < classifiers.min_agreement:
+                    logger.warning(
+                        f"Local classifier for {filter_id} agrees with LLM only in {agreement:.0%} of audits, "
+                        f"consider retraining: python -m src.filters.train_classifier -f {filter_id}"
+                    )
+            classifiers.monitor.reset()
+            classifiers.reload()
+
+    async def _handle_new_post(self, post: Post, attempt: int = 0):
         """Callback для новых постов от провайдеров"""
         # Создаем новую сессию для каждого запроса
         async with async_session_maker() as session:
             processor = PostProcessor(session, self.filter_engine, self.forwarder)
             try:
-                await processor.process_post(post_data)
+                await processor.process_post(post)
+            except FiltersUnavailableError as e:
+                self._schedule_retry(post, attempt, e)
             except Exception as e:
                 logger.exception(f"Error processing post: {e}")
 
+    def _schedule_retry(self, post: Post, attempt: int, error: Exception):
+        """Откладывает пост, который не удалось проверить, вместо того чтобы считать его отклоненным"""
+        post_ref = f"{post.source_id}/{post.post_id}"
+        if attempt >= POST_RETRY_ATTEMPTS or not self.is_running:
+            logger.error(f"Giving up on post {post_ref} after {attempt + 1} attempts: {error}")
+            return
+        
+        delay = POST_RETRY_DELAY * (2 ** attempt)
+        logger.warning(f"Post {post_ref} not evaluated ({error}), retrying in {delay:.0f}s")
+        
+        async def retry():
+            await asyncio.sleep(delay)
+            await self._handle_new_post(post, attempt + 1)
+        
+        task = asyncio.create_task(retry())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
     async def start(self):
         """Запуск всей системы"""
         self.is_running = True
         logger.info("Starting Coordinator...")
         
+        await self._load_filter_stats()
+        await self._load_ai_spend()
+        await self._sync_shadows()
+        self._stats_task = asyncio.create_task(self._stats_flush_loop())
+        self._shadow_task = asyncio.create_task(self._shadow_sync_loop())
+        if self.filter_engine.classifiers.enabled:
+            self._classifier_task = asyncio.create_task(self._classifier_report_loop())
+        
         # 1. Запуск провайдеров
         await self.telegram.start()
         await self.vk.start()
@@ -52,15 +261,18 @@ class Coordinator:
             
             tg_channels = [s.source_id for s in sources if s.type == 'telegram']
             vk_groups = [s.source_id for s in sources if s.type == 'vk']
+            vk_intervals = {s.source_id: s.check_interval for s in sources if s.type == 'vk'}
             
         logger.info(f"Loaded {len(tg_channels)} Telegram channels and {len(vk_groups)} VK groups from DB")
             
-        # 3. Запуск мониторинга
+        # 3. Запуск мониторинга (Telegram и VK догружают пропущенные посты по курсорам)
+        await self._load_cursors()
         if tg_channels:
             await self.telegram.monitor_channels(tg_channels, self._handle_new_post)
+        self._source_task = asyncio.create_task(self._source_sync_loop())
             
         if vk_groups:
-            await self.vk.monitor_channels(vk_groups, self._handle_new_post)
+            await self.vk.monitor_channels(vk_groups, self._handle_new_post, vk_intervals)
             
         # 4. Бесконечный цикл ожидания (или ожидание сигнала остановки)
         logger.info("System is running. Press Ctrl+C to stop.")
@@ -70,8 +282,19 @@ class Coordinator:
     async def stop(self):
         """Остановка системы"""
         self.is_running = False
+        for task in (self._stats_task, self._classifier_task, self._shadow_task, self._source_task, *self._retry_tasks):
+            if task:
+                task.cancel()
+        await self._flush_filter_stats()
+        await self.filter_engine.shadows.close()
+        await self._sync_shadows()
+        await self._flush_ai_spend()
         await self.telegram.stop()
         await self.vk.stop()
+        await self._flush_cursors()
+        await self.ai_client.close()
+        if self.economy_client is not None:
+            await self.economy_client.close()
         logger.info("Coordinator stopped.")
 
 
@@ -51,7 +51,8 @@ class Deduplicator:
         return False
 
     async def mark_processed(self, source_type: str, source_id: str, post_id: str, text: str, 
-                           filter_result: dict = None, was_forwarded: bool = False):
+                           filter_result: dict = None, was_forwarded: bool = False,
+                           verdicts: dict = None):
         """Сохраняет пост как обработанный"""
         text_hash = get_post_hash(text)
         
@@ -61,7 +62,9 @@ class Deduplicator:
             source_id=source_id,
             post_id=post_id,
             text_hash=text_hash,
+            text=text,
             filter_result=filter_result,
+            verdicts=verdicts or None,
             category=filter_result.get('category') if filter_result else None,
             confidence=filter_result.get('confidence') if filter_result else None,
             was_forwarded=was_forwarded
@@ -3,6 +3,7 @@ import os
 from dotenv import load_dotenv
 from ..providers.telegram.client import TelegramProvider
 from ..providers.vk.client import VKProvider
+from .post import Post
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -16,7 +17,7 @@ class Forwarder:
         self.default_tg_channel = os.getenv("TELEGRAM_OUTPUT_CHANNEL")
         self.default_vk_group = os.getenv("VK_OUTPUT_GROUP_ID")
 
-    async def forward(self, post_data: dict, filter_result: dict) -> bool:
+    async def forward(self, post: Post, filter_result: dict) -> bool:
         """
         Пересылает пост в целевые каналы
         """
@@ -27,16 +28,17 @@ class Forwarder:
             f"📌 Категория: **{filter_result.category}**\n"
             f"🔍 Уверенность: **{filter_result.confidence:.0%}**\n"
             f"💭 {filter_result.reason}\n"
-            f"📍 Источник: {post_data.get('source_name', 'Unknown')}"
+            f"📍 Источник: {post.source_name or 'Unknown'}"
         )
         
         # 1. Отправка в Telegram
         if self.default_tg_channel:
             # Для Telegram используем нативный forward, если источник Telegram
-            if post_data['source_type'] == 'telegram' and post_data.get('raw_object'):
+            if post.source_type == 'telegram' and post.message_ids:
+                # Альбом пересылается одним запросом, чтобы сохранить группировку
                 tg_success = await self.telegram.forward_message(
                     self.default_tg_channel, 
-                    post_data['raw_object'],
+                    post,
                     extra_text
                 )
             else:
@@ -56,7 +58,7 @@ class Forwarder:
             # Для VK всегда создаем новый пост
             vk_success = await self.vk.forward_message(
                 self.default_vk_group,
-                post_data.get('raw_object', {'text': post_data['text'], 'owner_id': post_data['source_id'], 'id': post_data['post_id']}),
+                post,
                 extra_text
             )
             if vk_success:
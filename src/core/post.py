@@ -0,0 +1,65 @@
+import struct
+from dataclasses import dataclass
+from typing import Tuple
+
+# Версия бинарного формата (to_bytes / from_bytes)
+POST_FORMAT_VERSION = 1
+
+# Заголовок: версия, флаги, peer id источника, число ID сообщений
+_HEADER = struct.Struct("<BBqH")
+_LENGTH = struct.Struct("<I")
+_FLAG_MEDIA = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Post:
+    """
+    Пост источника в конвейере (дедупликация, фильтры, пересылка).
+
+    Хранит только нужные конвейеру поля и ссылку для пересылки (peer id источника
+    и ID сообщений) вместо объекта провайдера (Message Telethon, JSON VK), поэтому
+    пост в очереди занимает сотни байт и сериализуется для очередей и журналов.
+    """
+    source_type: str  # 'telegram' или 'vk'
+    source_id: str  # source_id источника из конфигурации
+    post_id: str  # ID поста в источнике (для альбома - ID первого сообщения)
+    text: str
+    source_name: str = ""
+    media: bool = False
+    peer_id: int = 0  # Telegram: peer id канала (-100...), VK: owner_id стены
+    message_ids: Tuple[int, ...] = ()  # Telegram: сообщения поста (все сообщения альбома), VK: ID записи
+
+    @property
+    def is_album(self) -> bool:
+        return len(self.message_ids) > 1
+
+    def to_bytes(self) -> bytes:
+        """Компактное бинарное представление (строки UTF-8 с длиной, числа little-endian)"""
+        parts = [_HEADER.pack(POST_FORMAT_VERSION, _FLAG_MEDIA if self.media else 0,
+                              self.peer_id, len(self.message_ids))]
+        if self.message_ids:
+            parts.append(struct.pack(f"<{len(self.message_ids)}q", *self.message_ids))
+        for value in (self.source_type, self.source_id, self.post_id, self.source_name, self.text):
+            encoded = value.encode("utf-8")
+            parts.append(_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Post":
+        view = memoryview(data)
+        version, flags, peer_id, count = _HEADER.unpack_from(view)
+        if version != POST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported post format version: {version}")
+        offset = _HEADER.size
+        message_ids = struct.unpack_from(f"<{count}q", view, offset)
+        offset += 8 * count
+
+        strings = []
+        for _ in range(5):
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            strings.append(str(view[offset:offset + length], "utf-8"))
+            offset += length
+        source_type, source_id, post_id, source_name, text = strings
+        return cls(source_type, source_id, post_id, text, source_name, bool(flags & _FLAG_MEDIA), peer_id, message_ids)
@@ -4,6 +4,7 @@ from ..filters.engine import FilterEngine
 from ..storage.repositories.sources import SourceRepository
 from .deduplicator import Deduplicator
 from .forwarder import Forwarder
+from .post import Post
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +16,13 @@ class PostProcessor:
         self.deduplicator = Deduplicator(session)
         self.source_repo = SourceRepository(session)
 
-    async def process_post(self, post_data: dict):
+    async def process_post(self, post: Post):
         """
         Основной пайплайн обработки поста
         """
-        source_id = post_data['source_id']
-        post_id = post_data['post_id']
-        text = post_data['text']
+        source_id = post.source_id
+        post_id = post.post_id
+        text = post.text
         
         # 1. Проверка на дубликаты
         if await self.deduplicator.is_duplicate(source_id, post_id, text):
@@ -50,27 +51,35 @@ class PostProcessor:
         # 3. Применение фильтров
         logger.info(f"Analyzing post {post_id} from {source.name or source_id}...")
         
-        filter_result = await self.filter_engine.apply_filters(text, source.filters)
+        verdicts = {}
+        # FiltersUnavailableError пробрасывается: пост не помечается обработанным
+        # и будет проверен повторно
+        filter_result = await self.filter_engine.apply_filters(
+            text, source.filters, verdicts, source_id=source_id, source_priority=source.priority or 0
+        )
         
         was_forwarded = False
         
         # 4. Обработка результата
         if filter_result:
+            # Для потокового ответа дожидаемся reason (решение уже принято)
+            await filter_result.complete()
             logger.info(f"✅ Post matched filter '{filter_result.filter_id}' (confidence: {filter_result.confidence:.2f})")
             
             # 5. Пересылка
-            was_forwarded = await self.forwarder.forward(post_data, filter_result)
+            was_forwarded = await self.forwarder.forward(post, filter_result)
         else:
             logger.info(f"❌ Post rejected")
 
         # 6. Сохранение результата (маркировка как обработанного)
         await self.deduplicator.mark_processed(
-            source_type=post_data['source_type'],
+            source_type=post.source_type,
             source_id=source_id,
             post_id=post_id,
             text=text,
             filter_result=filter_result.to_dict() if filter_result else None,
-            was_forwarded=was_forwarded
+            was_forwarded=was_forwarded,
+            verdicts=verdicts
         )
 
 
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from ..ai.resilience import AIDeadlineExceeded, remaining_time
+from ..storage.models import Filter
+from ..utils.helpers import get_filter_version
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Сколько постов с одним фильтром упаковывать в один запрос к AI (1 - пакеты выключены)
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", 1))
+# Сколько ждать накопления пакета (секунды); при малом потоке пакет уходит неполным
+AI_BATCH_MAX_WAIT = float(os.getenv("AI_BATCH_MAX_WAIT", 1.0))
+
+
+class _PendingBatch:
+    def __init__(self, filter_model: Filter, filters_config: Dict[str, Any], ai_client):
+        self.filter_model = filter_model
+        self.ai_client = ai_client
+        self.filters_config = filters_config
+        self.items: List[Tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.Task] = None
+
+
+class BatchCollector:
+    """
+    Собирает посты, проверяемые одним и тем же фильтром, в пакеты для AIClient.analyze_batch.
+
+    Пакет отправляется, когда набрано batch_size постов или истекло max_wait секунд
+    с первого поста. Пакет из одного поста отправляется обычным analyze_post,
+    поэтому источники с малым потоком платят только задержкой ожидания.
+    Посты, для которых в ответе пакета нет валидного вердикта (validator бросает
+    ValueError), перепроверяются по одному.
+    """
+
+    def __init__(self, ai_client, batch_size: Optional[int] = None, max_wait: Optional[float] = None,
+                 validator: Optional[Callable[[Dict[str, Any], Filter], Any]] = None):
+        self.ai_client = ai_client
+        self.validator = validator
+        self.batch_size = max(1, batch_size or AI_BATCH_SIZE)
+        self.max_wait = AI_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self._pending: Dict[Tuple[str, str, int], _PendingBatch] = {}
+        self._tasks = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.batch_size > 1
+
+    async def analyze(self, text: str, filter_model: Filter, filters_config: Dict[str, Any],
+                      ai_client=None) -> Dict[str, Any]:
+        """Вердикт AI по посту (ответ в формате analyze_post); ai_client - другой клиент вместо основного"""
+        ai_client = ai_client or self.ai_client
+        key = (filter_model.id, get_filter_version(filter_model.prompt, filter_model.categories), id(ai_client))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(filter_model, filters_config, ai_client)
+            batch.timer = self._spawn(self._flush_later(key, batch))
+
+        future = asyncio.get_running_loop().create_future()
+        # Ошибка пакета могла прийти после дедлайна поста - не оставляем ее необработанной
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        batch.items.append((text, future))
+        if len(batch.items) >= self.batch_size:
+            self._take(key, batch)
+            self._spawn(self._send(batch))
+
+        # Пакет отправляется в фоне - ожидание ограничено дедлайном вызывающего поста
+        remaining = remaining_time()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise AIDeadlineExceeded("AI decision deadline exceeded while waiting for batch")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take(self, key: Tuple[str, str, int], batch: _PendingBatch):
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+
+    async def _flush_later(self, key: Tuple[str, str, int], batch: _PendingBatch):
+        await asyncio.sleep(self.max_wait)
+        self._take(key, batch)
+        await self._send(batch)
+
+    async def _send(self, batch: _PendingBatch):
+        texts = [text for text, _ in batch.items]
+        futures = [future for _, future in batch.items]
+
+        try:
+            if len(texts) == 1:
+                verdicts = [await batch.ai_client.analyze_post(texts[0], batch.filters_config)]
+            else:
+                verdicts = await batch.ai_client.analyze_batch(texts, batch.filters_config)
+                logger.debug(f"Batch of {len(texts)} posts analyzed in one request")
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future, verdict in zip(texts, futures, verdicts):
+            if future.done():
+                continue
+            if not self._valid(verdict, batch.filter_model):
+                # Вердикт пропущен моделью или невалиден - отдельный запрос
+                self._spawn(self._resolve_single(batch.ai_client, text, batch.filters_config, future))
+            else:
+                future.set_result(verdict)
+
+    def _valid(self, verdict: Optional[Dict[str, Any]], filter_model: Filter) -> bool:
+        if verdict is None:
+            return False
+        if self.validator is None:
+            return True
+        try:
+            self.validator(verdict, filter_model)
+        except ValueError as e:
+            logger.warning(f"Invalid batch verdict for filter {filter_model.id} ({e}), requesting separately")
+            return False
+        return True
+
+    async def _resolve_single(self, ai_client, text: str, filters_config: Dict[str, Any], future: asyncio.Future):
+        try:
+            result = await ai_client.analyze_post(text, filters_config)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
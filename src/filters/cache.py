@@ -0,0 +1,90 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+from dotenv import load_dotenv
+from ..ai.tokens import AI_TEXT_TOKEN_BUDGET
+from ..storage.cache import cache
+from ..storage.models import Filter
+from ..utils.helpers import get_normalized_hash, get_filter_version
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+VERDICT_CACHE_ENABLED = os.getenv("VERDICT_CACHE_ENABLED", "true").lower() == "true"
+# Время жизни вердикта в секундах (по умолчанию 7 дней)
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", 7 * 86400))
+# Максимум вердиктов в памяти процесса
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 10000))
+
+
+class VerdictCache:
+    """
+    Кэш вердиктов AI по ключу (хеш нормализованного текста, ID фильтра, версия фильтра).
+    
+    Версия - хеш промпта, категорий, бюджета токенов текста и модели, вынесшей вердикт,
+    поэтому изменение фильтра автоматически делает его старые вердикты недоступными,
+    а вердикты дешевой или резервной модели не выдаются за вердикты основной.
+    Первый уровень - LRU в памяти процесса, второй - общий Cache (Redis).
+    """
+    
+    def __init__(self, model: str = "", ttl: Optional[int] = None, max_size: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.model = model
+        self.ttl = ttl or VERDICT_CACHE_TTL
+        self.max_size = max_size or VERDICT_CACHE_SIZE
+        self.enabled = VERDICT_CACHE_ENABLED if enabled is None else enabled
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, filter_model: Filter, model: Optional[str] = None) -> str:
+        """Хеш конфигурации фильтра, влияющей на вердикт (model - модель, вынесшая вердикт)"""
+        max_text_tokens = AI_TEXT_TOKEN_BUDGET if filter_model.max_text_tokens is None else filter_model.max_text_tokens
+        return get_filter_version(filter_model.prompt, filter_model.categories, model or self.model, max_text_tokens)
+
+    def key(self, text: str, filter_model: Filter, model: Optional[str] = None) -> str:
+        return f"verdict:{get_normalized_hash(text)}:{filter_model.id}:{self.version(filter_model, model)}"
+
+    async def get(self, text: str, filter_model: Filter, model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+            
+        key = self.key(text, filter_model, model)
+        
+        entry = self._local.get(key)
+        if entry:
+            expires_at, verdict = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                self.hits += 1
+                return dict(verdict)
+            del self._local[key]
+        
+        # Локальный fallback Cache не ограничен по размеру, поэтому используем только Redis
+        if cache.is_redis:
+            verdict = await cache.get(key)
+            if isinstance(verdict, dict):
+                self._remember(key, verdict)
+                self.hits += 1
+                return dict(verdict)
+                
+        self.misses += 1
+        return None
+
+    async def set(self, text: str, filter_model: Filter, verdict: Dict[str, Any], model: Optional[str] = None):
+        if not self.enabled:
+            return
+            
+        key = self.key(text, filter_model, model)
+        self._remember(key, verdict)
+        
+        if cache.is_redis:
+            await cache.set(key, verdict, ttl=self.ttl)
+
+    def _remember(self, key: str, verdict: Dict[str, Any]):
+        self._local[key] = (time.monotonic() + self.ttl, dict(verdict))
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
@@ -0,0 +1,299 @@
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Any
+from dotenv import load_dotenv
+from ..storage.models import Filter
+from ..utils.helpers import normalize_text, get_filter_version
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+LOCAL_CLASSIFIER_DIR = os.getenv("LOCAL_CLASSIFIER_DIR", "data/classifiers")
+# Полоса неуверенности: посты с вероятностью между LOW и HIGH уходят в LLM
+LOCAL_CLASSIFIER_LOW = float(os.getenv("LOCAL_CLASSIFIER_LOW", 0.1))
+LOCAL_CLASSIFIER_HIGH = float(os.getenv("LOCAL_CLASSIFIER_HIGH", 0.9))
+# Доля уверенных решений, которые все равно проверяются LLM (для отчета о дрейфе)
+LOCAL_CLASSIFIER_AUDIT_RATE = float(os.getenv("LOCAL_CLASSIFIER_AUDIT_RATE", 0.02))
+# Требования к модели при обучении
+LOCAL_CLASSIFIER_MIN_SAMPLES = int(os.getenv("LOCAL_CLASSIFIER_MIN_SAMPLES", 200))
+LOCAL_CLASSIFIER_MIN_ACCURACY = float(os.getenv("LOCAL_CLASSIFIER_MIN_ACCURACY", 0.95))
+
+HASH_BITS = 20
+MAX_TOKENS = 300
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def extract_features(text: str) -> Dict[int, float]:
+    """
+    Хешированные признаки текста: слова, префиксы слов (грубый стемминг для русского)
+    и биграммы. Вектор нормирован по L2.
+    """
+    tokens = _TOKEN_RE.findall(normalize_text(text))[:MAX_TOKENS]
+    mask = (1 << HASH_BITS) - 1
+    counts: Counter = Counter()
+
+    previous = None
+    for token in tokens:
+        counts[zlib.crc32(f"w:{token}".encode('utf-8')) & mask] += 1
+        if len(token) > 5:
+            counts[zlib.crc32(f"p:{token[:5]}".encode('utf-8')) & mask] += 1
+        if previous is not None:
+            counts[zlib.crc32(f"b:{previous} {token}".encode('utf-8')) & mask] += 1
+        previous = token
+
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {index: value / norm for index, value in counts.items()}
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+class LocalClassifier:
+    """Линейная модель (логистическая регрессия) на хешированных признаках для одного фильтра"""
+
+    def __init__(self, filter_id: str, version: str, weights: Optional[Dict[int, float]] = None,
+                 bias: float = 0.0, category: str = "Other", metrics: Optional[Dict[str, Any]] = None,
+                 trained_at: Optional[str] = None):
+        self.filter_id = filter_id
+        self.version = version
+        self.weights = weights or {}
+        self.bias = bias
+        self.category = category  # Самая частая категория среди принятых постов
+        self.metrics = metrics or {}
+        self.trained_at = trained_at
+
+    @property
+    def usable(self) -> bool:
+        """Модель прошла проверку качества при обучении"""
+        return bool(self.metrics.get("usable"))
+
+    def predict_proba(self, text: str) -> float:
+        """Вероятность того, что LLM приняла бы пост этим фильтром"""
+        weights = self.weights
+        score = self.bias
+        for index, value in extract_features(text).items():
+            score += weights.get(index, 0.0) * value
+        return _sigmoid(score)
+
+    @classmethod
+    def train(cls, filter_model: Filter, samples: List[Tuple[str, bool, Optional[str]]],
+              epochs: int = 8, learning_rate: float = 0.5, l2: float = 1e-5,
+              holdout: float = 0.2, low: Optional[float] = None, high: Optional[float] = None,
+              seed: int = 42) -> "LocalClassifier":
+        """
+        Обучает модель по вердиктам LLM.
+
+        Args:
+            samples: Список (текст, принят ли пост, категория)
+        """
+        low = LOCAL_CLASSIFIER_LOW if low is None else low
+        high = LOCAL_CLASSIFIER_HIGH if high is None else high
+
+        rng = random.Random(seed)
+        data = [(extract_features(text), label) for text, label, _ in samples]
+        rng.shuffle(data)
+        split = int(len(data) * (1 - holdout)) if len(data) >= 10 else len(data)
+        train_set, test_set = data[:split], data[split:]
+
+        positives = sum(1 for _, label in train_set if label)
+        negatives = len(train_set) - positives
+        # Балансировка классов: принятых постов обычно заметно меньше
+        pos_weight = negatives / positives if positives else 1.0
+
+        weights: Dict[int, float] = {}
+        bias = 0.0
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            rng.shuffle(train_set)
+            for features, label in train_set:
+                score = bias + sum(weights.get(i, 0.0) * v for i, v in features.items())
+                gradient = (_sigmoid(score) - (1.0 if label else 0.0)) * (pos_weight if label else 1.0)
+                for i, v in features.items():
+                    w = weights.get(i, 0.0)
+                    weights[i] = w - rate * (gradient * v + l2 * w)
+                bias -= rate * gradient
+
+        weights = {i: w for i, w in weights.items() if abs(w) > 1e-6}
+        categories = Counter(category for _, label, category in samples if label and category)
+
+        model = cls(
+            filter_id=filter_model.id,
+            version=get_filter_version(filter_model.prompt, filter_model.categories),
+            weights=weights,
+            bias=bias,
+            category=categories.most_common(1)[0][0] if categories else "Other",
+            trained_at=datetime.now(timezone.utc).isoformat()
+        )
+        model.metrics = model.evaluate(test_set, low, high)
+        model.metrics.update({
+            "samples": len(samples),
+            "positives": sum(1 for _, label, _ in samples if label),
+        })
+        model.metrics["usable"] = (
+            len(samples) >= LOCAL_CLASSIFIER_MIN_SAMPLES
+            and model.metrics["positives"] > 0
+            and model.metrics["positives"] < len(samples)
+            and model.metrics["confident_accuracy"] is not None
+            and model.metrics["confident_accuracy"] >= LOCAL_CLASSIFIER_MIN_ACCURACY
+        )
+        return model
+
+    def evaluate(self, data: List[Tuple[Dict[int, float], bool]], low: float, high: float) -> Dict[str, Any]:
+        """Качество на отложенной выборке: точность, покрытие уверенными решениями и их точность"""
+        correct = confident = confident_correct = 0
+        for features, label in data:
+            score = self.bias + sum(self.weights.get(i, 0.0) * v for i, v in features.items())
+            proba = _sigmoid(score)
+            correct += (proba >= 0.5) == label
+            if proba <= low or proba >= high:
+                confident += 1
+                confident_correct += (proba >= high) == label
+
+        return {
+            "holdout": len(data),
+            "accuracy": round(correct / len(data), 4) if data else None,
+            "coverage": round(confident / len(data), 4) if data else None,
+            "confident_accuracy": round(confident_correct / confident, 4) if confident else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "filter_id": self.filter_id,
+            "version": self.version,
+            "bias": self.bias,
+            "category": self.category,
+            "metrics": self.metrics,
+            "trained_at": self.trained_at,
+            "weights": {str(i): round(w, 6) for i, w in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LocalClassifier":
+        return cls(
+            filter_id=data["filter_id"],
+            version=data["version"],
+            weights={int(i): w for i, w in data.get("weights", {}).items()},
+            bias=data.get("bias", 0.0),
+            category=data.get("category", "Other"),
+            metrics=data.get("metrics", {}),
+            trained_at=data.get("trained_at"),
+        )
+
+
+class ClassifierMonitor:
+    """Счетчики работы локальных классификаторов для периодического отчета о дрейфе"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._counters: Dict[str, Counter] = {}
+        self.started_at = time.time()
+
+    def _get(self, filter_id: str) -> Counter:
+        return self._counters.setdefault(filter_id, Counter())
+
+    def record_local(self, filter_id: str, accepted: bool):
+        self._get(filter_id)["local_accept" if accepted else "local_reject"] += 1
+
+    def record_llm(self, filter_id: str, proba: float, llm_accepted: bool, audit: bool, high: float):
+        """Сравнение прогноза модели с вердиктом LLM"""
+        counters = self._get(filter_id)
+        if audit:
+            counters["audits"] += 1
+            counters["audit_agree"] += (proba >= high) == llm_accepted
+        else:
+            counters["escalations"] += 1
+            counters["escalation_agree"] += (proba >= 0.5) == llm_accepted
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for filter_id, c in self._counters.items():
+            local = c["local_accept"] + c["local_reject"]
+            total = local + c["escalations"] + c["audits"]
+            report[filter_id] = {
+                "decisions": total,
+                "local_share": round(local / total, 4) if total else None,
+                "local_accept": c["local_accept"],
+                "local_reject": c["local_reject"],
+                "escalations": c["escalations"],
+                # Совпадение уверенных решений с LLM - главный индикатор дрейфа
+                "audit_agreement": round(c["audit_agree"] / c["audits"], 4) if c["audits"] else None,
+                "escalation_agreement": round(c["escalation_agree"] / c["escalations"], 4) if c["escalations"] else None,
+            }
+        return report
+
+
+class ClassifierRegistry:
+    """Хранилище обученных классификаторов (JSON-файлы, по одному на фильтр)"""
+
+    def __init__(self, directory: Optional[str] = None, enabled: Optional[bool] = None,
+                 low: Optional[float] = None, high: Optional[float] = None,
+                 audit_rate: Optional[float] = None):
+        self.directory = directory or LOCAL_CLASSIFIER_DIR
+        self.enabled = LOCAL_CLASSIFIER_ENABLED if enabled is None else enabled
+        self.low = LOCAL_CLASSIFIER_LOW if low is None else low
+        self.high = LOCAL_CLASSIFIER_HIGH if high is None else high
+        self.audit_rate = LOCAL_CLASSIFIER_AUDIT_RATE if audit_rate is None else audit_rate
+        # Ниже этого совпадения с LLM на аудите модель считается устаревшей
+        self.min_agreement = LOCAL_CLASSIFIER_MIN_ACCURACY
+        self.monitor = ClassifierMonitor()
+        self._models: Dict[str, LocalClassifier] = {}
+        if self.enabled:
+            self.reload()
+
+    def path(self, filter_id: str) -> str:
+        safe_id = re.sub(r"[^\w.-]", "_", filter_id)
+        return os.path.join(self.directory, f"{safe_id}.json")
+
+    def reload(self):
+        """Загружает все модели из каталога"""
+        models = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                        model = LocalClassifier.from_dict(json.load(f))
+                    models[model.filter_id] = model
+                except Exception as e:
+                    logger.error(f"Failed to load local classifier {name}: {e}")
+        self._models = models
+        logger.info(f"Loaded {len(models)} local classifiers from {self.directory}")
+
+    def save(self, model: LocalClassifier):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(model.filter_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(model.to_dict(), f)
+        os.replace(tmp_path, path)
+        self._models[model.filter_id] = model
+
+    def get(self, filter_model: Filter) -> Optional[LocalClassifier]:
+        """Модель фильтра, если она обучена на текущей версии промпта и прошла проверку качества"""
+        if not self.enabled:
+            return None
+        model = self._models.get(filter_model.id)
+        if not model or not model.usable:
+            return None
+        if model.version != get_filter_version(filter_model.prompt, filter_model.categories):
+            return None
+        return model
+
+    def should_audit(self) -> bool:
+        return random.random() < self.audit_rate
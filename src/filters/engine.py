@@ -1,18 +1,71 @@
+import asyncio
 import logging
-from typing import List, Dict, Optional, Any
-from ..ai.client import AIClient
+import os
+import time
+from typing import List, Dict, Optional, Any, Tuple
+from dotenv import load_dotenv
+from ..ai.budget import BudgetGovernor, DegradationLevel, budget_level, sampled_out
+from ..ai.client import AIClient, AI_STREAMING
+from ..ai.errors import AIError
 from ..ai.prompts import PromptTemplate
+from ..ai.rate_limiter import request_source
+from ..ai.resilience import ai_deadline
 from ..storage.models import Filter
+from .stats import FilterStatsTracker
+from .cache import VerdictCache
+from .classifier import ClassifierRegistry
+from .batcher import BatchCollector
+from .prefilter import KeywordPrefilter
+from .shadow import ShadowEvaluator
 
 logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Режим применения фильтров:
+#   sequential - один запрос к AI на каждый фильтр
+#   fused      - один запрос к AI на все фильтры источника
+#   concurrent - запросы по всем фильтрам параллельно, первый принятый отменяет остальные
+FILTER_MODE = os.getenv("FILTER_MODE", "sequential").lower()
+# Максимум одновременных запросов к AI на один пост (для режима concurrent)
+FILTER_MAX_CONCURRENCY = int(os.getenv("FILTER_MAX_CONCURRENCY", 4))
+# Упорядочивать фильтры по накопленной статистике (доля срабатываний / стоимость)
+FILTER_ADAPTIVE_ORDER = os.getenv("FILTER_ADAPTIVE_ORDER", "true").lower() == "true"
+# Крайний срок решения по одному посту (секунды на все запросы к AI, включая повторы)
+FILTER_DECISION_DEADLINE = float(os.getenv("FILTER_DECISION_DEADLINE", 30))
+
+
+class FiltersUnavailableError(Exception):
+    """Часть фильтров не удалось проверить (AI недоступен) и ни один фильтр не сработал"""
+
+    def __init__(self, filter_ids: List[str]):
+        super().__init__(f"Filters could not be evaluated: {', '.join(filter_ids)}")
+        self.filter_ids = filter_ids
+
+
+class AIBudgetExceeded(AIError):
+    """Дневной бюджет AI (общий или фильтра) исчерпан, а локального классификатора нет"""
+
 
 class FilterResult:
-    def __init__(self, is_relevant: bool, category: str, confidence: float, reason: str, filter_id: str):
+    def __init__(self, is_relevant: bool, category: str, confidence: float, reason: str, filter_id: str,
+                 tier: str = "llm", tokens: float = 0.0):
         self.is_relevant = is_relevant
         self.category = category
         self.confidence = confidence
         self.reason = reason
         self.filter_id = filter_id
+        # Кто вынес вердикт: llm / "provider:model" (уровень цепочки AI), local (локальный
+        # классификатор), local_fallback (классификатор вместо недоступного AI или при
+        # исчерпанном бюджете), prefilter (префильтр) или sampled (пост не попал в выборку)
+        self.tier = tier
+        self.tokens = tokens  # Токенов потрачено на этот вердикт (0 - без запроса к LLM)
+        # Потоковый ответ: решение уже принято, reason еще дописывается
+        self.pending: Optional[asyncio.Task] = None
+
+    async def complete(self):
+        """Дожидается полного ответа модели (reason) для потокового вердикта"""
+        if self.pending is not None:
+            await asyncio.shield(self.pending)
         
     def to_dict(self):
         return {
@@ -20,57 +73,455 @@ class FilterResult:
             "category": self.category,
             "confidence": self.confidence,
             "reason": self.reason,
-            "filter_id": self.filter_id
+            "filter_id": self.filter_id,
+            "tier": self.tier,
+            "tokens": self.tokens
         }
 
 class FilterEngine:
-    def __init__(self, ai_client: AIClient):
+    def __init__(self, ai_client: AIClient, mode: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 economy_client: Optional[AIClient] = None):
         self.ai_client = ai_client
+        # Дешевая модель, на которую переходим при расходе бюджета (ступень economy)
+        self.economy_client = economy_client
+        self.mode = (mode or FILTER_MODE).lower()
+        self.max_concurrency = max(1, max_concurrency or FILTER_MAX_CONCURRENCY)
+        self.stats = FilterStatsTracker()
+        self.verdict_cache = VerdictCache(model=getattr(ai_client, "model", ""))
+        self.classifiers = ClassifierRegistry()
+        self.adaptive_order = FILTER_ADAPTIVE_ORDER
+        self.budget = BudgetGovernor()
+        self.prefilter = KeywordPrefilter()
+        # Теневые версии фильтров, проверяемые на выборке постов в фоне
+        self.shadows = ShadowEvaluator(ai_client, self.budget, validator=self._parse_verdict, accept=self._is_accepted)
+        # Пакетная проверка постов одним фильтром (AI_BATCH_SIZE > 1)
+        self.batcher = BatchCollector(ai_client, validator=self._parse_verdict)
+        # Потоковые ответы (AI_STREAMING); при включенных пакетах используются пакеты
+        self.streaming = AI_STREAMING and not self.batcher.enabled
 
-    async def apply_filters(self, text: str, filters: List[Filter]) -> Optional[FilterResult]:
+    async def apply_filters(self, text: str, filters: List[Filter],
+                            verdicts: Optional[Dict[str, dict]] = None,
+                            source_id: Optional[str] = None, source_priority: int = 0) -> Optional[FilterResult]:
         """
         Применяет список фильтров к тексту.
         Возвращает первый положительный результат или лучший результат.
+        Если ни один фильтр не сработал, но часть фильтров проверить не удалось,
+        бросает FiltersUnavailableError - пост нельзя считать отклоненным.
+        
+        Args:
+            verdicts: Если передан, заполняется вердиктами всех проверенных фильтров
+                      ({filter_id: {"is_relevant", "confidence", "tier"}})
+            source_id: Источник поста - запросы к AI разных источников чередуются в очереди
+            source_priority: Приоритет источника - при нехватке бюджета посты источников
+                             с приоритетом < 0 проверяются LLM выборочно
         """
-        best_result = None
+        if verdicts is None:
+            verdicts = {}
+        if source_id:
+            request_source.set(source_id)
+        ai_deadline.set(time.monotonic() + FILTER_DECISION_DEADLINE)
+        level = self.budget.level
+        budget_level.set(level)
+        sampled_out.set(level >= DegradationLevel.SAMPLING and not self.budget.sample(source_priority))
+        
+        enabled = [f for f in filters if f.enabled]
+        if self.adaptive_order:
+            enabled = self.stats.order(enabled)
         
+        if self.mode == "fused" and len(enabled) > 1:
+            result = await self._apply_fused(text, enabled, verdicts)
+        elif self.mode == "concurrent" and len(enabled) > 1:
+            result = await self._apply_concurrent(text, enabled, verdicts)
+        else:
+            result = None
+            for filter_model in enabled:
+                evaluated = await self._evaluate(text, filter_model, verdicts)
+                
+                # Проверяем порог уверенности
+                if self._is_accepted(evaluated, filter_model):
+                    # Если нашли подходящий - сразу возвращаем (First Match стратегия)
+                    # Можно изменить на поиск лучшего (Best Match)
+                    result = evaluated
+                    break
+        
+        if result is None:
+            # Фильтр без вердикта мог бы пропустить пост - отказ был бы потерей поста
+            failed = [f.id for f in enabled if f.id not in verdicts]
+            if failed:
+                raise FiltersUnavailableError(failed)
+        return result
+
+    async def _apply_fused(self, text: str, filters: List[Filter], verdicts: Dict[str, dict]) -> Optional[FilterResult]:
+        """
+        Проверяет пост по всем фильтрам одним запросом к AI.
+        Фильтры, вердикт по которым не удалось разобрать, проверяются отдельными запросами.
+        """
+        resolved = {}
+        probes = {}
         for filter_model in filters:
-            if not filter_model.enabled:
+            try:
+                result, probe = await self._resolve_without_llm(text, filter_model)
+            except AIBudgetExceeded as e:
+                # Фильтр без бюджета в общий запрос не попадает
+                logger.warning(f"Filter {filter_model.id} skipped: {e}")
+                resolved[filter_model.id] = None
                 continue
-
+            if result is not None:
+                resolved[filter_model.id] = result
+            elif probe is not None:
+                probes[filter_model.id] = probe
+        unresolved = [f for f in filters if f.id not in resolved]
+        
+        ai_response = {}
+        if unresolved:
+            started = time.perf_counter()
             try:
-                # Формируем конфигурацию для AI
-                filters_config = {
-                    "categories": filter_model.categories,
-                    "prompt": filter_model.prompt
-                }
+                ai_response = await self._client().analyze_post_multi(
+                    text, {f.id: self._filter_config(f) for f in unresolved}
+                )
+            except Exception as e:
+                logger.error(f"Fused filter request failed, falling back to per-filter requests: {e}")
                 
-                # Запрашиваем AI
-                # TODO: Оптимизация - объединять фильтры в один запрос если возможно
-                ai_response = await self.ai_client.analyze_post(text, filters_config)
+            if not isinstance(ai_response, dict):
+                logger.warning(f"Unexpected fused AI response type: {type(ai_response).__name__}")
+                ai_response = {}
+            tier = ai_response.get("tier") or "llm"
+            
+            # Стоимость общего запроса делится поровну между фильтрами
+            latency = (time.perf_counter() - started) / len(unresolved)
+            usage = self._usage(ai_response, len(unresolved))
+        
+        # Порядок фильтров сохраняется, чтобы First Match давал тот же результат,
+        # что и последовательный режим
+        for filter_model in filters:
+            result = resolved.get(filter_model.id)
+            if result is None and filter_model.id not in resolved:
+                try:
+                    result = self._parse_verdict(ai_response[filter_model.id], filter_model, tier)
+                    logger.info(f"Filter '{filter_model.name}' result (fused): {result.to_dict()}")
+                    await self._record_llm_result(text, filter_model, result, latency, usage,
+                                                  probes.get(filter_model.id), len(unresolved))
+                except Exception as e:
+                    logger.warning(f"No valid fused verdict for filter {filter_model.id} ({e!r}), requesting separately")
+                    result = await self._evaluate(text, filter_model, verdicts)
+            
+            self._collect(verdicts, result)
+            
+            if self._is_accepted(result, filter_model):
+                return result
                 
-                result = FilterResult(
-                    is_relevant=ai_response["is_relevant"],
-                    category=ai_response["category"],
-                    confidence=ai_response["confidence"],
-                    reason=ai_response["reason"],
-                    filter_id=filter_model.id
-                )
+        return None
+
+    async def _apply_concurrent(self, text: str, filters: List[Filter], verdicts: Dict[str, dict]) -> Optional[FilterResult]:
+        """
+        Проверяет пост всеми фильтрами параллельно (не более max_concurrency запросов).
+        
+        Приоритет определяется порядком фильтров: результат совпадает с последовательным
+        режимом. Как только фильтр принят, запросы менее приоритетных фильтров отменяются,
+        ожидаются только более приоритетные.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(filter_model: Filter) -> Optional[FilterResult]:
+            async with semaphore:
+                return await self._evaluate(text, filter_model, verdicts)
+        
+        # Задачи создаются в порядке приоритета, семафор выдает слоты в том же порядке
+        tasks = [asyncio.create_task(run(f)) for f in filters]
+        positions = {task: i for i, task in enumerate(tasks)}
+        best = None
+        
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
                 
-                logger.info(f"Filter '{filter_model.name}' result: {result.to_dict()}")
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    i = positions[task]
+                    if (best is None or i < best) and self._is_accepted(task.result(), filters[i]):
+                        best = i
+                        for lower in tasks[i + 1:]:
+                            lower.cancel()
                 
-                # Проверяем порог уверенности
-                if result.is_relevant and result.confidence >= filter_model.threshold:
-                    # Если нашли подходящий - сразу возвращаем (First Match стратегия)
-                    # Можно изменить на поиск лучшего (Best Match)
-                    return result
-                    
-            except Exception as e:
-                logger.error(f"Error applying filter {filter_model.id}: {e}")
+                # Решение окончательно, когда все более приоритетные фильтры отработали
+                if best is not None and all(t.done() for t in tasks[:best]):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+        return tasks[best].result() if best is not None else None
+
+    async def _evaluate(self, text: str, filter_model: Filter, verdicts: Dict[str, dict]) -> Optional[FilterResult]:
+        """
+        Проверяет пост одним фильтром. Если AI недоступен, решает локальный классификатор
+        (последний уровень цепочки). При ошибке возвращает None
+        """
+        try:
+            result, probe = await self._resolve_without_llm(text, filter_model)
+            if result is not None:
+                self._collect(verdicts, result)
+                return result
+            
+            # Запрашиваем AI
+            started = time.perf_counter()
+            if self.streaming:
+                result = await self._evaluate_stream(text, filter_model, probe, started, verdicts)
+                self._collect(verdicts, result)
+                return result
+            
+            client = self._client()
+            if self.batcher.enabled:
+                ai_response = await self.batcher.analyze(text, filter_model, self._filter_config(filter_model), client)
+            else:
+                ai_response = await client.analyze_post(text, self._filter_config(filter_model))
+            latency = time.perf_counter() - started
+            result = self._parse_verdict(ai_response, filter_model)
+            
+            logger.info(f"Filter '{filter_model.name}' result: {result.to_dict()}")
+            await self._record_llm_result(text, filter_model, result, latency, self._usage(ai_response), probe)
+            self._collect(verdicts, result)
+            return result
+        
+        except AIBudgetExceeded as e:
+            logger.warning(f"Filter {filter_model.id} not evaluated: {e}")
+            return None
+        
+        except AIError as e:
+            logger.error(f"AI unavailable for filter {filter_model.id}: {e}")
+            result = self._local_fallback(text, filter_model)
+            self._collect(verdicts, result)
+            return result
                 
-        return None
+        except Exception as e:
+            logger.error(f"Error applying filter {filter_model.id}: {e}")
+            return None
 
+    async def _evaluate_stream(self, text: str, filter_model: Filter, probe: Optional[Tuple[float, bool]],
+                               started: float, verdicts: Dict[str, dict]) -> FilterResult:
+        """
+        Потоковая проверка: решение по первым полям ответа (is_relevant, confidence, category).
+        Для отклоненного поста генерация обрывается, у принятого reason дописывается в фоне
+        """
+        stream = await self._client().analyze_post_stream(text, self._filter_config(filter_model))
+        try:
+            decision = await stream.decision()
+            result = self._parse_verdict(decision, filter_model, stream.tier or "llm")
+        except BaseException:
+            await stream.cancel()
+            raise
+        latency = time.perf_counter() - started
+        
+        if self._is_accepted(result, filter_model):
+            result.pending = asyncio.create_task(
+                self._finish_stream(stream, text, filter_model, result, latency, probe, verdicts)
+            )
+            return result
+        
+        await stream.cancel()
+        logger.info(f"Filter '{filter_model.name}' result (stream, stopped early): {result.to_dict()}")
+        await self._record_llm_result(text, filter_model, result, latency, self._usage({"usage": stream.usage}), probe)
+        return result
+
+    async def _finish_stream(self, stream, text: str, filter_model: Filter, result: FilterResult,
+                             latency: float, probe: Optional[Tuple[float, bool]], verdicts: Dict[str, dict]):
+        """Дописывает reason принятого потокового вердикта и учитывает его как обычный вердикт LLM"""
+        try:
+            full = await stream.result()
+            result.reason = str(full.get("reason") or "")
+        except Exception as e:
+            logger.warning(f"Stream for filter {filter_model.id} failed after decision: {e}")
+        logger.info(f"Filter '{filter_model.name}' result (stream): {result.to_dict()}")
+        await self._record_llm_result(text, filter_model, result, latency, self._usage({"usage": stream.usage}), probe)
+        self._collect(verdicts, result)
 
+    def _local_fallback(self, text: str, filter_model: Filter) -> Optional[FilterResult]:
+        """Вердикт локального классификатора без полосы неуверенности (AI недоступен)"""
+        model = self.classifiers.get(filter_model)
+        if model is None:
+            return None
+            
+        proba = model.predict_proba(text)
+        accepted = proba >= 0.5
+        result = FilterResult(
+            is_relevant=accepted,
+            category=model.category if accepted else "Other",
+            confidence=round(proba if accepted else 1 - proba, 2),
+            reason=f"Local classifier fallback (p={proba:.2f})",
+            filter_id=filter_model.id,
+            tier="local_fallback"
+        )
+        logger.info(f"Filter '{filter_model.name}' result (local fallback): {result.to_dict()}")
+        return result
 
+    async def _resolve_without_llm(self, text: str, filter_model: Filter) -> Tuple[Optional[FilterResult], Optional[Tuple[float, bool]]]:
+        """
+        Пытается вынести вердикт без запроса к LLM: кэш вердиктов, локальный классификатор,
+        затем префильтр и ограничения дневного бюджета AI.
+        
+        Returns:
+            (результат или None, probe) - probe = (вероятность классификатора, аудит ли это)
+            для сравнения с вердиктом LLM, если пост все же уходит в LLM
+        Raises:
+            AIBudgetExceeded: бюджет исчерпан, а локального классификатора нет
+        """
+        cached = await self.verdict_cache.get(text, filter_model, getattr(self._client(), "model", None))
+        if cached is not None:
+            result = self._parse_verdict(cached, filter_model)
+            # Повтор старого вердикта, а не новый ответ LLM: не метка для обучения и не расход токенов
+            result.tier = "cached"
+            logger.info(f"Filter '{filter_model.name}' result (cached): {result.to_dict()}")
+            return result, None
+        
+        level = self.budget.level_for(filter_model.id, filter_model.daily_token_budget)
+        probe = None
+        model = self.classifiers.get(filter_model)
+        if model is not None:
+            proba = model.predict_proba(text)
+            if self.classifiers.low < proba < self.classifiers.high:
+                # Полоса неуверенности - решает LLM
+                probe = (proba, False)
+            elif level < DegradationLevel.PREFILTER and self.classifiers.should_audit():
+                # Выборочная проверка уверенного решения через LLM (отчет о дрейфе)
+                probe = (proba, True)
+            else:
+                accepted = proba >= self.classifiers.high
+                self.classifiers.monitor.record_local(filter_model.id, accepted)
+                result = FilterResult(
+                    is_relevant=accepted,
+                    category=model.category if accepted else "Other",
+                    confidence=round(proba if accepted else 1 - proba, 2),
+                    reason=f"Local classifier (p={proba:.2f})",
+                    filter_id=filter_model.id,
+                    tier="local"
+                )
+                logger.info(f"Filter '{filter_model.name}' result (local): {result.to_dict()}")
+                return result, None
+        
+        result = self._resolve_under_budget(text, filter_model, level)
+        return result, (probe if result is None else None)
 
+    def _resolve_under_budget(self, text: str, filter_model: Filter, level: DegradationLevel) -> Optional[FilterResult]:
+        """Вердикт префильтра или деградации по бюджету (None - пост можно отправить в LLM)"""
+        reason = self.prefilter.reject(text, filter_model, strict=level >= DegradationLevel.PREFILTER)
+        if reason:
+            result = FilterResult(False, "Other", 1.0, reason, filter_model.id, tier="prefilter")
+            logger.info(f"Filter '{filter_model.name}' result (prefilter): {result.to_dict()}")
+            return result
+        
+        if level < DegradationLevel.LOCAL_ONLY and not sampled_out.get():
+            return None
+        result = self._local_fallback(text, filter_model)
+        if result is not None:
+            return result
+        if level < DegradationLevel.LOCAL_ONLY:
+            # Пост низкоприоритетного источника не попал в выборку - отклоняется без проверки
+            result = FilterResult(False, "Other", 0.0, "Not sampled: AI budget is running low",
+                                  filter_model.id, tier="sampled")
+            logger.info(f"Filter '{filter_model.name}' result (sampled out): {result.to_dict()}")
+            return result
+        raise AIBudgetExceeded(f"AI daily budget exhausted for filter {filter_model.id} and no local classifier")
+
+    async def _record_llm_result(self, text: str, filter_model: Filter, result: FilterResult, latency: float,
+                                 usage: Dict[str, float], probe: Optional[Tuple[float, bool]], shared: int = 1):
+        """
+        Учитывает вердикт LLM: расход бюджета, статистика фильтра, теневые версии, кэш,
+        сравнение с локальным классификатором.
+        usage - доля фильтра в usage запроса, shared - на сколько фильтров поделен запрос
+        """
+        tokens = usage["total_tokens"]
+        result.tokens = round(tokens, 1)
+        self.budget.record(filter_model.id, self._tier_model(result.tier), usage, 1.0 / shared)
+        accepted = self._is_accepted(result, filter_model)
+        self.stats.record(filter_model.id, accepted, latency, tokens)
+        self.shadows.observe(text, filter_model, accepted, latency, tokens)
+        await self.verdict_cache.set(text, filter_model, self._cacheable(result), self._tier_model(result.tier))
+        if probe is not None:
+            proba, audit = probe
+            self.classifiers.monitor.record_llm(filter_model.id, proba, accepted, audit, self.classifiers.high)
+
+    def _client(self) -> AIClient:
+        """Клиент AI для текущего поста (дешевая модель на ступени economy и выше)"""
+        if self.economy_client is not None and budget_level.get() >= DegradationLevel.ECONOMY:
+            return self.economy_client
+        return self.ai_client
+
+    def _tier_model(self, tier: str) -> str:
+        """Модель, вынесшая вердикт ("provider:model" -> model), для расчета стоимости"""
+        if ":" in tier:
+            return tier.split(":", 1)[1]
+        return getattr(self.ai_client, "model", "") or ""
+
+    @staticmethod
+    def _collect(verdicts: Dict[str, dict], result: Optional[FilterResult]):
+        """Сохраняет краткий вердикт фильтра (используется для обучения локальных классификаторов)"""
+        if result is not None:
+            verdicts[result.filter_id] = {
+                "is_relevant": result.is_relevant,
+                "confidence": result.confidence,
+                "category": result.category,
+                "tier": result.tier,
+                "tokens": result.tokens
+            }
+
+    @staticmethod
+    def _filter_config(filter_model: Filter) -> Dict[str, Any]:
+        """Формирует конфигурацию фильтра для AI"""
+        return {
+            "categories": filter_model.categories,
+            "prompt": filter_model.prompt,
+            "max_text_tokens": filter_model.max_text_tokens
+        }
+
+    @staticmethod
+    def _cacheable(result: FilterResult) -> Dict[str, Any]:
+        """Вердикт без привязки к фильтру (ID фильтра входит в ключ кэша)"""
+        verdict = result.to_dict()
+        verdict.pop("filter_id", None)
+        verdict.pop("tokens", None)
+        return verdict
+
+    @staticmethod
+    def _usage(ai_response: Any, shared: int = 1) -> Dict[str, float]:
+        """Поле usage ответа AI, поделенное на shared фильтров (нули если нет данных)"""
+        usage = ai_response.get("usage") if isinstance(ai_response, dict) else None
+        if not isinstance(usage, dict):
+            usage = {}
+        return {
+            key: float(usage.get(key) or 0) / shared
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+
+    @staticmethod
+    def _parse_verdict(ai_response: Dict[str, Any], filter_model: Filter, tier: str = "llm") -> FilterResult:
+        """
+        Проверяет структуру ответа AI и преобразует его в FilterResult.
+        tier - уровень по умолчанию, если в ответе нет поля tier.
+        Бросает ValueError, если ответ невалиден.
+        """
+        if not isinstance(ai_response, dict):
+            raise ValueError(f"verdict must be an object, got {type(ai_response).__name__}")
+            
+        is_relevant = ai_response.get("is_relevant")
+        if not isinstance(is_relevant, bool):
+            raise ValueError(f"invalid is_relevant: {is_relevant!r}")
+            
+        confidence = ai_response.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"invalid confidence: {confidence!r}")
+        
+        return FilterResult(
+            is_relevant=is_relevant,
+            category=str(ai_response.get("category") or "Other"),
+            confidence=float(confidence),
+            reason=str(ai_response.get("reason") or ""),
+            filter_id=filter_model.id,
+            tier=str(ai_response.get("tier") or tier)
+        )
 
+    @staticmethod
+    def _is_accepted(result: Optional[FilterResult], filter_model: Filter) -> bool:
+        return bool(result and result.is_relevant and result.confidence >= filter_model.threshold)
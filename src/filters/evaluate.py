@@ -0,0 +1,311 @@
+"""
+Офлайн-прогон фильтров по корпусу постов: производительность и качество вердиктов.
+
+Корпус - JSONL или Parquet, одна запись на пост:
+    {"text": "...", "label": true, "labels": {"tech_news": true}, "source_id": "@chan", "priority": 0}
+label - должен ли пост пройти фильтры источника, labels - ожидаемый вердикт отдельных
+фильтров (оба поля необязательны, без них считается только производительность).
+
+Запуск:
+    python -m src.filters.evaluate corpus.jsonl --backend mock --concurrency 16
+    python -m src.filters.evaluate corpus.parquet --backend standin --base-url http://127.0.0.1:8001/v1 --rpm 600
+    python -m src.filters.evaluate corpus.jsonl --backend real -f tech_news --output report.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..ai.client import AIClient, MockAIClient, create_ai_client
+from ..ai.rate_limiter import RateLimiter
+from ..ai.resilience import FallbackAIClient
+from ..config.loader import ConfigLoader
+from ..storage.models import Filter
+from ..utils.logger import setup_logging
+from .engine import FilterEngine, FiltersUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Вердикты, вынесенные без запроса к LLM
+NON_LLM_TIERS = ("local", "local_fallback", "prefilter", "sampled", "cached")
+
+
+class _CountingClient:
+    """Обертка клиента AI: считает запросы к модели (пакетный запрос - один запрос)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls: Counter = Counter()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.client, name)
+        if not name.startswith("analyze_"):
+            return attr
+
+        async def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return await attr(*args, **kwargs)
+        return counted
+
+
+class ConfusionMatrix:
+    def __init__(self):
+        self.tp = self.fp = self.fn = self.tn = 0
+
+    def add(self, expected: bool, predicted: bool):
+        if expected and predicted:
+            self.tp += 1
+        elif predicted:
+            self.fp += 1
+        elif expected:
+            self.fn += 1
+        else:
+            self.tn += 1
+
+    @property
+    def total(self) -> int:
+        return self.tp + self.fp + self.fn + self.tn
+
+    def to_dict(self) -> Dict[str, Any]:
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else None
+        recall = self.tp / (self.tp + self.fn) if self.tp + self.fn else None
+        f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+        return {
+            "tp": self.tp, "fp": self.fp, "fn": self.fn, "tn": self.tn,
+            "accuracy": round((self.tp + self.tn) / self.total, 4) if self.total else None,
+            "precision": round(precision, 4) if precision is not None else None,
+            "recall": round(recall, 4) if recall is not None else None,
+            "f1": round(f1, 4) if f1 is not None else None
+        }
+
+
+class Evaluation:
+    """Накопление результатов прогона"""
+
+    def __init__(self):
+        self.posts = 0
+        self.unavailable = 0
+        self.errors = 0
+        self.tiers: Counter = Counter()
+        self.llm_tokens = 0.0
+        self.llm_verdicts = 0
+        self.overall = ConfusionMatrix()
+        self.per_filter: Dict[str, ConfusionMatrix] = {}
+
+    def add(self, record: Dict[str, Any], accepted: Optional[bool], verdicts: Dict[str, dict],
+            thresholds: Dict[str, float]):
+        self.posts += 1
+        for verdict in verdicts.values():
+            tier = verdict.get("tier", "llm")
+            tokens = float(verdict.get("tokens") or 0)
+            if tier in NON_LLM_TIERS:
+                self.tiers[tier] += 1
+            else:
+                self.tiers["llm"] += 1
+                if tokens:
+                    self.llm_verdicts += 1
+                    self.llm_tokens += tokens
+
+        if accepted is None:
+            return
+        label = record.get("label")
+        if isinstance(label, bool):
+            self.overall.add(label, accepted)
+        for filter_id, expected in (record.get("labels") or {}).items():
+            verdict = verdicts.get(filter_id)
+            if verdict is None or filter_id not in thresholds or not isinstance(expected, bool):
+                continue  # Фильтр не проверялся (First Match остановился раньше)
+            predicted = bool(verdict.get("is_relevant")) and verdict.get("confidence", 0) >= thresholds[filter_id]
+            self.per_filter.setdefault(filter_id, ConfusionMatrix()).add(expected, predicted)
+
+    def report(self, elapsed: float, calls: Counter, cache_hits: int) -> Dict[str, Any]:
+        mean_tokens = self.llm_tokens / self.llm_verdicts if self.llm_verdicts else 0.0
+        llm_calls = sum(calls.values())
+        return {
+            "posts": self.posts,
+            "elapsed": round(elapsed, 2),
+            "posts_per_sec": round(self.posts / elapsed, 2) if elapsed else None,
+            "unavailable": self.unavailable,
+            "errors": self.errors,
+            "llm_calls": llm_calls,
+            "llm_calls_by_method": dict(calls),
+            "llm_calls_per_post": round(llm_calls / self.posts, 3) if self.posts else None,
+            "tokens": round(self.llm_tokens),
+            "tokens_per_post": round(self.llm_tokens / self.posts, 1) if self.posts else None,
+            "verdicts_by_tier": dict(self.tiers),
+            # Оценка сэкономленных токенов: средний расход вердикта LLM на каждый вердикт без LLM
+            "cache_hits": cache_hits,
+            "tokens_saved_by_cache": round(self.tiers["cached"] * mean_tokens),
+            "tokens_saved_by_prefilter": round(self.tiers["prefilter"] * mean_tokens),
+            "tokens_saved_by_local": round((self.tiers["local"] + self.tiers["local_fallback"]) * mean_tokens),
+            "confusion": self.overall.to_dict() if self.overall.total else None,
+            "confusion_by_filter": {fid: m.to_dict() for fid, m in sorted(self.per_filter.items())}
+        }
+
+
+async def read_corpus(path: str, text_field: str = "text") -> AsyncIterator[Dict[str, Any]]:
+    """Записи корпуса по одной (файл не загружается в память целиком)"""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet corpora requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=1000):
+            for record in batch.to_pylist():
+                if record.get(text_field):
+                    yield record
+            await asyncio.sleep(0)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"{path}:{line_number}: invalid JSON skipped ({e})")
+                continue
+            if isinstance(record, dict) and record.get(text_field):
+                yield record
+
+
+def load_filters(path: str, filter_ids: List[str]) -> List[Filter]:
+    """Фильтры из YAML (без БД); по умолчанию - все включенные"""
+    data = ConfigLoader(os.path.dirname(path) or ".").load_yaml(os.path.basename(path)) or {}
+    filters = [Filter(**ConfigLoader.filter_fields(item)) for item in data.get("filters", [])]
+    if filter_ids:
+        filters = [f for f in filters if f.id in filter_ids]
+        # Явно выбранные фильтры проверяются, даже если выключены в конфиге
+        for filter_model in filters:
+            filter_model.enabled = True
+    return [f for f in filters if f.enabled]
+
+
+def create_client(backend: str, base_url: Optional[str], model: Optional[str],
+                  rpm: Optional[int], tpm: Optional[int], concurrency: int):
+    if backend == "mock":
+        return MockAIClient(provider="mock")
+    if backend == "real":
+        return create_ai_client()
+
+    client = AIClient(provider="local", base_url=base_url, model=model or "standin", max_connections=concurrency)
+    if rpm or tpm:
+        # Лимиты по умолчанию рассчитаны на бесплатный Groq - для стенда их можно поднять
+        client.limiter = RateLimiter(f"local/{client.model}", requests_per_minute=rpm,
+                                     tokens_per_minute=tpm, max_concurrency=concurrency)
+    return FallbackAIClient([client])
+
+
+async def evaluate(args) -> Dict[str, Any]:
+    filters = load_filters(args.filters, args.filter)
+    if not filters:
+        raise SystemExit(f"No enabled filters in {args.filters}")
+    thresholds = {f.id: f.threshold for f in filters}
+    logger.info(f"Evaluating {len(filters)} filters: {', '.join(thresholds)} ({args.backend} backend)")
+
+    client = _CountingClient(create_client(
+        args.backend, args.base_url, args.model, args.rpm, args.tpm, args.concurrency
+    ))
+    engine = FilterEngine(client, mode=args.mode)
+    engine.verdict_cache.enabled = not args.no_cache
+    evaluation = Evaluation()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    async def worker():
+        while True:
+            record = await queue.get()
+            if record is None:
+                return
+            verdicts: Dict[str, dict] = {}
+            accepted: Optional[bool] = None
+            try:
+                result = await engine.apply_filters(
+                    record[args.text_field], filters, verdicts,
+                    source_id=record.get("source_id"), source_priority=int(record.get("priority") or 0)
+                )
+                if result is not None:
+                    await result.complete()
+                accepted = result is not None
+            except FiltersUnavailableError:
+                evaluation.unavailable += 1
+            except Exception as e:
+                logger.error(f"Post evaluation failed: {e}")
+                evaluation.errors += 1
+            evaluation.add(record, accepted, verdicts, thresholds)
+            if evaluation.posts % args.progress == 0:
+                logger.info(f"{evaluation.posts} posts, {evaluation.posts / (time.perf_counter() - started):.1f} posts/sec")
+
+    started = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    count = 0
+    async for record in read_corpus(args.corpus, args.text_field):
+        await queue.put(record)
+        count += 1
+        if args.limit and count >= args.limit:
+            break
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - started
+
+    await client.close()
+    return evaluation.report(elapsed, client.calls, engine.verdict_cache.hits)
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Posts:            {report['posts']} in {report['elapsed']}s ({report['posts_per_sec']} posts/sec)")
+    print(f"Not evaluated:    {report['unavailable']} unavailable, {report['errors']} errors")
+    print(f"LLM calls:        {report['llm_calls']} ({report['llm_calls_per_post']} per post) {report['llm_calls_by_method']}")
+    print(f"LLM tokens:       {report['tokens']} ({report['tokens_per_post']} per post)")
+    print(f"Verdicts by tier: {report['verdicts_by_tier']}")
+    print(f"Tokens saved:     cache {report['tokens_saved_by_cache']} ({report['cache_hits']} hits), "
+          f"prefilter {report['tokens_saved_by_prefilter']}, local {report['tokens_saved_by_local']}")
+
+    rows = ([("overall", report["confusion"])] if report["confusion"] else []) + list(report["confusion_by_filter"].items())
+    if rows:
+        print()
+        print(f"{'':<20} {'tp':>6} {'fp':>6} {'fn':>6} {'tn':>6} {'acc':>7} {'prec':>7} {'recall':>7} {'f1':>7}")
+        for name, m in rows:
+            metrics = " ".join(f"{m[k]:>7}" if m[k] is not None else f"{'-':>7}"
+                               for k in ("accuracy", "precision", "recall", "f1"))
+            print(f"{name:<20} {m['tp']:>6} {m['fp']:>6} {m['fn']:>6} {m['tn']:>6} {metrics}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline filter evaluation over a post corpus")
+    parser.add_argument("corpus", help="Корпус постов: .jsonl или .parquet")
+    parser.add_argument("--filters", default="config/filters.yaml", help="YAML с фильтрами")
+    parser.add_argument("-f", "--filter", action="append", default=[], help="ID фильтра (можно несколько)")
+    parser.add_argument("--backend", choices=("mock", "standin", "real"), default="mock",
+                        help="mock - заглушка, standin - локальный сервер, real - провайдер из .env")
+    parser.add_argument("--base-url", default=None, help="URL стенда (по умолчанию http://127.0.0.1:8001/v1)")
+    parser.add_argument("--model", default=None, help="Модель для стенда")
+    parser.add_argument("--rpm", type=int, default=None, help="Лимит запросов в минуту для стенда")
+    parser.add_argument("--tpm", type=int, default=None, help="Лимит токенов в минуту для стенда")
+    parser.add_argument("--mode", choices=("sequential", "fused", "concurrent"), default=None,
+                        help="Режим применения фильтров (по умолчанию FILTER_MODE)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Сколько постов проверять одновременно")
+    parser.add_argument("--limit", type=int, default=0, help="Сколько постов взять из корпуса (0 - все)")
+    parser.add_argument("--text-field", default="text", help="Поле с текстом поста")
+    parser.add_argument("--no-cache", action="store_true", help="Без кэша вердиктов")
+    parser.add_argument("--progress", type=int, default=500, help="Выводить скорость каждые N постов")
+    parser.add_argument("--output", default=None, help="Сохранить отчет в JSON")
+    args = parser.parse_args()
+    args.concurrency = max(1, args.concurrency)
+    args.progress = max(1, args.progress)
+
+    setup_logging(level="INFO", log_file=None)
+    report = asyncio.run(evaluate(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
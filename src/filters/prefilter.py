@@ -0,0 +1,72 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from ..storage.models import Filter
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Посты короче стольких символов отклоняются без запроса к AI (0 - без ограничения)
+PREFILTER_MIN_CHARS = int(os.getenv("PREFILTER_MIN_CHARS", 0))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Категории, слова которых не годятся в ключевые
+_GENERIC_CATEGORIES = {"other", "другое"}
+
+
+def _stem(word: str) -> str:
+    """Грубая основа слова: окончание отбрасывается, чтобы совпадали словоформы (нейросеть/нейросети)"""
+    return word[:max(4, len(word) - 2)] if len(word) > 5 else word
+
+
+@lru_cache(maxsize=256)
+def _keyword_stems(keywords: Tuple[str, ...], categories: Tuple[str, ...]) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Основы ключевых слов фильтра: каждое ключевое слово (фраза) - кортеж основ, совпасть должны все.
+    Без явных ключевых слов используются слова категорий (каждое по отдельности)
+    """
+    if keywords:
+        phrases = [_WORD_RE.findall(k.lower()) for k in keywords]
+    else:
+        phrases = [[word] for c in categories if c.lower() not in _GENERIC_CATEGORIES
+                   for word in _WORD_RE.findall(c.lower()) if len(word) > 1]
+    return tuple(tuple(_stem(w) for w in phrase) for phrase in phrases if phrase)
+
+
+class KeywordPrefilter:
+    """
+    Дешевая проверка поста до запроса к AI.
+
+    Обычный режим отклоняет только слишком короткие посты (PREFILTER_MIN_CHARS).
+    Строгий режим (бюджет AI на исходе) дополнительно требует в тексте хотя бы одно
+    ключевое слово фильтра (Filter.keywords, иначе слова категорий) с точностью до окончания.
+    """
+
+    def __init__(self, min_chars: Optional[int] = None):
+        self.min_chars = PREFILTER_MIN_CHARS if min_chars is None else min_chars
+
+    def reject(self, text: str, filter_model: Filter, strict: bool = False) -> Optional[str]:
+        """Причина отклонения поста или None, если пост нужно проверить AI"""
+        if self.min_chars and len(text.strip()) < self.min_chars:
+            return f"Prefilter: text shorter than {self.min_chars} characters"
+        if not strict:
+            return None
+
+        stems = _keyword_stems(tuple(filter_model.keywords or ()), tuple(filter_model.categories or ()))
+        if not stems:
+            return None
+        words = _WORD_RE.findall(text.lower())
+        if not any(self._matches(phrase, words) for phrase in stems):
+            return "Prefilter: no filter keywords in text"
+        return None
+
+    @staticmethod
+    def _matches(phrase: Tuple[str, ...], words: List[str]) -> bool:
+        # Короткие основы (аббревиатуры вроде "ai", "qa") сравниваются целиком
+        return all(
+            any(w == stem if len(stem) <= 3 else w.startswith(stem) for w in words)
+            for stem in phrase
+        )
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from ..ai.budget import BudgetGovernor, DegradationLevel, budget_level
+from ..ai.client import create_model_client
+from ..ai.rate_limiter import BACKGROUND_SOURCE, request_source
+from ..ai.resilience import ai_deadline
+from ..storage.models import Filter, FilterShadow
+from ..storage.repositories.filter_shadows import SHADOW_COUNTERS
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Одновременных запросов теневых версий (отдельно от основного пути)
+SHADOW_MAX_CONCURRENCY = int(os.getenv("SHADOW_MAX_CONCURRENCY", 2))
+# Сколько теневых проверок может ждать очереди; сверх этого посты в выборку не попадают
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", 20))
+# Дневной лимит токенов на все теневые версии (0 - без ограничения)
+SHADOW_DAILY_TOKEN_CAP = int(os.getenv("SHADOW_DAILY_TOKEN_CAP", 50000))
+# Крайний срок одной теневой проверки (секунды)
+SHADOW_DEADLINE = float(os.getenv("SHADOW_DEADLINE", 60))
+
+# Расход теневых версий учитывается в дневном бюджете под ключами "shadow:<id>"
+SPEND_PREFIX = "shadow:"
+
+
+def compare(shadow: FilterShadow) -> Dict[str, Optional[float]]:
+    """Сравнение теневой версии с живой по накопленным счетчикам"""
+    n = shadow.evaluations or 0.0
+
+    def mean(total: float) -> Optional[float]:
+        return round(total / n, 4) if n else None
+
+    live_tokens, shadow_tokens = mean(shadow.live_tokens), mean(shadow.shadow_tokens)
+    live_latency, shadow_latency = mean(shadow.live_latency), mean(shadow.shadow_latency)
+    return {
+        "evaluations": n,
+        "agreement": mean(shadow.agreements),
+        "live_accept_rate": mean(shadow.live_accepts),
+        "shadow_accept_rate": mean(shadow.shadow_accepts),
+        "live_latency": live_latency,
+        "shadow_latency": shadow_latency,
+        "live_tokens": live_tokens,
+        "shadow_tokens": shadow_tokens,
+        "token_ratio": round(shadow_tokens / live_tokens, 3) if live_tokens and shadow_tokens is not None else None,
+        "latency_ratio": round(shadow_latency / live_latency, 3) if live_latency and shadow_latency is not None else None,
+        "errors": shadow.errors or 0.0
+    }
+
+
+class ShadowEvaluator:
+    """
+    Теневая проверка новых версий фильтров на выборке живых постов.
+
+    После вердикта живой версии пост с вероятностью sample_rate отправляется теневой
+    версии в фоне: основной путь не ждет ее ответа. У теневых запросов свой лимит
+    одновременности, ограниченная очередь, дневной лимит токенов и фоновая очередь
+    ограничителя запросов; при нехватке дневного бюджета AI теневая проверка выключается.
+    """
+
+    def __init__(self, ai_client, budget: BudgetGovernor, validator: Callable[[Dict[str, Any], Filter], Any],
+                 accept: Callable[[Any, Filter], bool], max_concurrency: Optional[int] = None,
+                 max_pending: Optional[int] = None, daily_token_cap: Optional[int] = None):
+        self.ai_client = ai_client
+        self.budget = budget
+        self.validator = validator
+        self.accept = accept
+        self.max_pending = SHADOW_MAX_PENDING if max_pending is None else max_pending
+        self.daily_token_cap = SHADOW_DAILY_TOKEN_CAP if daily_token_cap is None else daily_token_cap
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency or SHADOW_MAX_CONCURRENCY))
+        self._shadows: Dict[str, List[FilterShadow]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._stats: Dict[int, Dict[str, float]] = {}
+        self._tasks = set()
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._shadows)
+
+    def load(self, shadows: List[FilterShadow]):
+        """Подхватывает включенные теневые версии (вызывается периодически)"""
+        grouped: Dict[str, List[FilterShadow]] = {}
+        for shadow in shadows:
+            if shadow.enabled and shadow.sample_rate > 0:
+                grouped.setdefault(shadow.filter_id, []).append(shadow)
+        self._shadows = grouped
+
+    def _client(self, shadow: FilterShadow):
+        if not shadow.model:
+            return self.ai_client
+        if shadow.model not in self._clients:
+            self._clients[shadow.model] = create_model_client(shadow.model)
+        return self._clients[shadow.model]
+
+    def _cap_reached(self) -> bool:
+        if not self.daily_token_cap:
+            return False
+        return self.budget.spent_tokens(SPEND_PREFIX) >= self.daily_token_cap
+
+    def observe(self, text: str, filter_model: Filter, live_accepted: bool, live_latency: float, live_tokens: float):
+        """Вердикт живой версии получен - при попадании в выборку запускает теневые версии"""
+        shadows = self._shadows.get(filter_model.id)
+        if not shadows or budget_level.get() >= DegradationLevel.ECONOMY or self._cap_reached():
+            return
+
+        for shadow in shadows:
+            if random.random() >= shadow.sample_rate:
+                continue
+            client = self._client(shadow)
+            if client is None or len(self._tasks) >= self.max_pending:
+                self.skipped += 1
+                continue
+            task = asyncio.create_task(
+                self._evaluate(client, shadow, text, filter_model, live_accepted, live_latency, live_tokens)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate(self, client, shadow: FilterShadow, text: str, filter_model: Filter,
+                        live_accepted: bool, live_latency: float, live_tokens: float):
+        # Фоновая очередь ограничителя и свой крайний срок (не дедлайн поста)
+        request_source.set(BACKGROUND_SOURCE)
+        config = {
+            "categories": filter_model.categories,
+            "prompt": shadow.prompt or filter_model.prompt,
+            "max_text_tokens": filter_model.max_text_tokens
+        }
+        async with self._semaphore:
+            ai_deadline.set(time.monotonic() + SHADOW_DEADLINE)
+            started = time.perf_counter()
+            try:
+                response = await client.analyze_post(text, config)
+                latency = time.perf_counter() - started
+                result = self.validator(response, filter_model)
+            except Exception as e:
+                logger.debug(f"Shadow {shadow.id} of filter {filter_model.id} failed: {e}")
+                self._add(shadow.id, errors=1)
+                return
+
+        usage = response.get("usage") if isinstance(response.get("usage"), dict) else {}
+        self.budget.record(f"{SPEND_PREFIX}{shadow.id}", self._model(client, response), usage)
+        shadow_accepted = self.accept(result, filter_model)
+        self._add(
+            shadow.id,
+            evaluations=1,
+            agreements=1 if shadow_accepted == live_accepted else 0,
+            live_accepts=1 if live_accepted else 0,
+            shadow_accepts=1 if shadow_accepted else 0,
+            live_latency=live_latency,
+            shadow_latency=latency,
+            live_tokens=live_tokens,
+            shadow_tokens=float(usage.get("total_tokens") or 0)
+        )
+
+    @staticmethod
+    def _model(client, response: Dict[str, Any]) -> str:
+        tier = str(response.get("tier") or "")
+        return tier.split(":", 1)[1] if ":" in tier else getattr(client, "model", "") or ""
+
+    def _add(self, shadow_id: int, **deltas: float):
+        stats = self._stats.setdefault(shadow_id, dict.fromkeys(SHADOW_COUNTERS, 0.0))
+        for key, value in deltas.items():
+            stats[key] += value
+
+    def pop_stats(self) -> Dict[int, Dict[str, float]]:
+        """Приращения счетчиков с прошлого сохранения"""
+        stats, self._stats = self._stats, {}
+        return stats
+
+    def restore_stats(self, stats: Dict[int, Dict[str, float]]):
+        """Возвращает несохраненные приращения (например, после ошибки записи)"""
+        for shadow_id, deltas in stats.items():
+            self._add(shadow_id, **deltas)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for client in self._clients.values():
+            if client is not None:
+                await client.close()
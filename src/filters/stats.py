@@ -0,0 +1,124 @@
+import os
+from typing import Dict, List, Optional, Iterable
+from dotenv import load_dotenv
+from ..storage.models import Filter
+
+load_dotenv()
+
+# Вес токена в "секундах" при оценке стоимости проверки фильтром
+FILTER_TOKEN_COST_WEIGHT = float(os.getenv("FILTER_TOKEN_COST_WEIGHT", 0.001))
+# После стольких проверок счетчики уменьшаются вдвое, чтобы статистика следовала за изменениями потока
+FILTER_STATS_WINDOW = int(os.getenv("FILTER_STATS_WINDOW", 1000))
+
+
+class FilterStats:
+    """Накопленная статистика одного фильтра"""
+    
+    def __init__(self, evaluations: float = 0.0, matches: float = 0.0,
+                 total_latency: float = 0.0, total_tokens: float = 0.0):
+        self.evaluations = evaluations
+        self.matches = matches
+        self.total_latency = total_latency
+        self.total_tokens = total_tokens
+
+    @property
+    def match_rate(self) -> float:
+        # Сглаживание Лапласа: новый фильтр не считается ни бесполезным, ни идеальным
+        return (self.matches + 1.0) / (self.evaluations + 2.0)
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        return self.total_latency / self.evaluations if self.evaluations else None
+
+    @property
+    def mean_tokens(self) -> Optional[float]:
+        return self.total_tokens / self.evaluations if self.evaluations else None
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "evaluations": self.evaluations,
+            "matches": self.matches,
+            "total_latency": self.total_latency,
+            "total_tokens": self.total_tokens
+        }
+
+
+class FilterStatsTracker:
+    """
+    Статистика фильтров (доля срабатываний, средняя задержка и токены)
+    и порядок проверки, минимизирующий ожидаемую стоимость решения.
+    """
+    
+    def __init__(self, token_cost_weight: Optional[float] = None, window: Optional[int] = None):
+        self.token_cost_weight = FILTER_TOKEN_COST_WEIGHT if token_cost_weight is None else token_cost_weight
+        self.window = window or FILTER_STATS_WINDOW
+        self._stats: Dict[str, FilterStats] = {}
+        self._dirty: set = set()
+
+    def get(self, filter_id: str) -> FilterStats:
+        return self._stats.setdefault(filter_id, FilterStats())
+
+    def record(self, filter_id: str, matched: bool, latency: float, tokens: float = 0.0):
+        """Учитывает результат одной проверки"""
+        stats = self.get(filter_id)
+        stats.evaluations += 1
+        stats.matches += 1 if matched else 0
+        stats.total_latency += latency
+        stats.total_tokens += tokens
+            
+        if stats.evaluations >= self.window:
+            stats.evaluations /= 2
+            stats.matches /= 2
+            stats.total_latency /= 2
+            stats.total_tokens /= 2
+                
+        self._dirty.add(filter_id)
+
+    def cost(self, filter_id: str) -> Optional[float]:
+        """Средняя стоимость одной проверки фильтром (None если данных нет)"""
+        stats = self._stats.get(filter_id)
+        if not stats or not stats.evaluations:
+            return None
+        return stats.mean_latency + self.token_cost_weight * stats.mean_tokens
+
+    def order(self, filters: Iterable[Filter]) -> List[Filter]:
+        """
+        Порядок проверки для стратегии First Match.
+        
+        Фильтры с явным priority идут первыми (по возрастанию priority).
+        Остальные сортируются по cost / match_rate: такой порядок минимизирует
+        ожидаемую стоимость до первого срабатывания. Для фильтров без статистики
+        берется средняя стоимость по известным фильтрам.
+        """
+        filters = list(filters)
+        explicit = sorted((f for f in filters if f.priority is not None), key=lambda f: f.priority)
+        adaptive = [f for f in filters if f.priority is None]
+        
+        known_costs = [c for c in (self.cost(f.id) for f in adaptive) if c is not None]
+        default_cost = sum(known_costs) / len(known_costs) if known_costs else 1.0
+        
+        def expected_cost(item):
+            position, filter_model = item
+            cost = self.cost(filter_model.id)
+            cost = default_cost if cost is None else cost
+            # Позиция - детерминированный tie-break при равной стоимости
+            return (cost / self.get(filter_model.id).match_rate, position)
+        
+        adaptive = [f for _, f in sorted(enumerate(adaptive), key=expected_cost)]
+        return explicit + adaptive
+
+    def restore(self, stats: Dict[str, dict]):
+        """Загружает сохраненную статистику"""
+        for filter_id, values in stats.items():
+            self._stats[filter_id] = FilterStats(**values)
+
+    def pop_dirty(self) -> Dict[str, dict]:
+        """Возвращает статистику, изменившуюся с прошлого сохранения"""
+        dirty = {filter_id: self._stats[filter_id].to_dict() for filter_id in self._dirty}
+        self._dirty.clear()
+        return dirty
+
+    def mark_dirty(self, filter_ids: Iterable[str]):
+        """Возвращает фильтры в очередь на сохранение (например, после ошибки записи)"""
+        self._dirty.update(filter_ids)
+
@@ -0,0 +1,120 @@
+"""
+Обучение локальных классификаторов по вердиктам LLM из processed_posts.
+
+Запуск:
+    python -m src.filters.train_classifier               # обучить модели для всех фильтров
+    python -m src.filters.train_classifier -f tech_news  # только для указанных фильтров
+    python -m src.filters.train_classifier --report      # отчет о дрейфе текущих моделей
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from ..storage.database import async_session_maker
+from ..storage.models import ProcessedPost, Filter
+from ..storage.repositories.filters import FilterRepository
+from ..utils.logger import setup_logging
+from .classifier import ClassifierRegistry, LocalClassifier, extract_features
+
+logger = logging.getLogger(__name__)
+
+# Вердикты, вынесенные без LLM: локальным классификатором, префильтром, выборкой по бюджету
+# или повтором из кэша вердиктов (метка уже учтена по исходному ответу LLM)
+LOCAL_TIERS = ("local", "local_fallback", "prefilter", "sampled", "cached")
+
+
+async def load_samples(filters: List[Filter], limit: int) -> Dict[str, List[Tuple[str, bool, Optional[str]]]]:
+    """
+    Собирает обучающие примеры для фильтров из последних обработанных постов.
+    Используются только вердикты LLM (вердикты самого классификатора не подходят).
+    """
+    thresholds = {f.id: f.threshold for f in filters}
+    samples: Dict[str, List[Tuple[str, bool, Optional[str]]]] = {f.id: [] for f in filters}
+
+    async with async_session_maker() as session:
+        query = (
+            select(ProcessedPost.text, ProcessedPost.verdicts)
+            .where(ProcessedPost.text.is_not(None), ProcessedPost.verdicts.is_not(None))
+            .order_by(ProcessedPost.id.desc())
+            .limit(limit)
+        )
+        result = await session.execute(query)
+
+        for text, verdicts in result.all():
+            for filter_id, verdict in (verdicts or {}).items():
+                if filter_id not in samples or verdict.get("tier", "llm") in LOCAL_TIERS:
+                    continue
+                accepted = bool(verdict.get("is_relevant")) and verdict.get("confidence", 0) >= thresholds[filter_id]
+                samples[filter_id].append((text, accepted, verdict.get("category")))
+
+    return samples
+
+
+async def train(filter_ids: List[str], limit: int):
+    registry = ClassifierRegistry(enabled=True)
+
+    async with async_session_maker() as session:
+        filters = await FilterRepository(session).list_all(limit=10000)
+    if filter_ids:
+        filters = [f for f in filters if f.id in filter_ids]
+
+    samples = await load_samples(filters, limit)
+
+    for filter_model in filters:
+        data = samples[filter_model.id]
+        if not data:
+            logger.warning(f"No LLM verdicts for filter {filter_model.id}, skipping")
+            continue
+
+        model = LocalClassifier.train(filter_model, data)
+        registry.save(model)
+        status = "enabled" if model.usable else "disabled (not enough data or accuracy)"
+        logger.info(f"Trained classifier for {filter_model.id}: {status} {json.dumps(model.metrics)}")
+
+
+async def report(filter_ids: List[str], limit: int):
+    """Качество текущих моделей на свежих вердиктах LLM (дрейф относительно обучения)"""
+    registry = ClassifierRegistry(enabled=True)
+
+    async with async_session_maker() as session:
+        filters = await FilterRepository(session).list_all(limit=10000)
+    if filter_ids:
+        filters = [f for f in filters if f.id in filter_ids]
+
+    samples = await load_samples(filters, limit)
+
+    for filter_model in filters:
+        model = registry.get(filter_model)
+        if model is None:
+            logger.info(f"{filter_model.id}: no usable classifier for current prompt version")
+            continue
+
+        data = [(extract_features(text), label) for text, label, _ in samples[filter_model.id]]
+        current = model.evaluate(data, registry.low, registry.high)
+        logger.info(
+            f"{filter_model.id}: trained {model.trained_at} "
+            f"confident_accuracy {model.metrics.get('confident_accuracy')} -> {current['confident_accuracy']}, "
+            f"coverage {model.metrics.get('coverage')} -> {current['coverage']} "
+            f"({current['holdout']} recent posts)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local classifier training for AI Post Filter")
+    parser.add_argument("-f", "--filter", action="append", default=[], help="ID фильтра (можно несколько)")
+    parser.add_argument("--limit", type=int, default=20000, help="Сколько последних постов использовать")
+    parser.add_argument("--report", action="store_true", help="Только отчет о дрейфе, без обучения")
+    args = parser.parse_args()
+
+    setup_logging(level="INFO", log_file=None)
+
+    if args.report:
+        asyncio.run(report(args.filter, args.limit))
+    else:
+        asyncio.run(train(args.filter, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,13 +21,13 @@ class BaseProvider(ABC):
         
         Args:
             channels: Список ID/юзернеймов каналов
-            callback: Функция, которая будет вызываться при новом посте
+            callback: Функция, которая будет вызываться при новом посте (src.core.post.Post)
         """
         pass
         
     @abstractmethod
     async def forward_message(self, target_id: str, message_obj: Any, extra_text: str = ""):
-        """Пересылка сообщения в целевой канал"""
+        """Пересылка поста (message_obj - Post) в целевой канал"""
         pass
 
 
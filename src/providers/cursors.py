@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, Optional
+
+
+class CursorStore:
+    """
+    Курсоры источников в памяти: максимальный обработанный ID поста по source_id.
+
+    Курсор только растет. Сохранением в БД (таблица source_cursors) занимается
+    координатор по изменившимся курсорам, как и для статистики фильтров.
+
+    Пока догрузка не закрыла разрыв в истории источника (hold), живые посты курсор
+    не сдвигают: иначе он перескочил бы еще не догруженные посты. Их ID копятся
+    и применяются в release.
+    """
+
+    def __init__(self):
+        self._cursors: Dict[str, int] = {}
+        self._dirty: set = set()
+        # source_id -> максимальный ID живого поста, отложенный до конца догрузки
+        self._held: Dict[str, int] = {}
+
+    def get(self, source_id: str) -> Optional[int]:
+        return self._cursors.get(source_id)
+
+    def advance(self, source_id: str, post_id: int):
+        if source_id not in self._cursors or post_id > self._cursors[source_id]:
+            self._cursors[source_id] = post_id
+            self._dirty.add(source_id)
+
+    def advance_live(self, source_id: str, post_id: int):
+        """Курсор по обработанному живому посту (откладывается, пока у источника есть разрыв)"""
+        if source_id in self._held:
+            self._held[source_id] = max(self._held[source_id], post_id)
+        else:
+            self.advance(source_id, post_id)
+
+    def hold(self, source_id: str):
+        """Разрыв в истории источника: курсор двигает только догрузка"""
+        self._held.setdefault(source_id, 0)
+
+    def release(self, source_id: str):
+        """Разрыв закрыт: применяются отложенные живые посты"""
+        post_id = self._held.pop(source_id, None)
+        if post_id:
+            self.advance(source_id, post_id)
+
+    def restore(self, cursors: Dict[str, int]):
+        """Загружает сохраненные курсоры (не откатывая более новые)"""
+        for source_id, post_id in cursors.items():
+            if post_id > self._cursors.get(source_id, 0):
+                self._cursors[source_id] = post_id
+
+    def pop_dirty(self) -> Dict[str, int]:
+        """Курсоры, изменившиеся с прошлого сохранения"""
+        dirty = {source_id: self._cursors[source_id] for source_id in self._dirty}
+        self._dirty.clear()
+        return dirty
+
+    def mark_dirty(self, source_ids: Iterable[str]):
+        """Возвращает курсоры в очередь на сохранение (например, после ошибки записи)"""
+        self._dirty.update(source_ids)
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Сколько ждать следующее сообщение альбома (секунды с последнего сообщения группы)
+TELEGRAM_ALBUM_WINDOW = float(os.getenv("TELEGRAM_ALBUM_WINDOW", 0.8))
+
+
+class AlbumAggregator:
+    """
+    Сборка альбомов: Telegram присылает альбом как N сообщений с общим grouped_id
+    (подпись обычно только у одного). Сообщения группы копятся, пока в течение окна
+    приходят новые, затем альбом передается дальше одним списком, отсортированным по ID.
+    """
+
+    def __init__(self, emit: Callable[[int, List[Any]], Awaitable[None]], window: float = None):
+        self.emit = emit
+        self.window = TELEGRAM_ALBUM_WINDOW if window is None else window
+        self._albums: Dict[Tuple[int, int], List[Any]] = {}
+        self._deadlines: Dict[Tuple[int, int], float] = {}
+        self._tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+
+    def add(self, peer_id: int, message: Any):
+        """Добавляет сообщение альбома (message.grouped_id задан)"""
+        key = (peer_id, message.grouped_id)
+        album = self._albums.setdefault(key, [])
+        if all(m.id != message.id for m in album):
+            album.append(message)
+        self._deadlines[key] = asyncio.get_running_loop().time() + self.window
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._wait(key))
+
+    async def _wait(self, key: Tuple[int, int]):
+        loop = asyncio.get_running_loop()
+        # Окно продлевается каждым новым сообщением группы
+        while (delay := self._deadlines[key] - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        await self._emit(key)
+
+    async def _emit(self, key: Tuple[int, int]):
+        album = self._albums.pop(key)
+        self._deadlines.pop(key, None)
+        self._tasks.pop(key, None)
+        try:
+            await self.emit(key[0], sorted(album, key=lambda m: m.id))
+        except Exception as e:
+            logger.error(f"Error handling Telegram album {key[1]}: {e}")
+
+    async def flush(self):
+        """Передает все недособранные альбомы (при остановке)"""
+        for key, task in list(self._tasks.items()):
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            if key in self._albums:
+                await self._emit(key)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+from telethon.errors import FloodWaitError
+from ..cursors import CursorStore
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Догрузка постов, пропущенных во время простоя или переподключения
+TELEGRAM_BACKFILL_ENABLED = os.getenv("TELEGRAM_BACKFILL_ENABLED", "true").lower() == "true"
+# Сколько каналов догружается одновременно
+TELEGRAM_BACKFILL_CONCURRENCY = int(os.getenv("TELEGRAM_BACKFILL_CONCURRENCY", 3))
+# Максимум постов канала за одну догрузку (0 - без ограничения); остальные - при следующей
+TELEGRAM_BACKFILL_MAX_MESSAGES = int(os.getenv("TELEGRAM_BACKFILL_MAX_MESSAGES", 1000))
+# Пауза между пачками (по 100 сообщений) одного канала, секунды
+TELEGRAM_BACKFILL_BATCH_DELAY = float(os.getenv("TELEGRAM_BACKFILL_BATCH_DELAY", 1.0))
+
+
+class TelegramBackfill:
+    """
+    Догрузка пропущенных постов каналов по курсорам (последний обработанный ID).
+
+    Сообщения новее курсора читаются через iter_messages(min_id=...) от старых к новым
+    пачками с паузой между ними; каналы обрабатываются параллельно, но не больше
+    TELEGRAM_BACKFILL_CONCURRENCY одновременно. FloodWait приостанавливает только свой
+    канал, после паузы чтение продолжается с последнего догруженного поста. Пока разрыв
+    не догружен (в том числе после остановки на max_messages), живые посты не сдвигают
+    курсор. Посты идут в обычный конвейер, повторы отсекает дедупликация, поэтому
+    догрузка идемпотентна.
+    """
+
+    def __init__(self, client, cursors: CursorStore, handle: Callable[[int, Any], Awaitable[None]],
+                 concurrency: int = None, max_messages: int = None, batch_delay: float = None,
+                 on_flood: Optional[Callable[[float], None]] = None):
+        self.client = client
+        self.on_flood = on_flood
+        self.cursors = cursors
+        self.handle = handle
+        self.max_messages = TELEGRAM_BACKFILL_MAX_MESSAGES if max_messages is None else max_messages
+        self.batch_delay = TELEGRAM_BACKFILL_BATCH_DELAY if batch_delay is None else batch_delay
+        self._semaphore = asyncio.Semaphore(max(1, concurrency or TELEGRAM_BACKFILL_CONCURRENCY))
+        self._active = set()
+
+    async def run(self, channels: Dict[str, int]):
+        """Догружает каналы {source_id: peer_id}; каналы, которые уже догружаются, пропускаются"""
+        channels = {source_id: peer_id for source_id, peer_id in channels.items() if source_id not in self._active}
+        if not channels:
+            return
+        self._active.update(channels)
+        try:
+            counts = await asyncio.gather(
+                *(self._backfill_channel(source_id, peer_id) for source_id, peer_id in channels.items()),
+                return_exceptions=True
+            )
+        finally:
+            self._active.difference_update(channels)
+            
+        total = 0
+        for source_id, count in zip(channels, counts):
+            if isinstance(count, Exception):
+                logger.error(f"Telegram backfill of {source_id} failed: {count}")
+            else:
+                total += count
+        logger.info(f"Telegram backfill finished: {total} missed posts from {len(channels)} channels")
+
+    async def _backfill_channel(self, source_id: str, peer_id: int) -> int:
+        async with self._semaphore:
+            if self.cursors.get(source_id) is None:
+                # Канал без курсора (первый запуск) - догружать нечего, начинаем с текущего поста
+                latest = await self._latest_id(source_id, peer_id)
+                self.cursors.advance(source_id, latest)
+                return 0
+
+            # Живые посты не сдвигают курсор, пока разрыв не догружен; прогресс догрузки -
+            # свой, поэтому повтор после FloodWait продолжает с него, а не с курсора
+            self.cursors.hold(source_id)
+            last = self.cursors.get(source_id)
+            count = 0
+            try:
+                while not self.max_messages or count < self.max_messages:
+                    try:
+                        async for message in self.client.iter_messages(
+                            peer_id, min_id=last, reverse=True,
+                            limit=self.max_messages - count if self.max_messages else None,
+                            wait_time=self.batch_delay
+                        ):
+                            await self.handle(peer_id, message)
+                            last = message.id
+                            count += 1
+                        break
+                    except FloodWaitError as e:
+                        # Продолжим с последнего догруженного поста после паузы
+                        logger.warning(f"Telegram backfill of {source_id}: flood wait {e.seconds}s")
+                        self._flood(e.seconds)
+                        await asyncio.sleep(e.seconds + 1)
+            finally:
+                # Все до last передано в конвейер - это нижняя граница разрыва
+                self.cursors.advance(source_id, last)
+
+            if self.max_messages and count >= self.max_messages:
+                # Курсор остается на last до следующей догрузки, живые посты его не сдвигают
+                logger.warning(f"Telegram backfill of {source_id} stopped after {count} posts, "
+                               f"the rest will be fetched on the next catch-up")
+            else:
+                self.cursors.release(source_id)
+            return count
+
+    async def _latest_id(self, source_id: str, peer_id: int) -> int:
+        while True:
+            try:
+                latest = await self.client.get_messages(peer_id, limit=1)
+                return latest[0].id if latest else 0
+            except FloodWaitError as e:
+                logger.warning(f"Telegram backfill of {source_id}: flood wait {e.seconds}s")
+                self._flood(e.seconds)
+                await asyncio.sleep(e.seconds + 1)
+
+    def _flood(self, seconds: float):
+        # Лимит аккаунта учитывается пулом (долгий FloodWait переносит каналы на другие аккаунты)
+        if self.on_flood is not None:
+            self.on_flood(seconds)
@@ -1,117 +1,461 @@
 import os
 import asyncio
-from typing import List, Callable, Any
-from telethon import TelegramClient, events
-from telethon.tl.types import Message
+from typing import Dict, List, Callable, Any, Optional
+from telethon import TelegramClient, events, utils
+from telethon.errors import ChannelPrivateError, ChannelsTooMuchError, FloodWaitError
+from telethon.tl.functions.channels import JoinChannelRequest
+from telethon.tl.types import Message, PeerChannel, UpdateChannel, UpdateNewChannelMessage
 from ..base import BaseProvider
+from .entities import ChannelInfo, EntityCache
+from .backfill import TELEGRAM_BACKFILL_ENABLED, TelegramBackfill
+from .albums import AlbumAggregator
+from .pool import (
+    BANNED_ERRORS, TELEGRAM_ACCOUNTS, TELEGRAM_SENDER_ACCOUNTS, AccountPool, TelegramAccount, parse_accounts
+)
+from ..cursors import CursorStore
+from ...core.post import Post
 from dotenv import load_dotenv
 import logging
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Как часто проверять соединение (после переподключения пропущенные посты догружаются)
+TELEGRAM_CONNECTION_CHECK_INTERVAL = float(os.getenv("TELEGRAM_CONNECTION_CHECK_INTERVAL", 15))
+# Пауза между запросами разрешения username новых каналов (секунды, у каждого аккаунта своя очередь)
+TELEGRAM_RESOLVE_INTERVAL = float(os.getenv("TELEGRAM_RESOLVE_INTERVAL", 2.0))
+
 class TelegramProvider(BaseProvider):
     def __init__(self):
         self.api_id = int(os.getenv("TELEGRAM_API_ID", 0))
         self.api_hash = os.getenv("TELEGRAM_API_HASH")
         self.phone = os.getenv("TELEGRAM_PHONE")
-        self.client = TelegramClient('ai_filter_session', self.api_id, self.api_hash)
         self.callback = None
-        
+        # Метаданные каналов и привязка к source_id из БД (без get_chat на каждое сообщение)
+        self.entities = EntityCache()
+        self._refreshing = set()
+        # Последний обработанный пост каждого канала (сохраняется координатором в БД)
+        self.cursors = CursorStore()
+        # Сообщения альбома (общий grouped_id) собираются в один пост
+        self.albums = AlbumAggregator(self._dispatch)
+
+        # Пул аккаунтов: каналы распределяются между аккаунтами, пересылка чередует отправителей
+        senders = {name.strip() for name in TELEGRAM_SENDER_ACCOUNTS.split(",") if name.strip()}
+        accounts = []
+        for name, phone in parse_accounts(TELEGRAM_ACCOUNTS, self.phone):
+            account = TelegramAccount(
+                name, phone, TelegramClient(name, self.api_id, self.api_hash),
+                sender=not senders or name in senders
+            )
+            account.backfill = TelegramBackfill(account.client, self.cursors, self._on_message, on_flood=account.limit)
+            accounts.append(account)
+        self.pool = AccountPool(accounts)
+
+        self._channels: Dict[str, int] = {}  # source_id -> peer id отслеживаемых каналов
+        self._owners: Dict[int, str] = {}  # peer id -> аккаунт, который его слушает (фильтр входящих обновлений)
+        self._assigned: Dict[str, str] = {}  # source_id -> аккаунт (включая ожидающие разрешения)
+        self._pending = set()  # source_id, ожидающие разрешения username
+        self._excluded: Dict[str, set] = {}  # source_id -> аккаунты, которые не могут вступить в канал
+        self._available = frozenset()
+        self.is_monitoring = False
+        self._inflight = set()
+        self._tasks = set()
+
+    @property
+    def client(self) -> TelegramClient:
+        """Клиент основного аккаунта"""
+        return self.pool.primary.client
+
     async def start(self):
         logger.info("Starting Telegram Provider...")
-        try:
-            await self.client.start(phone=self.phone)
-            me = await self.client.get_me()
-            logger.info(f"Telegram connected as {me.username}")
-        except Exception as e:
-            logger.error(f"Failed to start Telegram client: {e}")
-            raise
+        self.entities.load()
+        for account in self.pool:
+            try:
+                await account.client.start(phone=account.phone)
+                me = await account.client.get_me()
+                logger.info(f"Telegram account {account.name} connected as {me.username}")
+            except Exception as e:
+                logger.error(f"Failed to start Telegram client {account.name}: {e}")
+                account.ban(e)
+        if not self.pool.available_names():
+            raise RuntimeError("No Telegram account could be started")
+        self._available = self.pool.available_names()
 
     async def stop(self):
         logger.info("Stopping Telegram Provider...")
-        await self.client.disconnect()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.albums.flush()
+        self.entities.save()
+        for account in self.pool:
+            await account.client.disconnect()
+
+    def _cached_peer(self, channel: str, account: TelegramAccount) -> Optional[int]:
+        """peer id канала, если этот аккаунт его уже разрешал (в том числе в прошлых запусках)"""
+        peer_id = self.entities.find(channel)
+        if peer_id is None or self.entities.get(peer_id) is None:
+            return None
+        # Канал без записанного аккаунта разрешался до появления пула - основным аккаунтом
+        if (self.entities.account(peer_id) or self.pool.primary.name) != account.name:
+            return None
+        return peer_id
+
+    def _watch(self, channel: str, peer_id: int, account: TelegramAccount):
+        self.entities.bind(peer_id, channel, account.name)
+        self._channels[channel] = peer_id
+        self._owners[peer_id] = account.name
+
+    async def _resolve_loop(self, account: TelegramAccount):
+        """
+        Фоновое разрешение username новых каналов аккаунта (и вступление в них)
+        с ограничением частоты запросов. Канал начинает отслеживаться сразу после
+        разрешения, старт не ждет всю очередь.
+        """
+        queue = account.resolve_queue
+        while True:
+            channel = await queue.get()
+            if channel not in self._pending or self._assigned.get(channel) != account.name:
+                continue  # Источник удален или переназначен, пока ждал очереди
+            try:
+                # Telethon принимает int ID или username
+                entity = await account.client.get_entity(int(channel) if channel.lstrip('-').isdigit() else channel)
+                if getattr(entity, "left", False):
+                    # Обновления канала приходят только его участникам
+                    await account.client(JoinChannelRequest(entity))
+            except FloodWaitError as e:
+                account.limit(e.seconds)
+                queue.put_nowait(channel)
+                await asyncio.sleep(e.seconds + 1)
+                continue
+            except BANNED_ERRORS as e:
+                account.ban(e)
+                self._rebalance()
+                continue
+            except ChannelsTooMuchError as e:
+                # Аккаунт достиг лимита каналов - канал уходит следующему аккаунту
+                logger.warning(f"Telegram account {account.name} cannot join {channel}: {e}")
+                self._excluded.setdefault(channel, set()).add(account.name)
+                self.remove_channel(channel)
+                self.add_channel(channel)
+                continue
+            except Exception as e:
+                logger.error(f"Failed to resolve Telegram channel {channel}: {e}")
+                self._pending.discard(channel)
+                self._assigned.pop(channel, None)
+                continue
+
+            self._pending.discard(channel)
+            peer_id = self.entities.put(entity).peer_id
+            self._watch(channel, peer_id, account)
+            logger.info(f"Telegram channel {channel} resolved by {account.name}, "
+                        f"monitoring {len(self._channels)} channels")
+            if TELEGRAM_BACKFILL_ENABLED:
+                self._spawn(account.backfill.run({channel: peer_id}))
+            if queue.empty():
+                self.entities.save()
+            await asyncio.sleep(TELEGRAM_RESOLVE_INTERVAL)
+
+    def add_channel(self, channel: str) -> bool:
+        """
+        Добавляет канал в мониторинг во время работы.
+        True - канал уже в кэше и отслеживается сразу, иначе он встает в очередь разрешения
+        аккаунта, которому назначен.
+        """
+        if channel in self._assigned:
+            return channel in self._channels
+        account = self.pool.owner(channel, exclude=self._excluded.get(channel, ()))
+        if account is None:
+            logger.error(f"No Telegram account available for channel {channel}")
+            return False
+        self._assigned[channel] = account.name
+        peer_id = self._cached_peer(channel, account)
+        if peer_id is not None:
+            self._watch(channel, peer_id, account)
+            return True
+        self._pending.add(channel)
+        account.resolve_queue.put_nowait(channel)
+        return False
+
+    def remove_channel(self, channel: str):
+        """Убирает канал из мониторинга во время работы"""
+        self._pending.discard(channel)
+        self._assigned.pop(channel, None)
+        peer_id = self._channels.pop(channel, None)
+        if peer_id is not None:
+            self._owners.pop(peer_id, None)
+
+    async def set_channels(self, channels: List[str]):
+        """Приводит набор отслеживаемых каналов к списку источников (добавленные и удаленные)"""
+        wanted = set(channels)
+        for channel in set(self._assigned) - wanted:
+            self.remove_channel(channel)
+            logger.info(f"Telegram channel {channel} removed from monitoring")
+
+        added = {}
+        for channel in channels:
+            if channel not in self._assigned and self.add_channel(channel):
+                added[channel] = self._channels[channel]
+        if added:
+            self._spawn(self.catch_up(added))
+
+    def _rebalance(self):
+        """
+        Доступность аккаунтов изменилась (бан, долгий FloodWait, восстановление) -
+        каналы переходят к аккаунтам, которые назначает кольцо. Пропущенное за время
+        переезда догружается новым аккаунтом по курсору.
+        """
+        available = self.pool.available_names()
+        if available == self._available:
+            return
+        self._available = available
+
+        moved = 0
+        for channel in list(self._assigned):
+            owner = self.pool.owner(channel, exclude=self._excluded.get(channel, ()))
+            if owner is not None and owner.name != self._assigned[channel]:
+                self.remove_channel(channel)
+                self.add_channel(channel)
+                moved += 1
+        logger.warning(f"Telegram accounts available: {sorted(available)}, {moved} channels reassigned")
+
+    def _channel_info(self, peer_id: int, entities: Dict[int, Any]) -> ChannelInfo:
+        """Метаданные канала сообщения без сетевых запросов"""
+        info = self.entities.get(peer_id)
+        if info is not None and not info.stale:
+            return info
+
+        # Сущность канала обычно приходит вместе с обновлением
+        chat = entities.get(peer_id)
+        if chat is not None:
+            return self.entities.put(chat)
+        self._refresh_later(peer_id)
+        return info or ChannelInfo(peer_id)
+
+    def _refresh_later(self, peer_id: int):
+        """Обновление метаданных канала в фоне (обработчик сообщения не ждет сеть)"""
+        account = self.pool.get(self._owners.get(peer_id))
+        if peer_id in self._refreshing or account is None:
+            return
+        self._refreshing.add(peer_id)
+
+        async def refresh():
+            try:
+                self.entities.put(await account.client.get_entity(peer_id))
+            except Exception as e:
+                logger.warning(f"Failed to refresh Telegram channel {peer_id}: {e}")
+            finally:
+                self._refreshing.discard(peer_id)
+
+        self._spawn(refresh())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _on_message(self, peer_id: int, message: Message):
+        """Сообщение канала (живое или догруженное): альбомы копятся, остальное сразу в конвейер"""
+        if message.grouped_id:
+            self.albums.add(peer_id, message)
+        else:
+            await self._dispatch(peer_id, [message])
+
+    async def _dispatch(self, peer_id: int, messages: List[Message]):
+        """
+        Передает пост в конвейер (общий путь для живых и догруженных постов).
+        Альбом - один пост: текст всех подписей, ID поста - ID первого сообщения.
+        """
+        first = messages[0]
+        text = "\n".join(t for t in (m.text or m.message or "" for m in messages) if t)
+        media = any(m.media for m in messages)
+        # Курсор сдвигается только после передачи поста (для альбома - до последнего сообщения)
+        source_key = self.entities.source_key(peer_id)
+        last_id = max(m.id for m in messages)
+
+        # Игнорируем пустые сообщения (хотя могут быть медиа)
+        if not text and not media:
+            if source_key:
+                self.cursors.advance_live(source_key, last_id)
+            return
+
+        # Инфо о канале из кэша; source_id - как в конфигурации источника
+        info = self.entities.get(peer_id) or ChannelInfo(peer_id)
+        source_id = source_key or str(peer_id)
+
+        # Один и тот же пост может прийти одновременно живым обновлением и догрузкой
+        key = (peer_id, first.id)
+        if key in self._inflight:
+            return
+        self._inflight.add(key)
+
+        # Для пересылки достаточно peer id и ID сообщений (альбом пересылается целиком)
+        post = Post(
+            source_type="telegram",
+            source_id=source_id,
+            post_id=str(first.id),
+            text=text,
+            source_name=info.name,
+            media=media,
+            peer_id=peer_id,
+            message_ids=tuple(m.id for m in messages)
+        )
+
+        try:
+            if self.callback:
+                await self.callback(post)
+            if source_key:
+                self.cursors.advance_live(source_key, last_id)
+        finally:
+            self._inflight.discard(key)
+
+    async def catch_up(self, channels: Optional[Dict[str, int]] = None):
+        """Догружает посты, опубликованные с момента последнего обработанного (каждый канал - своим аккаунтом)"""
+        if not TELEGRAM_BACKFILL_ENABLED:
+            return
+        by_account: Dict[str, Dict[str, int]] = {}
+        for channel, peer_id in (self._channels if channels is None else channels).items():
+            owner = self._owners.get(peer_id)
+            if owner:
+                by_account.setdefault(owner, {})[channel] = peer_id
+        await asyncio.gather(*(self.pool.get(name).backfill.run(group) for name, group in by_account.items()))
+
+    async def _watch_connection(self, account: TelegramAccount):
+        """После потери соединения - переподключение и догрузка пропущенных постов аккаунта"""
+        disconnected = False
+        while True:
+            await asyncio.sleep(TELEGRAM_CONNECTION_CHECK_INTERVAL)
+            # Истекший FloodWait или бан меняют распределение каналов
+            self._rebalance()
+            if account.banned:
+                continue
+            if not account.client.is_connected():
+                if not disconnected:
+                    logger.warning(f"Telegram connection lost ({account.name})")
+                disconnected = True
+                try:
+                    await account.client.connect()
+                except Exception as e:
+                    logger.warning(f"Telegram reconnect failed ({account.name}): {e}")
+                    continue
+            if disconnected and account.client.is_connected():
+                disconnected = False
+                logger.info(f"Telegram reconnected ({account.name}), catching up on missed posts")
+                channels = {ch: peer for ch, peer in self._channels.items() if self._owners.get(peer) == account.name}
+                self._spawn(self.catch_up(channels))
 
     async def monitor_channels(self, channels: List[str], callback: Callable):
         """
         Начинает слушать указанные каналы.
+        Каналы распределяются между аккаунтами пула; входящие обновления каждого аккаунта
+        фильтруются по словарю peer id -> аккаунт, который можно менять во время работы
+        (set_channels / add_channel / remove_channel). Каналы из кэша отслеживаются
+        сразу, остальные разрешаются в фоне, поэтому время старта не зависит от числа каналов.
+        Посты, пропущенные с прошлого запуска (по курсорам), догружаются в фоне.
         """
         self.callback = callback
-        
-        # Нормализация имен каналов (обеспечиваем int или str)
-        entity_ids = []
-        for ch in channels:
-            try:
-                # Пытаемся преобразовать в int если это ID
-                if ch.lstrip('-').isdigit():
-                    entity_ids.append(int(ch))
-                else:
-                    entity_ids.append(ch)
-            except ValueError:
-                entity_ids.append(ch)
-                
-        logger.info(f"Monitoring Telegram channels: {entity_ids}")
-
-        @self.client.on(events.NewMessage(chats=entity_ids))
-        async def handler(event):
+        if not self.is_monitoring:
+            self.is_monitoring = True
+            for account in self.pool:
+                self._register_handlers(account)
+                self._spawn(self._resolve_loop(account))
+                self._spawn(self._watch_connection(account))
+
+        # Обработчики уже активны, поэтому между догрузкой и живыми постами нет разрыва
+        await self.set_channels(channels)
+        logger.info(f"Monitoring {len(self._channels)} Telegram channels with {len(self.pool.available_names())} "
+                    f"accounts ({len(self._pending)} queued for resolution)")
+
+    def _register_handlers(self, account: TelegramAccount):
+        client = account.client
+
+        @client.on(events.Raw(UpdateNewChannelMessage))
+        async def handler(update):
+            message = update.message
+            if not isinstance(message, Message):
+                return
+            # Проверка по словарю peer id без разбора остальных обновлений; канал,
+            # назначенный другому аккаунту (например, после переезда), пропускается
+            peer_id = utils.get_peer_id(message.peer_id)
+            if self._owners.get(peer_id) != account.name:
+                return
             try:
-                # Преобразуем event.message в нашу структуру или передаем как есть
-                # Для гибкости передаем сырое сообщение + метаданные
-                message = event.message
-                text = message.text or message.message or ""
-                
-                # Игнорируем пустые сообщения (хотя могут быть медиа)
-                if not text and not message.media:
-                    return
-
-                # Получаем инфо о канале
-                chat = await event.get_chat()
-                source_id = str(chat.id)
-                source_name = getattr(chat, 'username', getattr(chat, 'title', 'Unknown'))
-                
-                post_data = {
-                    "source_type": "telegram",
-                    "source_id": source_id,
-                    "source_name": source_name,
-                    "post_id": str(message.id),
-                    "text": text,
-                    "raw_object": message,  # Сохраняем объект для пересылки
-                    "media": bool(message.media)
-                }
-                
-                if self.callback:
-                    await self.callback(post_data)
-                    
+                # Сущности из обновления: метаданные канала и пересылка без сетевых запросов
+                entities = getattr(update, "_entities", None) or {}
+                message._finish_init(client, entities, None)
+                self._channel_info(peer_id, entities)
+                await self._on_message(peer_id, message)
             except Exception as e:
                 logger.error(f"Error handling Telegram message: {e}")
 
+        @client.on(events.ChatAction(func=lambda event: self._owners.get(event.chat_id) == account.name))
+        async def rename_handler(event):
+            # Новое название канала
+            if event.new_title:
+                self.entities.update_title(event.chat_id, event.new_title)
+
+        @client.on(events.Raw(UpdateChannel))
+        async def channel_update_handler(update):
+            # Канал изменился (например, сменил username) - обновим метаданные при следующем сообщении
+            self.entities.invalidate(utils.get_peer_id(PeerChannel(update.channel_id)))
+
+    async def _forward(self, account: TelegramAccount, target: Any, post: Post):
+        from_peer = post.peer_id
+        if self._owners.get(post.peer_id) != account.name:
+            # Канал слушает другой аккаунт: отправитель ссылается на канал по username
+            # (приватный канал - по ID, если аккаунт в нем состоит)
+            info = self.entities.get(post.peer_id)
+            if info and info.username:
+                from_peer = info.username
+        await account.client.forward_messages(entity=target, messages=list(post.message_ids), from_peer=from_peer)
+
     async def forward_message(self, target_id: str, message_obj: Any, extra_text: str = ""):
         """
-        Пересылает сообщение.
+        Пересылает сообщение от имени одного из аккаунтов-отправителей пула.
         target_id: куда слать (@channel или ID)
-        message_obj: объект сообщения Telethon
+        message_obj: пост Telegram (Post); альбом пересылается одним запросом
         extra_text: текст, который нужно добавить (например, результат анализа)
-        """
-        try:
-            # Telethon умеет принимать int ID или username str
-            target = int(target_id) if target_id.lstrip('-').isdigit() else target_id
-            
-            # Пересылаем сообщение
-            # Используем send_message с forward, или forward_messages
-            # forward_messages предпочтительнее для сохранения авторства
-            await self.client.forward_messages(entity=target, messages=message_obj)
-            
-            # Если есть доп. текст (комментарий с категорией), шлем следом
-            if extra_text:
-                await self.client.send_message(entity=target, message=extra_text)
-                
-            logger.info(f"Message forwarded to {target}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to forward message to {target_id}: {e}")
-            return False
-
 
+        Аккаунт с FloodWait пропускается до конца ожидания, заблокированный - исключается из пула.
+        Пост канала без username пересылает прежде всего аккаунт, который его слушает: другие
+        аккаунты могут не знать канал по ID и тогда пробуются следующими.
+        """
+        # Telethon умеет принимать int ID или username str
+        target = int(target_id) if target_id.lstrip('-').isdigit() else target_id
+        post: Post = message_obj
+        info = self.entities.get(post.peer_id)
+        owner = None if info and info.username else self.pool.get(self._owners.get(post.peer_id))
+        tried = set()
+        last_error = None
 
+        while True:
+            account = self.pool.sender(exclude=tried, prefer=owner)
+            if account is None:
+                reason = last_error or "no Telegram sender account available"
+                logger.error(f"Failed to forward message to {target_id}: {reason}")
+                return False
+            tried.add(account.name)
+            try:
+                # forward_messages предпочтительнее для сохранения авторства
+                await self._forward(account, target, post)
 
+                # Если есть доп. текст (комментарий с категорией), шлем следом
+                if extra_text:
+                    await account.client.send_message(entity=target, message=extra_text)
 
+                count = len(post.message_ids)
+                logger.info(f"Message forwarded to {target} by {account.name}"
+                            + (f" (album of {count})" if count > 1 else ""))
+                return True
+            except FloodWaitError as e:
+                account.limit(e.seconds)
+            except BANNED_ERRORS as e:
+                account.ban(e)
+                self._rebalance()
+            except (ValueError, ChannelPrivateError) as e:
+                # Отправитель не может найти канал-источник (приватный, не состоит) - пробуем следующего
+                logger.warning(f"Telegram account {account.name} cannot forward from {post.peer_id}: {e}")
+                last_error = e
+            except Exception as e:
+                logger.error(f"Failed to forward message to {target_id}: {e}")
+                return False
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from telethon import utils
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Сколько каналов держать в кэше метаданных (отслеживаемые каналы не вытесняются из привязки к источнику)
+TELEGRAM_ENTITY_CACHE_SIZE = int(os.getenv("TELEGRAM_ENTITY_CACHE_SIZE", 5000))
+# Файл, в котором кэш сохраняется между запусками
+TELEGRAM_ENTITY_CACHE_PATH = os.getenv("TELEGRAM_ENTITY_CACHE_PATH", "data/telegram_entities.json")
+
+
+class ChannelInfo:
+    """Метаданные канала, нужные для Post"""
+
+    def __init__(self, peer_id: int, username: Optional[str] = None, title: Optional[str] = None,
+                 updated_at: Optional[float] = None, stale: bool = False):
+        self.peer_id = peer_id  # ID в формате Telethon (для каналов -100...)
+        self.username = username
+        self.title = title
+        self.updated_at = updated_at or time.time()
+        self.stale = stale  # Канал переименован - метаданные обновятся при следующем сообщении
+
+    @property
+    def name(self) -> str:
+        return self.username or self.title or str(self.peer_id)
+
+    @classmethod
+    def from_entity(cls, entity: Any) -> "ChannelInfo":
+        return cls(utils.get_peer_id(entity), getattr(entity, "username", None), getattr(entity, "title", None))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"username": self.username, "title": self.title, "updated_at": self.updated_at}
+
+
+class EntityCache:
+    """
+    Кэш метаданных каналов по peer id (LRU) и привязка peer id к source_id из конфигурации.
+
+    Привязка нужна, чтобы пост получал тот же source_id, под которым источник хранится
+    в БД (@username или -100...), а не внутренний ID Telegram. Кэш прогревается при
+    подписке и сохраняется на диск, поэтому обработчик сообщений обходится без сети.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, path: Optional[str] = None):
+        self.max_size = max_size or TELEGRAM_ENTITY_CACHE_SIZE
+        self.path = TELEGRAM_ENTITY_CACHE_PATH if path is None else path
+        self._entries: "OrderedDict[int, ChannelInfo]" = OrderedDict()
+        self._sources: Dict[int, str] = {}
+        self._peers: Dict[str, int] = {}
+        self._accounts: Dict[int, str] = {}  # peer id -> аккаунт пула, который разрешал канал и вступил в него
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, peer_id: int) -> Optional[ChannelInfo]:
+        info = self._entries.get(peer_id)
+        if info is not None:
+            self._entries.move_to_end(peer_id)
+        return info
+
+    def put(self, entity: Any) -> ChannelInfo:
+        """Запоминает (или обновляет) метаданные канала из сущности Telethon"""
+        return self._store(ChannelInfo.from_entity(entity))
+
+    def _store(self, info: ChannelInfo) -> ChannelInfo:
+        previous = self._entries.get(info.peer_id)
+        if previous is not None and (previous.username, previous.title) != (info.username, info.title):
+            logger.info(f"Telegram channel {info.peer_id} renamed: {previous.name} -> {info.name}")
+        self._entries[info.peer_id] = info
+        self._entries.move_to_end(info.peer_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return info
+
+    def update_title(self, peer_id: int, title: str):
+        info = self._entries.get(peer_id)
+        if info is not None and info.title != title:
+            self._store(ChannelInfo(peer_id, info.username, title))
+
+    def invalidate(self, peer_id: int):
+        """Канал изменился (например, сменил username) - обновить при следующей возможности"""
+        info = self._entries.get(peer_id)
+        if info is not None:
+            info.stale = True
+
+    def bind(self, peer_id: int, source_key: str, account: Optional[str] = None):
+        """Привязывает peer id к source_id источника из конфигурации (и к аккаунту пула)"""
+        self._sources[peer_id] = source_key
+        self._peers[source_key] = peer_id
+        if account is not None:
+            self._accounts[peer_id] = account
+
+    def unbind(self, peer_id: int):
+        source_key = self._sources.pop(peer_id, None)
+        if source_key is not None:
+            self._peers.pop(source_key, None)
+        self._accounts.pop(peer_id, None)
+
+    def account(self, peer_id: int) -> Optional[str]:
+        return self._accounts.get(peer_id)
+
+    def source_key(self, peer_id: int) -> Optional[str]:
+        return self._sources.get(peer_id)
+
+    def find(self, source_key: str) -> Optional[int]:
+        """peer id источника, если он уже разрешался (в том числе в прошлых запусках)"""
+        return self._peers.get(source_key)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for peer_id, values in data.get("entities", {}).items():
+                self._store(ChannelInfo(int(peer_id), **values))
+            accounts = data.get("accounts", {})
+            for source_key, peer_id in data.get("sources", {}).items():
+                self.bind(int(peer_id), source_key, accounts.get(str(peer_id)))
+            logger.info(f"Loaded {len(self._entries)} cached Telegram entities")
+        except Exception as e:
+            logger.warning(f"Failed to load Telegram entity cache {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "entities": {str(peer_id): info.to_dict() for peer_id, info in self._entries.items()},
+                    "sources": self._peers,
+                    "accounts": {str(peer_id): account for peer_id, account in self._accounts.items()}
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save Telegram entity cache {self.path}: {e}")
@@ -0,0 +1,158 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from telethon import errors
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Аккаунты пула: "session:phone,session:phone" (пусто - один аккаунт ai_filter_session с TELEGRAM_PHONE)
+TELEGRAM_ACCOUNTS = os.getenv("TELEGRAM_ACCOUNTS", "")
+# Аккаунты, которые пересылают посты (пусто - все аккаунты пула)
+TELEGRAM_SENDER_ACCOUNTS = os.getenv("TELEGRAM_SENDER_ACCOUNTS", "")
+# FloodWait дольше этого (секунды) - каналы аккаунта временно переходят к другим аккаунтам
+TELEGRAM_FLOOD_REASSIGN_AFTER = float(os.getenv("TELEGRAM_FLOOD_REASSIGN_AFTER", 300))
+
+# Ошибки, после которых аккаунт больше не может работать (бан, отозванная сессия)
+BANNED_ERRORS = (
+    errors.UserDeactivatedBanError,
+    errors.UserDeactivatedError,
+    errors.AuthKeyUnregisteredError,
+    errors.SessionRevokedError,
+    errors.PhoneNumberBannedError,
+)
+
+# Виртуальных точек аккаунта на кольце (равномернее распределение каналов)
+RING_REPLICAS = 64
+
+
+def parse_accounts(spec: str, default_phone: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """Разбор TELEGRAM_ACCOUNTS: [(имя сессии, телефон)]"""
+    accounts = []
+    for entry in spec.split(","):
+        name, _, phone = entry.strip().partition(":")
+        if name:
+            accounts.append((name, phone or None))
+    return accounts or [("ai_filter_session", default_phone)]
+
+
+class TelegramAccount:
+    """Аккаунт пула: клиент, назначенные каналы и состояние лимитов"""
+
+    def __init__(self, name: str, phone: Optional[str], client, sender: bool = True):
+        self.name = name
+        self.phone = phone
+        self.client = client
+        self.sender = sender
+        self.banned = False
+        self.flood_until = 0.0
+        self.last_sent = 0.0
+        self.backfill = None
+        # Очередь разрешения (и вступления в) каналов этого аккаунта
+        self.resolve_queue: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def flood_wait(self) -> float:
+        """Сколько еще секунд аккаунт ограничен FloodWait"""
+        return max(0.0, self.flood_until - time.monotonic())
+
+    @property
+    def available(self) -> bool:
+        """Может ли аккаунт держать каналы (короткий FloodWait каналы не переносит)"""
+        return not self.banned and self.flood_wait < TELEGRAM_FLOOD_REASSIGN_AFTER
+
+    @property
+    def can_send(self) -> bool:
+        return self.sender and not self.banned and self.flood_wait <= 0
+
+    def limit(self, seconds: float):
+        """Telegram ответил FloodWait"""
+        self.flood_until = max(self.flood_until, time.monotonic() + seconds)
+        logger.warning(f"Telegram account {self.name} flood-limited for {seconds:.0f}s")
+
+    def ban(self, error: Exception):
+        if not self.banned:
+            logger.error(f"Telegram account {self.name} is no longer usable: {error}")
+        self.banned = True
+
+
+class HashRing:
+    """Консистентное хеширование: при выбывании аккаунта переезжают только его каналы"""
+
+    def __init__(self, names: Iterable[str], replicas: int = RING_REPLICAS):
+        points = sorted(
+            (self._hash(f"{name}#{i}"), name) for name in names for i in range(replicas)
+        )
+        self._hashes = [h for h, _ in points]
+        self._names = [name for _, name in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def owner(self, key: str, accept: Callable[[str], bool]) -> Optional[str]:
+        """Первый подходящий аккаунт по часовой стрелке от хеша ключа"""
+        if not self._hashes:
+            return None
+        start = bisect.bisect(self._hashes, self._hash(key))
+        seen = set()
+        for i in range(len(self._names)):
+            name = self._names[(start + i) % len(self._names)]
+            if name in seen:
+                continue
+            if accept(name):
+                return name
+            seen.add(name)
+        return None
+
+
+class AccountPool:
+    """
+    Пул аккаунтов Telegram.
+
+    Каналы распределяются по доступным аккаунтам консистентным хешированием, поэтому
+    емкость мониторинга растет с числом аккаунтов, а выбывший (бан, долгий FloodWait)
+    аккаунт отдает свои каналы остальным. Пересылка чередует аккаунты-отправители,
+    пропуская ограниченные.
+    """
+
+    def __init__(self, accounts: List[TelegramAccount]):
+        if not accounts:
+            raise ValueError("Telegram account pool is empty")
+        self.accounts: Dict[str, TelegramAccount] = {a.name: a for a in accounts}
+        self.primary = accounts[0]
+        self.ring = HashRing(self.accounts)
+
+    def __iter__(self):
+        return iter(self.accounts.values())
+
+    def get(self, name: Optional[str]) -> Optional[TelegramAccount]:
+        return self.accounts.get(name) if name else None
+
+    def owner(self, channel: str, exclude: Iterable[str] = ()) -> Optional[TelegramAccount]:
+        """Аккаунт, который должен отслеживать канал"""
+        exclude = set(exclude)
+        name = self.ring.owner(channel, lambda n: n not in exclude and self.accounts[n].available)
+        return self.accounts.get(name) if name else None
+
+    def available_names(self) -> frozenset:
+        return frozenset(a.name for a in self if a.available)
+
+    def sender(self, exclude: Iterable[str] = (), prefer: Optional[TelegramAccount] = None) -> Optional[TelegramAccount]:
+        """Следующий отправитель: prefer, если он может отправлять, иначе давнее всех отправлявший"""
+        exclude = set(exclude)
+        if prefer is not None and prefer.can_send and prefer.name not in exclude:
+            prefer.last_sent = time.monotonic()
+            return prefer
+        candidates = [a for a in self if a.can_send and a.name not in exclude]
+        if not candidates:
+            return None
+        account = min(candidates, key=lambda a: a.last_sent)
+        account.last_sent = time.monotonic()
+        return account
+
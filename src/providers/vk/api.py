@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from dotenv import load_dotenv
+from ...ai.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+VK_API_URL = os.getenv("VK_API_URL", "https://api.vk.com/method")
+VK_API_VERSION = os.getenv("VK_API_VERSION", "5.199")
+# Лимит VK для пользовательского токена - 3 запроса в секунду
+VK_REQUESTS_PER_SECOND = float(os.getenv("VK_REQUESTS_PER_SECOND", 3))
+VK_TIMEOUT = float(os.getenv("VK_TIMEOUT", 20))
+VK_MAX_CONNECTIONS = int(os.getenv("VK_MAX_CONNECTIONS", 10))
+# Повторы при "Too many requests per second" (6) и ошибках сети/5xx
+VK_MAX_RETRIES = int(os.getenv("VK_MAX_RETRIES", 3))
+# Пауза всех запросов после капчи (14), секунды
+VK_CAPTCHA_PAUSE = float(os.getenv("VK_CAPTCHA_PAUSE", 60))
+# Вызовов API в одном execute (максимум VK - 25)
+VK_EXECUTE_BATCH_SIZE = min(25, int(os.getenv("VK_EXECUTE_BATCH_SIZE", 25)))
+
+# Коды ошибок VK API
+VK_ERROR_TOO_MANY_REQUESTS = 6
+VK_ERROR_FLOOD = 9
+VK_ERROR_CAPTCHA = 14
+
+
+class VKAPIError(Exception):
+    """VK API вернул ошибку"""
+
+    def __init__(self, code: int, message: str, method: str = ""):
+        super().__init__(f"VK API error {code} in {method}: {message}")
+        self.code = code
+        self.method = method
+
+
+class VKFloodError(VKAPIError):
+    """Flood control (9): слишком много однотипных действий, повтор сразу не поможет"""
+
+
+class VKCaptchaError(VKAPIError):
+    """VK требует капчу (14); запросы приостанавливаются на VK_CAPTCHA_PAUSE"""
+
+    def __init__(self, code: int, message: str, method: str = "", captcha_sid: str = "", captcha_img: str = ""):
+        super().__init__(code, message, method)
+        self.captcha_sid = captcha_sid
+        self.captcha_img = captcha_img
+
+
+class VKApi:
+    """
+    Асинхронный клиент VK API на httpx.
+
+    Один пул соединений (keep-alive) на клиент и общий темп запросов по token bucket
+    (VK_REQUESTS_PER_SECOND), поэтому параллельные вызовы не превышают лимит VK,
+    а не упираются в него ошибкой 6. Ошибка 6 и сбои сети повторяются с паузой,
+    9 и 14 пробрасываются (капча к тому же приостанавливает все запросы).
+    """
+
+    def __init__(self, token: str, version: Optional[str] = None, requests_per_second: Optional[float] = None,
+                 timeout: Optional[float] = None, base_url: Optional[str] = None):
+        self.token = token
+        self.version = version or VK_API_VERSION
+        self.base_url = (base_url or VK_API_URL).rstrip("/")
+        self.timeout = timeout or VK_TIMEOUT
+        rate = requests_per_second or VK_REQUESTS_PER_SECOND
+        # Емкость 1: запросы идут равномерно, без всплеска в начале секунды
+        self.bucket = TokenBucket(capacity=1, rate=rate)
+        self.requests = 0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Пул соединений создается лениво, внутри работающего event loop"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=VK_MAX_CONNECTIONS,
+                    max_keepalive_connections=VK_MAX_CONNECTIONS,
+                    keepalive_expiry=60
+                )
+            )
+        return self._http
+
+    async def close(self):
+        """Закрытие пула соединений"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _pace(self):
+        """Очередь на отправку запроса в темпе лимита VK"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(self._paused_until - now, self.bucket.wait_time(1, now))
+                if delay <= 0:
+                    self.bucket.consume(1, now)
+                    return
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _encode(params: Dict[str, Any]) -> Dict[str, str]:
+        encoded = {}
+        for key, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = int(value)
+            elif isinstance(value, (list, tuple, set)):
+                value = ",".join(str(v) for v in value)
+            encoded[key] = str(value)
+        return encoded
+
+    async def call(self, method: str, **params) -> Any:
+        """Вызов метода VK API, возвращает поле response"""
+        body = await self._request(method, params)
+        return body.get("response")
+
+    async def _request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Запрос к VK API с повторами, возвращает тело ответа целиком"""
+        data = self._encode(params)
+        data["access_token"] = self.token
+        data["v"] = self.version
+
+        for attempt in range(VK_MAX_RETRIES + 1):
+            await self._pace()
+            self.requests += 1
+            try:
+                response = await self.http.post(f"/{method}", data=data)
+                response.raise_for_status()
+                body = response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if attempt >= VK_MAX_RETRIES:
+                    raise
+                logger.warning(f"VK {method} request failed ({e}), retrying")
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            error = body.get("error")
+            if not error:
+                return body
+
+            code = error.get("error_code", 0)
+            message = error.get("error_msg", "")
+            if code == VK_ERROR_TOO_MANY_REQUESTS and attempt < VK_MAX_RETRIES:
+                # Лимит разделяется с другими клиентами токена - отступаем и повторяем
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if code == VK_ERROR_CAPTCHA:
+                self._paused_until = time.monotonic() + VK_CAPTCHA_PAUSE
+                logger.warning(f"VK requested captcha in {method}, pausing requests for {VK_CAPTCHA_PAUSE:.0f}s")
+                raise VKCaptchaError(code, message, method, error.get("captcha_sid", ""), error.get("captcha_img", ""))
+            if code == VK_ERROR_FLOOD:
+                raise VKFloodError(code, message, method)
+            raise VKAPIError(code, message, method)
+
+    async def users_get(self, **params) -> Any:
+        return await self.call("users.get", **params)
+
+    async def groups_get_by_id(self, **params) -> Any:
+        return await self.call("groups.getById", **params)
+
+    async def wall_get(self, **params) -> Any:
+        return await self.call("wall.get", **params)
+
+    async def wall_post(self, **params) -> Any:
+        return await self.call("wall.post", **params)
+
+    async def execute(self, code: str, **params) -> Any:
+        """Выполнение VKScript (до 25 вызовов API за один запрос)"""
+        return await self.call("execute", code=code, **params)
+
+    async def execute_many(self, method: str, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Пакетный вызов одного метода через execute (по VK_EXECUTE_BATCH_SIZE вызовов в запросе).
+
+        Возвращает результаты в порядке requests; на месте неудачного вызова - VKAPIError
+        (ошибка одного вызова не затрагивает остальные), при сбое всего запроса -
+        его исключение на месте каждого вызова пакета.
+        """
+        results: List[Any] = []
+        for start in range(0, len(requests), VK_EXECUTE_BATCH_SIZE):
+            chunk = requests[start:start + VK_EXECUTE_BATCH_SIZE]
+            try:
+                results.extend(await self._execute_chunk(method, chunk))
+            except (VKAPIError, httpx.HTTPError) as e:
+                results.extend(e for _ in chunk)
+        return results
+
+    async def _execute_chunk(self, method: str, chunk: List[Dict[str, Any]]) -> List[Any]:
+        calls = ",".join(
+            f"API.{method}({json.dumps(self._encode(params), ensure_ascii=False)})" for params in chunk
+        )
+        body = await self._request("execute", {"code": f"return [{calls}];"})
+        response = body.get("response") or []
+        # Неудачный вызов возвращает false, его ошибка - в execute_errors в порядке вызовов
+        errors = iter(body.get("execute_errors") or [])
+
+        results = []
+        for i in range(len(chunk)):
+            result = response[i] if i < len(response) else False
+            if result is False:
+                error = next(errors, {})
+                result = VKAPIError(error.get("error_code", 0), error.get("error_msg", "execute call failed"),
+                                    error.get("method", method))
+            results.append(result)
+        return results
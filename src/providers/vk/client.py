@@ -1,12 +1,14 @@
 import os
 import asyncio
 import logging
-from typing import List, Callable, Any
+from typing import Any, Callable, Dict, List, Optional
 from ..base import BaseProvider
+from ...core.post import Post
+from .api import VKApi
+from .scheduler import PollScheduler
+from .wall import WallPager
+from ..cursors import CursorStore
 from dotenv import load_dotenv
-import vk_api
-from vk_api.bot_longpoll import VkBotLongPoll, VkBotEventType
-from vk_api.longpoll import VkLongPoll, VkEventType
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -14,11 +16,17 @@ load_dotenv()
 class VKProvider(BaseProvider):
     def __init__(self):
         self.token = os.getenv("VK_TOKEN")
-        self.vk_session = None
-        self.vk = None
-        self.longpoll = None
+        self.api = None
         self.is_running = False
         self.callback = None
+        self.scheduler = PollScheduler()
+        # ID последнего обработанного поста по группам (сохраняются координатором)
+        self.cursors = CursorStore()
+        # Стены, прочитанные не до курсора: чтение продолжается при следующих опросах
+        self._pagers: Dict[str, WallPager] = {}
+        self.is_monitoring = False
+        self._poll_task = None
+        self._wakeup = asyncio.Event()
         
     async def start(self):
         logger.info("Starting VK Provider...")
@@ -27,10 +35,9 @@ class VKProvider(BaseProvider):
             return
 
         try:
-            self.vk_session = vk_api.VkApi(token=self.token)
-            self.vk = self.vk_session.get_api()
+            self.api = VKApi(self.token)
             # Проверка авторизации
-            user = self.vk.users.get()
+            user = await self.api.users_get()
             logger.info(f"VK connected as user ID: {user[0]['id']}")
             self.is_running = True
         except Exception as e:
@@ -41,81 +48,140 @@ class VKProvider(BaseProvider):
     async def stop(self):
         logger.info("Stopping VK Provider...")
         self.is_running = False
+        if self._poll_task:
+            self._poll_task.cancel()
+        if self.api:
+            await self.api.close()
 
-    async def monitor_channels(self, channels: List[str], callback: Callable):
+    async def monitor_channels(self, channels: List[str], callback: Callable,
+                               intervals: Optional[Dict[str, int]] = None):
         """
         Для VK мониторинг реализован через периодический опрос (polling), 
         так как LongPoll для пользователя требует сложных настроек, 
         а Bot LongPoll работает только для сообществ.
         
-        Здесь мы будем использовать простой polling последних постов.
+        Каждая группа опрашивается по своему расписанию (intervals - check_interval
+        источников, по умолчанию 60 с), которое подстраивается под частоту постов.
         """
         if not self.is_running:
             return
 
         self.callback = callback
         logger.info(f"Starting VK polling for groups: {channels}")
+        await self.set_channels({group: (intervals or {}).get(group, 60) for group in channels})
 
         # Запускаем задачу опроса в фоне
-        asyncio.create_task(self._poll_loop(channels))
-
-    async def _poll_loop(self, groups: List[str]):
-        """Цикл опроса групп"""
-        last_posts = {}  # {group_id: last_post_id}
-
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+        self.is_monitoring = True
+
+    async def set_channels(self, intervals: Dict[str, int]):
+        """Синхронизация набора групп {source_id: check_interval} без перезапуска опроса"""
+        self.scheduler.set_sources(intervals)
+        for group in list(self._pagers):
+            if group not in intervals:
+                del self._pagers[group]
+        self._wakeup.set()
+
+    async def _poll_loop(self):
+        """Цикл опроса: группы, чей срок наступил, опрашиваются пакетом через execute"""
         while self.is_running:
-            for group in groups:
+            groups = self.scheduler.pop_due()
+            if groups:
+                await self._poll_groups(groups)
+                continue
+
+            # Ждем ближайшего опроса или изменения набора групп
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.scheduler.wait_time())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll_groups(self, groups: List[str]):
+        """
+        Опрос групп: стены читаются до курсора, следующие страницы всех групп,
+        которым их не хватило, запрашиваются снова одним пакетом execute.
+        Стена, не дочитанная до курсора за опрос, дочитывается при следующих.
+        """
+        pagers = {}
+        for group in groups:
+            pager = self._pagers.pop(group, None)
+            if pager is not None:
+                pager.resume()
+            else:
+                pager = WallPager(self.cursors.get(group))
+            pagers[group] = pager
+        failed = set()
+        pending = list(groups)
+        while pending:
+            try:
+                requests = [{"domain": self._domain(group), **pagers[group].params()} for group in pending]
+                results = await self.api.execute_many("wall.get", requests)
+            except Exception as e:
+                logger.error(f"Error polling VK groups: {e}")
+                results = [e] * len(pending)
+
+            for group, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    # Курсор не сдвигается - посты группы догрузятся при следующем опросе
+                    logger.error(f"Error polling VK group {group}: {result}")
+                    failed.add(group)
+                else:
+                    pagers[group].feed(result)
+            pending = [group for group in pending if group not in failed and not pagers[group].done]
+
+        for group in groups:
+            pager = pagers[group]
+            new_posts = None
+            if group in failed or pager.partial:
+                # Прочитанные страницы не теряются - чтение продолжится со следующего опроса
+                if pager.offset:
+                    self._pagers[group] = pager
+                if pager.partial:
+                    # Много новых постов - следующий опрос раньше
+                    new_posts = len(pager)
+                    logger.info(f"VK group {group}: {new_posts} posts read, "
+                                f"the rest will be fetched on the next poll")
+            else:
                 try:
-                    # Преобразуем ID группы (если передана ссылка или имя)
-                    # vk_api обычно принимает domain или id
-                    domain = group.replace('https://vk.com/', '').replace('public', '').replace('club', '')
-                    if domain.startswith('-'):
-                        domain = domain[1:] # Убираем минус если есть
-
-                    # Получаем последний пост
-                    # Используем run_in_executor т.к. vk_api синхронный
-                    posts = await asyncio.to_thread(
-                        self.vk.wall.get, domain=domain, count=2
-                    )
-                    
-                    if not posts or not posts['items']:
-                        continue
-
-                    # Берем самый свежий пост (не закрепленный)
-                    items = posts['items']
-                    post = items[0]
-                    if post.get('is_pinned') and len(items) > 1:
-                        post = items[1]
-
-                    post_id = f"{post['owner_id']}_{post['id']}"
-                    
-                    # Если пост новый
-                    if group not in last_posts:
-                        last_posts[group] = post_id
-                        continue # Первый запуск - просто запоминаем
-                    
-                    if last_posts[group] != post_id:
-                        last_posts[group] = post_id
-                        
-                        # Формируем данные
-                        post_data = {
-                            "source_type": "vk",
-                            "source_id": str(post['owner_id']),
-                            "source_name": group,
-                            "post_id": post_id,
-                            "text": post.get('text', ''),
-                            "raw_object": post,
-                            "media": bool(post.get('attachments'))
-                        }
-                        
-                        if self.callback:
-                            await self.callback(post_data)
-                            
+                    new_posts = await self._handle_wall(group, pager)
                 except Exception as e:
-                    logger.error(f"Error polling VK group {group}: {e}")
-            
-            # Ждем перед следующим опросом (чтобы не словить rate limit)
-            await asyncio.sleep(60) 
+                    logger.error(f"Error handling VK group {group}: {e}")
+            self.scheduler.report(group, new_posts)
+
+    @staticmethod
+    def _domain(group: str) -> str:
+        """Преобразуем ID группы (если передана ссылка или имя) в domain для wall.get"""
+        domain = group.replace('https://vk.com/', '').replace('public', '').replace('club', '')
+        if domain.startswith('-'):
+            domain = domain[1:]  # Убираем минус если есть
+        return domain
+
+    async def _handle_wall(self, group: str, pager: WallPager) -> int:
+        """Передает новые посты группы в конвейер от старых к новым, возвращает их число"""
+        if pager.cursor is None:
+            # Первый опрос группы - просто запоминаем самый свежий пост
+            self.cursors.advance(group, pager.latest_id)
+            return 0
+        posts = pager.new_posts()
+        for post in posts:
+            # Формируем данные (ссылка на запись вместо всего JSON)
+            post_record = Post(
+                source_type="vk",
+                source_id=str(post['owner_id']),
+                post_id=f"{post['owner_id']}_{post['id']}",
+                text=post.get('text', ''),
+                source_name=group,
+                media=bool(post.get('attachments')),
+                peer_id=post['owner_id'],
+                message_ids=(post['id'],)
+            )
+
+            if self.callback:
+                await self.callback(post_record)
+            self.cursors.advance(group, post['id'])
+        return len(posts)
 
     async def forward_message(self, target_id: str, message_obj: Any, extra_text: str = ""):
         """
@@ -127,20 +193,16 @@ class VKProvider(BaseProvider):
             return False
 
         try:
-            # message_obj здесь это dict от VK API
-            original_text = message_obj.get('text', '')
-            original_link = f"https://vk.com/wall{message_obj['owner_id']}_{message_obj['id']}"
-            
-            final_text = f"{extra_text}\n\n{original_text}\n\nИсточник: {original_link}"
+            # message_obj здесь это Post (из VK - со ссылкой на запись)
+            post: Post = message_obj
+            final_text = f"{extra_text}\n\n{post.text}"
+            if post.source_type == 'vk' and post.message_ids:
+                final_text += f"\n\nИсточник: https://vk.com/wall{post.peer_id}_{post.message_ids[0]}"
             
             target = int(target_id)
             
             # Публикация на стене (если target < 0 это группа)
-            await asyncio.to_thread(
-                self.vk.wall.post,
-                owner_id=target,
-                message=final_text
-            )
+            await self.api.wall_post(owner_id=target, message=final_text)
             
             logger.info(f"Posted to VK {target}")
             return True
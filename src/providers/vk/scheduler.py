@@ -0,0 +1,149 @@
+import heapq
+import os
+import random
+import time
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Самый частый опрос группы, секунды (активные группы опрашиваются чаще check_interval, но не чаще)
+VK_POLL_MIN_INTERVAL = float(os.getenv("VK_POLL_MIN_INTERVAL", 15))
+# Самый редкий опрос "уснувшей" группы, секунды
+VK_POLL_MAX_INTERVAL = float(os.getenv("VK_POLL_MAX_INTERVAL", 3600))
+# Сколько опросов подряд без новых постов до удвоения интервала
+VK_POLL_IDLE_POLLS = int(os.getenv("VK_POLL_IDLE_POLLS", 3))
+# Разброс момента опроса (доля интервала), чтобы группы не опрашивались одновременно
+VK_POLL_JITTER = float(os.getenv("VK_POLL_JITTER", 0.1))
+# Группы, чей опрос наступит в пределах этого окна, опрашиваются одним пакетом, секунды
+VK_POLL_COALESCE = float(os.getenv("VK_POLL_COALESCE", 2.0))
+
+
+class PollState:
+    """Расписание опроса одной группы"""
+
+    __slots__ = ("source_id", "base_interval", "interval", "next_at", "idle_polls", "version")
+
+    def __init__(self, source_id: str, base_interval: float):
+        self.source_id = source_id
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self.next_at = 0.0
+        self.idle_polls = 0
+        self.version = 0
+
+
+class PollScheduler:
+    """
+    Расписание опроса групп VK на min-heap по времени следующего опроса.
+
+    Каждая группа опрашивается со своим интервалом, начиная с check_interval источника.
+    Группа, в которой между опросами вышло несколько постов, опрашивается вдвое чаще
+    (не чаще VK_POLL_MIN_INTERVAL), найденный пост возвращает интервал к check_interval,
+    а после VK_POLL_IDLE_POLLS пустых опросов подряд интервал удваивается до
+    VK_POLL_MAX_INTERVAL. Момент опроса сдвигается на случайную долю интервала.
+    """
+
+    def __init__(self, min_interval: float = None, max_interval: float = None,
+                 idle_polls: int = None, jitter: float = None, coalesce: float = None):
+        self.min_interval = VK_POLL_MIN_INTERVAL if min_interval is None else min_interval
+        self.max_interval = VK_POLL_MAX_INTERVAL if max_interval is None else max_interval
+        self.idle_polls = VK_POLL_IDLE_POLLS if idle_polls is None else idle_polls
+        self.jitter = VK_POLL_JITTER if jitter is None else jitter
+        # Окно не больше половины минимального интервала - иначе группа попадала бы в каждый пакет
+        self.coalesce = min(VK_POLL_COALESCE if coalesce is None else coalesce, self.min_interval / 2)
+        self._states: Dict[str, PollState] = {}
+        # (next_at, version, source_id); устаревшие записи пропускаются при извлечении
+        self._heap: List[tuple] = []
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, source_id: str):
+        return source_id in self._states
+
+    def interval(self, source_id: str) -> Optional[float]:
+        state = self._states.get(source_id)
+        return state.interval if state else None
+
+    def set_sources(self, intervals: Dict[str, float], now: float = None):
+        """Синхронизирует набор групп {source_id: check_interval}; новые группы опрашиваются вскоре"""
+        now = time.monotonic() if now is None else now
+        for source_id in list(self._states):
+            if source_id not in intervals:
+                del self._states[source_id]
+
+        for source_id, base in intervals.items():
+            base = max(self.min_interval, float(base or self.min_interval))
+            state = self._states.get(source_id)
+            if state is None:
+                state = self._states[source_id] = PollState(source_id, base)
+                # Первый опрос тоже с разбросом - иначе все группы совпадут при старте
+                self._push(state, now + random.uniform(0, self.jitter * base))
+            elif state.base_interval != base:
+                state.base_interval = base
+                state.interval = base
+                state.idle_polls = 0
+                self._push(state, min(state.next_at, now + base))
+
+        if len(self._heap) > 2 * len(self._states) + 64:
+            self._compact()
+
+    def pop_due(self, now: float = None) -> List[str]:
+        """Группы, которые пора опросить (и те, чей опрос наступит в окне coalesce)"""
+        now = time.monotonic() if now is None else now
+        deadline = now + self.coalesce
+        due = []
+        while self._heap and self._heap[0][0] <= deadline:
+            _, version, source_id = heapq.heappop(self._heap)
+            state = self._states.get(source_id)
+            if state is not None and state.version == version:
+                due.append(source_id)
+        return due
+
+    def wait_time(self, now: float = None) -> Optional[float]:
+        """Секунд до ближайшего опроса (None - групп нет)"""
+        now = time.monotonic() if now is None else now
+        while self._heap:
+            next_at, version, source_id = self._heap[0]
+            state = self._states.get(source_id)
+            if state is not None and state.version == version:
+                return max(0.0, next_at - now)
+            heapq.heappop(self._heap)
+        return None
+
+    def report(self, source_id: str, new_posts: Optional[int], now: float = None):
+        """Результат опроса группы (new_posts=None - ошибка) и планирование следующего"""
+        state = self._states.get(source_id)
+        if state is None:
+            return
+        now = time.monotonic() if now is None else now
+        ceiling = max(state.base_interval, self.max_interval)
+
+        if new_posts is None:
+            # Ошибка (группа удалена, закрыта) - отступаем, чтобы не тратить на нее лимит
+            state.interval = min(ceiling, state.interval * 2)
+        elif new_posts > 1:
+            # Несколько постов между опросами - группа активна, опрашиваем чаще
+            state.idle_polls = 0
+            state.interval = max(self.min_interval, min(state.interval, state.base_interval) / 2)
+        elif new_posts == 1:
+            state.idle_polls = 0
+            state.interval = min(state.interval, state.base_interval)
+        else:
+            state.idle_polls += 1
+            if state.idle_polls >= self.idle_polls:
+                state.idle_polls = 0
+                state.interval = min(ceiling, state.interval * 2)
+
+        spread = 1 + random.uniform(-self.jitter, self.jitter)
+        self._push(state, now + state.interval * spread)
+
+    def _push(self, state: PollState, next_at: float):
+        state.version += 1
+        state.next_at = next_at
+        heapq.heappush(self._heap, (next_at, state.version, state.source_id))
+
+    def _compact(self):
+        self._heap = [(s.next_at, s.version, s.source_id) for s in self._states.values()]
+        heapq.heapify(self._heap)
@@ -0,0 +1,90 @@
+import os
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Постов в первом запросе стены при опросе (обычно новых постов меньше)
+VK_WALL_FIRST_PAGE = int(os.getenv("VK_WALL_FIRST_PAGE", 10))
+# Постов в следующих страницах, если курсор не достигнут (максимум wall.get - 100)
+VK_WALL_PAGE_SIZE = min(100, int(os.getenv("VK_WALL_PAGE_SIZE", 100)))
+# Максимум постов группы, читаемых за один опрос; если курсор не достигнут, чтение
+# продолжается при следующих опросах (0 - без ограничения)
+VK_WALL_MAX_POSTS = int(os.getenv("VK_WALL_MAX_POSTS", 300))
+# Перекрытие страниц: удаление постов между запросами сдвигает offset, перекрытие не дает пропустить пост
+VK_WALL_PAGE_OVERLAP = 5
+
+
+class WallPager:
+    """
+    Чтение стены группы от новых постов к старым до курсора (ID последнего обработанного поста).
+
+    Курсор сравнивается по ID (ID записей стены растут), а не по равенству, поэтому
+    удаленный пост-курсор не заставляет листать стену до конца, а удаление свежего поста
+    не выдает старый пост за новый. Закрепленный пост стоит первым вне хронологии и
+    курсор не проверяет, но сам считается новым, если его ID больше курсора.
+    Страницы перекрываются на VK_WALL_PAGE_OVERLAP постов, повторы отсекаются по ID.
+
+    За один опрос читается не больше max_posts постов. Если курсор не достигнут, пагинатор
+    приостанавливается (partial) и продолжает с того же offset при следующем опросе (resume):
+    новые посты сверху лишь сдвигают стену вниз, и уже прочитанные посты отсекаются по ID.
+    Посты отдаются и курсор сдвигается только после того, как курсор достигнут.
+    """
+
+    def __init__(self, cursor: Optional[int], first_page: int = None, page_size: int = None,
+                 max_posts: int = None):
+        self.cursor = cursor
+        self.first_page = first_page or VK_WALL_FIRST_PAGE
+        self.page_size = page_size or VK_WALL_PAGE_SIZE
+        self.max_posts = VK_WALL_MAX_POSTS if max_posts is None else max_posts
+        self.offset = 0
+        # Чтение в этом опросе закончено
+        self.done = False
+        # Курсор не достигнут за max_posts постов - чтение продолжится при следующем опросе
+        self.partial = False
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._read_before = 0
+
+    def params(self) -> Dict[str, int]:
+        """Параметры wall.get для следующей страницы"""
+        return {"count": self.first_page if self.offset == 0 else self.page_size, "offset": self.offset}
+
+    def feed(self, response: Dict[str, Any]):
+        """Ответ wall.get на params(): запоминает посты и решает, нужна ли следующая страница"""
+        count = self.params()["count"]
+        items = (response or {}).get("items") or []
+        for item in items:
+            self._items[item["id"]] = item
+
+        regular = [item["id"] for item in items if not item.get("is_pinned")]
+        if self.cursor is None:
+            # Первый опрос группы: курсор - самый свежий пост, догружать нечего
+            self.done = True
+        elif len(items) < count or (regular and min(regular) <= self.cursor):
+            # Конец стены или курсор достигнут
+            self.done = True
+        else:
+            self.offset += max(1, len(items) - VK_WALL_PAGE_OVERLAP)
+            if self.max_posts and len(self._items) - self._read_before >= self.max_posts:
+                self.done = True
+                self.partial = True
+
+    def resume(self):
+        """Продолжение чтения при следующем опросе (после partial)"""
+        self.done = False
+        self.partial = False
+        self._read_before = len(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def latest_id(self) -> int:
+        """ID самого свежего поста на прочитанных страницах (0 - стена пуста)"""
+        return max(self._items, default=0)
+
+    def new_posts(self) -> List[Dict[str, Any]]:
+        """Посты новее курсора от старых к новым (пока курсор не достигнут - ни одного)"""
+        if self.cursor is None or self.partial:
+            return []
+        return [self._items[post_id] for post_id in sorted(self._items) if post_id > self.cursor]
@@ -27,6 +27,11 @@ class Cache:
                 print(f"⚠️ Redis connection failed: {e}. Switching to local cache.")
                 self._redis = None
 
+    @property
+    def is_redis(self) -> bool:
+        """Подключен ли Redis (иначе используется локальный кэш)"""
+        return self._redis is not None
+
     async def close(self):
         """Закрытие соединения"""
         if self._redis:
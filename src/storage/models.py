@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, JSON, Table
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, JSON, Table
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -24,6 +24,10 @@ class Filter(Base):
     categories: Mapped[list] = mapped_column(JSON, nullable=False)  # Список категорий
     threshold: Mapped[float] = mapped_column(Float, default=0.7)
     enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    priority: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Явный порядок проверки (меньше = раньше)
+    max_text_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Бюджет токенов текста поста (0 - без обрезки)
+    keywords: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # Ключевые слова для строгого префильтра
+    daily_token_budget: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Дневной лимит токенов AI фильтра
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
 
@@ -47,6 +51,7 @@ class Source(Base):
     name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     enabled: Mapped[bool] = mapped_column(Boolean, default=True)
     check_interval: Mapped[int] = mapped_column(Integer, default=60)  # Интервал проверки в секундах
+    priority: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # < 0 - низкий приоритет (выборочная проверка при нехватке бюджета AI)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     
     # Связи
@@ -69,8 +74,10 @@ class ProcessedPost(Base):
     post_id: Mapped[str] = mapped_column(String, nullable=False)  # ID поста в источнике
     
     text_hash: Mapped[str] = mapped_column(String(64), index=True, nullable=True)  # MD5 хеш текста для дедупликации
+    text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Текст поста (для обучения локальных классификаторов)
     
     filter_result: Mapped[dict] = mapped_column(JSON, nullable=True)  # Полный ответ AI
+    verdicts: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # Вердикты всех проверенных фильтров
     category: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     
@@ -81,6 +88,78 @@ class ProcessedPost(Base):
         return f"<ProcessedPost(source='{self.source_id}', post='{self.post_id}')>"
 
 
+class FilterStatistics(Base):
+    """Накопленная статистика фильтра (для адаптивного порядка проверки)"""
+    __tablename__ = "filter_stats"
 
+    filter_id: Mapped[str] = mapped_column(String, ForeignKey("filters.id", ondelete="CASCADE"), primary_key=True)
+    evaluations: Mapped[float] = mapped_column(Float, default=0.0)  # Сколько раз фильтр проверялся
+    matches: Mapped[float] = mapped_column(Float, default=0.0)  # Сколько раз фильтр принял пост
+    total_latency: Mapped[float] = mapped_column(Float, default=0.0)  # Суммарное время запросов (сек)
+    total_tokens: Mapped[float] = mapped_column(Float, default=0.0)  # Суммарное количество токенов
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    def __repr__(self):
+        return f"<FilterStatistics(filter='{self.filter_id}', evaluations={self.evaluations})>"
+
+
+class AISpend(Base):
+    """Дневной расход AI по фильтру (бюджет переживает перезапуск)"""
+    __tablename__ = "ai_spend"
+
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)  # Сутки по UTC (YYYY-MM-DD)
+    filter_id: Mapped[str] = mapped_column(String, primary_key=True)  # Без внешнего ключа: расход удаленного фильтра остается в итоге дня
+    tokens: Mapped[float] = mapped_column(Float, default=0.0)
+    prompt_tokens: Mapped[float] = mapped_column(Float, default=0.0)
+    completion_tokens: Mapped[float] = mapped_column(Float, default=0.0)
+    cost: Mapped[float] = mapped_column(Float, default=0.0)  # USD по ценам AI_PRICES
+    requests: Mapped[float] = mapped_column(Float, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<AISpend(day='{self.day}', filter='{self.filter_id}', tokens={self.tokens})>"
+
+
+class FilterShadow(Base):
+    """
+    Теневая версия фильтра: другой промпт и/или модель, проверяемые на выборке живых постов.
+    Счетчики накапливают сравнение с живой версией на тех же постах
+    """
+    __tablename__ = "filter_shadows"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    filter_id: Mapped[str] = mapped_column(String, ForeignKey("filters.id", ondelete="CASCADE"), nullable=False, index=True)
+    name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    prompt: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Промпт теневой версии (None - промпт фильтра)
+    model: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # "provider:model" (None - основная модель)
+    sample_rate: Mapped[float] = mapped_column(Float, default=0.1)  # Доля постов фильтра, проверяемых теневой версией
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+
+    evaluations: Mapped[float] = mapped_column(Float, default=0.0)  # Сколько постов проверено обеими версиями
+    agreements: Mapped[float] = mapped_column(Float, default=0.0)  # Совпадений решения (принят/отклонен)
+    live_accepts: Mapped[float] = mapped_column(Float, default=0.0)
+    shadow_accepts: Mapped[float] = mapped_column(Float, default=0.0)
+    live_latency: Mapped[float] = mapped_column(Float, default=0.0)  # Суммарная задержка (сек)
+    shadow_latency: Mapped[float] = mapped_column(Float, default=0.0)
+    live_tokens: Mapped[float] = mapped_column(Float, default=0.0)  # Суммарные токены
+    shadow_tokens: Mapped[float] = mapped_column(Float, default=0.0)
+    errors: Mapped[float] = mapped_column(Float, default=0.0)  # Ошибки запросов теневой версии
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
 
+    def __repr__(self):
+        return f"<FilterShadow(id={self.id}, filter='{self.filter_id}')>"
+
+
+class SourceCursor(Base):
+    """Последний обработанный пост источника (догрузка пропущенных постов после простоя)"""
+    __tablename__ = "source_cursors"
+
+    source_type: Mapped[str] = mapped_column(String(20), primary_key=True)  # 'telegram' или 'vk'
+    source_id: Mapped[str] = mapped_column(String, primary_key=True)  # source_id источника из конфигурации
+    last_post_id: Mapped[int] = mapped_column(BigInteger, default=0)  # Максимальный обработанный ID поста
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SourceCursor(type='{self.source_type}', source='{self.source_id}', last={self.last_post_id})>"
@@ -0,0 +1,38 @@
+from typing import Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from ..models import AISpend
+
+class AISpendRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_day(self, day: str) -> Dict[str, dict]:
+        """Расход AI по фильтрам за сутки: {filter_id: {"tokens": ..., "cost": ..., ...}}"""
+        query = select(AISpend).where(AISpend.day == day)
+        result = await self.session.execute(query)
+        return {
+            r.filter_id: {
+                "tokens": r.tokens,
+                "prompt_tokens": r.prompt_tokens,
+                "completion_tokens": r.completion_tokens,
+                "cost": r.cost,
+                "requests": r.requests
+            }
+            for r in result.scalars().all()
+        }
+
+    async def save_many(self, day: str, spend: Dict[str, dict]):
+        """Сохраняет накопленный расход фильтров за сутки (значения заменяются целиком)"""
+        if not spend:
+            return
+            
+        for filter_id, values in spend.items():
+            record = await self.session.get(AISpend, (day, filter_id))
+            if record is None:
+                record = AISpend(day=day, filter_id=filter_id)
+                self.session.add(record)
+            for key, value in values.items():
+                setattr(record, key, value)
+                
+        await self.session.commit()
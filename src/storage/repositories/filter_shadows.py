@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete
+from ..models import FilterShadow
+
+# Счетчики сравнения с живой версией фильтра
+SHADOW_COUNTERS = (
+    "evaluations", "agreements", "live_accepts", "shadow_accepts",
+    "live_latency", "shadow_latency", "live_tokens", "shadow_tokens", "errors"
+)
+
+class FilterShadowRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, shadow_data: dict) -> FilterShadow:
+        shadow = FilterShadow(**shadow_data)
+        self.session.add(shadow)
+        await self.session.commit()
+        await self.session.refresh(shadow)
+        return shadow
+
+    async def get(self, shadow_id: int) -> Optional[FilterShadow]:
+        return await self.session.get(FilterShadow, shadow_id)
+
+    async def list_by_filter(self, filter_id: str) -> List[FilterShadow]:
+        query = select(FilterShadow).where(FilterShadow.filter_id == filter_id).order_by(FilterShadow.id)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def list_enabled(self) -> List[FilterShadow]:
+        query = select(FilterShadow).where(FilterShadow.enabled == True)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def update(self, shadow_id: int, update_data: dict) -> Optional[FilterShadow]:
+        """Обновляет теневую версию; при смене промпта или модели счетчики обнуляются"""
+        shadow = await self.get(shadow_id)
+        if shadow is None:
+            return None
+        if any(key in update_data and update_data[key] != getattr(shadow, key) for key in ("prompt", "model")):
+            update_data.update({key: 0.0 for key in SHADOW_COUNTERS})
+        for key, value in update_data.items():
+            setattr(shadow, key, value)
+        await self.session.commit()
+        await self.session.refresh(shadow)
+        return shadow
+
+    async def delete(self, shadow_id: int) -> bool:
+        query = delete(FilterShadow).where(FilterShadow.id == shadow_id)
+        result = await self.session.execute(query)
+        await self.session.commit()
+        return result.rowcount > 0
+
+    async def add_stats(self, stats: Dict[int, dict]):
+        """
+        Прибавляет накопленные приращения счетчиков (удаленные версии пропускаются).
+        stats: {shadow_id: {"evaluations": ..., "agreements": ..., ...}}
+        """
+        if not stats:
+            return
+            
+        for shadow_id, deltas in stats.items():
+            query = (
+                update(FilterShadow)
+                .where(FilterShadow.id == shadow_id)
+                .values({key: getattr(FilterShadow, key) + value for key, value in deltas.items()})
+            )
+            await self.session.execute(query)
+            
+        await self.session.commit()
@@ -0,0 +1,38 @@
+from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from ..models import FilterStatistics, Filter
+
+class FilterStatsRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def list_all(self) -> List[FilterStatistics]:
+        query = select(FilterStatistics)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def save_many(self, stats: Dict[str, dict]):
+        """
+        Сохраняет статистику фильтров.
+        stats: {filter_id: {"evaluations": ..., "matches": ..., "total_latency": ..., "total_tokens": ...}}
+        """
+        if not stats:
+            return
+            
+        # Статистику удаленных фильтров не сохраняем (внешний ключ)
+        query = select(Filter.id).where(Filter.id.in_(list(stats)))
+        result = await self.session.execute(query)
+        existing_filters = set(result.scalars().all())
+        
+        for filter_id, values in stats.items():
+            if filter_id not in existing_filters:
+                continue
+            record = await self.session.get(FilterStatistics, filter_id)
+            if record is None:
+                record = FilterStatistics(filter_id=filter_id)
+                self.session.add(record)
+            for key, value in values.items():
+                setattr(record, key, value)
+                
+        await self.session.commit()
@@ -0,0 +1,29 @@
+from typing import Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from ..models import SourceCursor
+
+class SourceCursorRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self, source_type: str) -> Dict[str, int]:
+        """Курсоры источников одного типа: {source_id: last_post_id}"""
+        query = select(SourceCursor).where(SourceCursor.source_type == source_type)
+        result = await self.session.execute(query)
+        return {r.source_id: r.last_post_id for r in result.scalars().all()}
+
+    async def save_many(self, source_type: str, cursors: Dict[str, int]):
+        """Сохраняет курсоры (курсор только растет: меньший ID не перезаписывает больший)"""
+        if not cursors:
+            return
+            
+        for source_id, last_post_id in cursors.items():
+            record = await self.session.get(SourceCursor, (source_type, source_id))
+            if record is None:
+                record = SourceCursor(source_type=source_type, source_id=source_id, last_post_id=last_post_id)
+                self.session.add(record)
+            elif last_post_id > record.last_post_id:
+                record.last_post_id = last_post_id
+                
+        await self.session.commit()
@@ -41,6 +41,19 @@ class SourceRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
     
+    async def update(self, source_id: int, update_data: dict) -> Optional[Source]:
+        """Обновляет поля источника (без списка фильтров)"""
+        query = update(Source).where(Source.id == source_id).values(**update_data)
+        await self.session.execute(query)
+        await self.session.commit()
+        query = (
+            select(Source).where(Source.id == source_id)
+            .options(selectinload(Source.filters))
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
     async def update_filters(self, source_id: int, filter_ids: List[str]):
         """Обновляет список фильтров для источника"""
         source = await self.session.get(Source, source_id)
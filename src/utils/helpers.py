@@ -1,10 +1,27 @@
 import hashlib
+import json
+from typing import List, Optional
 
 def get_post_hash(text: str) -> str:
     """Возвращает MD5 хеш текста"""
     return hashlib.md5(text.strip().encode('utf-8')).hexdigest()
 
 
+def normalize_text(text: str) -> str:
+    """Каноническая форма текста: нижний регистр, схлопнутые пробелы"""
+    return " ".join(text.lower().split())
 
 
+def get_normalized_hash(text: str) -> str:
+    """Возвращает SHA-256 хеш канонической формы текста"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
 
+
+def get_filter_version(prompt: str, categories: List[str], model: str = "",
+                       max_text_tokens: Optional[int] = None) -> str:
+    """Короткий хеш конфигурации фильтра (промпт, категории, модель, бюджет токенов текста)"""
+    items = [prompt, categories, model]
+    if max_text_tokens is not None:
+        items.append(max_text_tokens)
+    payload = json.dumps(items, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
@@ -166,20 +166,26 @@ if not vk_token or vk_token.startswith('your_') or vk_token.startswith('vk1.a.yo
     print("⚠️  VK токен не настроен, пропускаем тест")
 else:
     try:
-        import vk_api
+        import asyncio
+        from src.providers.vk.api import VKApi
         
-        print("   Создание сессии...")
-        vk_session = vk_api.VkApi(token=vk_token)
-        vk = vk_session.get_api()
+        async def test_vk():
+            print("   Создание клиента...")
+            api = VKApi(vk_token)
+            
+            try:
+                print("   Получение информации о пользователе...")
+                user = (await api.users_get())[0]
+                print(f"   Аккаунт: {user['first_name']} {user['last_name']}")
+                print("✅ VK API работает!")
+            finally:
+                await api.close()
         
-        print("   Получение информации о пользователе...")
-        user = vk.users.get()[0]
-        print(f"   Аккаунт: {user['first_name']} {user['last_name']}")
-        print("✅ VK API работает!")
+        asyncio.run(test_vk())
         
     except ImportError:
-        print("⚠️  Библиотека vk_api не установлена")
-        print("   Установите: pip install vk-api")
+        print("⚠️  Библиотека httpx не установлена")
+        print("   Установите: pip install httpx")
     except Exception as e:
         print(f"❌ Ошибка при тестировании VK API: {e}")
         print("   Проверьте правильность токена")
@@ -198,7 +204,7 @@ required_packages = {
 }
 
 optional_packages = {
-    'vk_api': 'VK API клиент',
+    'httpx': 'HTTP клиент (VK API)',
     'fastapi': 'REST API фреймворк',
     'sqlalchemy': 'ORM для БД',
 }